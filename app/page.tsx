@@ -247,17 +247,42 @@ export default function LegalBillingSummarizer() {
     setLoadingMessage("Generating AI summaries...")
 
     try {
-      const response = await fetch(`${API_BASE}/summarizer/generate`, {
+      // One NDJSON record per email as it completes, then a "done" record with totals
+      const response = await fetch(`${API_BASE}/summarizer/generate/stream`, {
         method: "POST",
       })
-      const data = await response.json()
+      if (!response.ok || !response.body) {
+        throw new Error(`Summary stream failed with status ${response.status}`)
+      }
 
-      if (data.success) {
-        alert(`Generated ${data.summaries_generated} summaries successfully!`)
+      const reader = response.body.getReader()
+      const decoder = new TextDecoder()
+      let buffered = ""
+      let totals: { summaries_generated: number } | null = null
+      while (true) {
+        const { value, done } = await reader.read()
+        if (done) break
+        buffered += decoder.decode(value, { stream: true })
+        const lines = buffered.split("\n")
+        buffered = lines.pop() || ""
+        for (const line of lines) {
+          if (!line.trim()) continue
+          const record = JSON.parse(line)
+          if (record.type === "result" || record.type === "heartbeat") {
+            setLoadingMessage(`Generating AI summaries... ${record.completed} of ${record.total}`)
+          } else if (record.type === "done") {
+            totals = record
+          }
+        }
+      }
+
+      if (totals) {
+        alert(`Generated ${totals.summaries_generated} summaries successfully!`)
         updateCounts()
         loadSummaries()
       } else {
-        alert("Failed to generate summaries: " + data.message)
+        alert("Summary generation stopped before it finished; generated summaries were saved.")
+        loadSummaries()
       }
     } catch (error) {
       console.error("Summary generation error:", error)
@@ -0,0 +1,93 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+from fastapi import Request
+from fastapi.responses import ORJSONResponse, Response
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+import logging
+
+from ..models.email import Email
+
+logger = logging.getLogger(__name__)
+
+class ResponseCache:
+    """In-process cache of serialized list responses.
+
+    Entries are keyed by endpoint and ETag, so a stale entry can never be
+    served after the table changes; committed writes also drop entries so
+    memory isn't held by payloads nobody can ask for again.
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, etag: str) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(f"{key}:{etag}")
+            if body is not None:
+                self._entries.move_to_end(f"{key}:{etag}")
+            return body
+
+    def put(self, key: str, etag: str, body: bytes) -> None:
+        with self._lock:
+            self._entries[f"{key}:{etag}"] = body
+            self._entries.move_to_end(f"{key}:{etag}")
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+response_cache = ResponseCache()
+
+def table_etag(db: Session, name: str, model, *criteria) -> str:
+    """Strong ETag from row count and max(updated_at) of the matching rows"""
+    count, last_updated = db.query(func.count(model.id), func.max(model.updated_at)).filter(*criteria).one()
+    fingerprint = f"{name}:{count}:{last_updated}"
+    return '"' + hashlib.sha1(fingerprint.encode("utf-8")).hexdigest() + '"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether an If-None-Match header covers the current ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+def conditional_json(request: Request, key: str, etag: str, build: Callable[[], Dict]) -> Response:
+    """304 if the client is current, else the cached or freshly built payload"""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    body = response_cache.get(key, etag)
+    if body is None:
+        body = ORJSONResponse(content=build()).body
+        response_cache.put(key, etag, body)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def _track_email_writes(session, flush_context) -> None:
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, Email):
+            session.info["emails_changed"] = True
+            return
+
+def _invalidate_after_commit(session) -> None:
+    if session.info.pop("emails_changed", False):
+        response_cache.invalidate()
+
+def _reset_after_rollback(session, previous_transaction) -> None:
+    session.info.pop("emails_changed", None)
+
+def register_cache_invalidation(session_factory) -> None:
+    """Drop cached responses whenever a session commits changes to emails"""
+    event.listen(session_factory, "after_flush", _track_email_writes)
+    event.listen(session_factory, "after_commit", _invalidate_after_commit)
+    event.listen(session_factory, "after_soft_rollback", _reset_after_rollback)
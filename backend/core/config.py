@@ -5,6 +5,19 @@ class Settings:
     # OpenAI Configuration
     openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
     openai_model: str = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+    # JSON {"model": [USD per 1K prompt tokens, per 1K completion tokens]}
+    openai_model_prices: str = os.getenv("OPENAI_MODEL_PRICES", "")
+    
+    # Model routing: long or complex mail, and OPENAI_MODEL answers that fail
+    # validation, go to the strong model; unset sends everything to OPENAI_MODEL
+    openai_strong_model: str = os.getenv("OPENAI_STRONG_MODEL", "")
+    routing_escalate_tokens: int = int(os.getenv("ROUTING_ESCALATE_TOKENS", 200))
+    routing_escalate_recipients: int = int(os.getenv("ROUTING_ESCALATE_RECIPIENTS", 5))
+    routing_escalate_pattern: str = os.getenv(
+        "ROUTING_ESCALATE_PATTERN",
+        r"\b(term sheet|redline|indemnif\w*|(settlement|purchase|merger|license) agreement|"
+        r"deposition|subpoena|litigation hold|privilege\w*|arbitration)\b"
+    )
     
     # Google/Gmail Configuration
     google_client_secret_file: str = os.getenv("GOOGLE_CLIENT_SECRET_FILE", "client_secret.json")
@@ -14,6 +27,73 @@ class Settings:
     def google_scopes_list(self) -> List[str]:
         return [scope.strip() for scope in self.google_scopes.split(",")]
     
+    # Gmail push notifications (Pub/Sub)
+    gmail_pubsub_topic: str = os.getenv("GMAIL_PUBSUB_TOPIC", "")
+    gmail_push_token: str = os.getenv("GMAIL_PUSH_TOKEN", "")
+    gmail_watch_renew_hours: float = float(os.getenv("GMAIL_WATCH_RENEW_HOURS", 24))
+    gmail_push_debounce_seconds: float = float(os.getenv("GMAIL_PUSH_DEBOUNCE_SECONDS", 2))
+    # Most messages refetched when stored history has expired
+    gmail_push_backfill_max_messages: int = int(os.getenv("GMAIL_PUSH_BACKFILL_MAX_MESSAGES", 2000))
+    
+    # Pipeline (fetch -> prepare -> summarize -> push)
+    pipeline_interval_minutes: float = float(os.getenv("PIPELINE_INTERVAL_MINUTES", 0))
+    pipeline_days_back: int = int(os.getenv("PIPELINE_DAYS_BACK", 1))
+    pipeline_max_results: int = int(os.getenv("PIPELINE_MAX_RESULTS", 100))
+    pipeline_queue_size: int = int(os.getenv("PIPELINE_QUEUE_SIZE", 50))
+    pipeline_summarize_concurrency: int = int(os.getenv("PIPELINE_SUMMARIZE_CONCURRENCY", 4))
+    pipeline_push: bool = os.getenv("PIPELINE_PUSH", "true").lower() == "true"
+    
+    # Emails summarized at once by /api/summarizer/generate/stream
+    summarizer_stream_concurrency: int = int(os.getenv("SUMMARIZER_STREAM_CONCURRENCY", 4))
+    # An email is claimed before its model call so no other worker summarizes it;
+    # claims older than this are assumed abandoned
+    summary_claim_seconds: float = float(os.getenv("SUMMARY_CLAIM_SECONDS", 600))
+    
+    # Connected mailboxes: round-robin sync with a Gmail quota budget per mailbox
+    mailbox_sync_interval_minutes: float = float(os.getenv("MAILBOX_SYNC_INTERVAL_MINUTES", 0))
+    mailbox_sync_concurrency: int = int(os.getenv("MAILBOX_SYNC_CONCURRENCY", 4))
+    mailbox_sync_batch_size: int = int(os.getenv("MAILBOX_SYNC_BATCH_SIZE", 20))
+    mailbox_sync_days_back: int = int(os.getenv("MAILBOX_SYNC_DAYS_BACK", 1))
+    mailbox_sync_max_messages: int = int(os.getenv("MAILBOX_SYNC_MAX_MESSAGES", 500))
+    mailbox_quota_units_per_second: float = float(os.getenv("MAILBOX_QUOTA_UNITS_PER_SECOND", 100))
+    
+    # Pre-filter: rule-matched mail is summarized without a model call
+    prefilter_enabled: bool = os.getenv("PREFILTER_ENABLED", "true").lower() == "true"
+    prefilter_rules_file: str = os.getenv("PREFILTER_RULES_FILE", "")
+    
+    # Near-duplicate reuse: mail within this many SimHash bits (of 64) of an
+    # already-summarized email reuses its summary instead of calling the model
+    dedupe_enabled: bool = os.getenv("DEDUPE_ENABLED", "true").lower() == "true"
+    dedupe_max_distance: int = int(os.getenv("DEDUPE_MAX_DISTANCE", 5))
+    dedupe_min_words: int = int(os.getenv("DEDUPE_MIN_WORDS", 20))
+    dedupe_refresh_seconds: float = float(os.getenv("DEDUPE_REFRESH_SECONDS", 30))
+    
+    # Archival: entries pushed to Clio over ARCHIVE_PUSHED_AFTER_DAYS ago and any mail
+    # older than ARCHIVE_AFTER_DAYS (0 = never) move to emails_archive
+    archive_interval_hours: float = float(os.getenv("ARCHIVE_INTERVAL_HOURS", 0))
+    archive_pushed_after_days: int = int(os.getenv("ARCHIVE_PUSHED_AFTER_DAYS", 90))
+    archive_after_days: int = int(os.getenv("ARCHIVE_AFTER_DAYS", 365))
+    archive_batch_size: int = int(os.getenv("ARCHIVE_BATCH_SIZE", 500))
+    
+    # LEDES 1998B export: firm id and the hourly rate used for line totals
+    ledes_law_firm_id: str = os.getenv("LEDES_LAW_FIRM_ID", "")
+    ledes_hourly_rate: float = float(os.getenv("LEDES_HOURLY_RATE", 0))
+    
+    # Backlog gauges on /metrics are recounted at most this often
+    metrics_backlog_refresh_seconds: float = float(os.getenv("METRICS_BACKLOG_REFRESH_SECONDS", 60))
+    
+    # Logging
+    log_format: str = os.getenv("LOG_FORMAT", "json")
+    log_rate_limit_per_second: float = float(os.getenv("LOG_RATE_LIMIT_PER_SECOND", 20))
+    log_rate_limit_burst: int = int(os.getenv("LOG_RATE_LIMIT_BURST", 50))
+    log_sql_sample_rate: float = float(os.getenv("LOG_SQL_SAMPLE_RATE", 0))
+    
+    # Request profiling: a random sample, or requests sending X-Profile-Token
+    profile_sample_rate: float = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+    profile_token: str = os.getenv("PROFILE_TOKEN", "")
+    profile_interval_ms: float = float(os.getenv("PROFILE_INTERVAL_MS", 5))
+    profile_history: int = int(os.getenv("PROFILE_HISTORY", 50))
+    
     # Railway Configuration - Get actual domain from Railway
     railway_environment: str = os.getenv("RAILWAY_ENVIRONMENT", "development")
     railway_service_name: str = os.getenv("RAILWAY_SERVICE_NAME", "legal-billing-summarizer")
@@ -44,6 +124,9 @@ class Settings:
     clio_client_id: str = os.getenv("CLIO_CLIENT_ID", "")
     clio_client_secret: str = os.getenv("CLIO_CLIENT_SECRET", "")
     clio_base_url: str = os.getenv("CLIO_BASE_URL", "https://app.clio.com")
+    # An email is claimed before its time entry is posted so no other worker posts it
+    # too; claims older than this are assumed abandoned
+    push_claim_seconds: float = float(os.getenv("PUSH_CLAIM_SECONDS", 300))
     
     @property
     def clio_redirect_uri(self) -> str:
@@ -55,6 +138,15 @@ class Settings:
     debug: bool = os.getenv("DEBUG", "false").lower() == "true"
     port: int = int(os.getenv("PORT", 8080))
     
+    # Server processes; "auto" uses one per CPU core
+    web_concurrency_setting: str = os.getenv("WEB_CONCURRENCY", "1")
+    
+    @property
+    def web_concurrency(self) -> int:
+        if self.web_concurrency_setting == "auto":
+            return max(os.cpu_count() or 1, 1)
+        return max(int(self.web_concurrency_setting), 1)
+    
     # Database Configuration
     database_url: str = os.getenv("DATABASE_URL", "sqlite:///./legal_billing.db")
     
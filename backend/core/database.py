@@ -2,7 +2,19 @@ from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from datetime import datetime
+import hashlib
+import logging
 import os
+import tempfile
+
+from .cache import register_cache_invalidation
+from .config import settings
+from .events import register_change_feed
+from .metrics import register_backlog_gauges, register_query_metrics
+from ..services.rollup_service import register_rollup_writes
+from ..utils.file_lock import locked
+
+logger = logging.getLogger(__name__)
 
 # Database URL
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./legal_billing.db")
@@ -13,6 +25,16 @@ engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} i
 # Create session
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Committed email changes drop cached list responses, reach the change feed
+# and update the billing rollups
+register_cache_invalidation(SessionLocal)
+register_change_feed(SessionLocal)
+register_rollup_writes(SessionLocal)
+
+# Statement counts/latency and backlog gauges for /metrics
+register_query_metrics(engine)
+register_backlog_gauges(SessionLocal, settings.metrics_backlog_refresh_seconds)
+
 # Base class
 Base = declarative_base()
 
@@ -34,9 +56,54 @@ def get_db():
         db.close()
 
 async def init_db():
-    """Initialize database tables"""
+    """Initialize database tables.
+    
+    Workers start together, so setup runs under a lock and the ones
+    that wait find the schema current.
+    """
+    database_key = hashlib.sha1(DATABASE_URL.encode("utf-8")).hexdigest()[:12]
+    with locked(os.path.join(tempfile.gettempdir(), f"legal-billing-init-{database_key}")):
+        _setup_schema()
+        _fingerprint_summaries()
+
+def _setup_schema():
+    """Create tables and run migrations unless the schema is already current"""
     from ..models.email import Base as EmailBase
+    from ..models import archive, billing, coordination, ledger, sync  # noqa: F401 - registers their tables on EmailBase
+    from ..services.content_store import ContentStore
+    from ..services.ledger_service import LedgerService
+    from ..services.rollup_service import RollupService
+    from ..services.search_service import SearchService
+    from .migrations import add_missing_columns, applied_fingerprint, record_fingerprint, schema_fingerprint
+    
+    # Nothing to do when the last completed setup was for this exact schema
+    fingerprint = schema_fingerprint(engine, Base.metadata, EmailBase.metadata)
+    if applied_fingerprint(engine) == fingerprint:
+        logger.info("Database schema is current, skipping setup")
+        return
     
     # Create all tables
     Base.metadata.create_all(bind=engine)
     EmailBase.metadata.create_all(bind=engine)
+    add_missing_columns(engine)
+    LedgerService.backfill_summary_sources(engine)
+    
+    # Full-text index and triggers that keep it in sync with emails
+    search_service = SearchService()
+    index_created = search_service.ensure_index(engine)
+    
+    # Move bodies stored inline by older versions into email_contents
+    ContentStore().migrate_inline_bodies(engine)
+    if index_created:
+        search_service.reindex_bodies(engine)
+    
+    RollupService().ensure_built(engine)
+    record_fingerprint(engine, fingerprint)
+    logger.info("Database schema set up")
+
+def _fingerprint_summaries():
+    """Fill in near-duplicate fingerprints missing from summarized emails"""
+    from ..services.dedupe_service import near_duplicate_index
+    
+    if settings.dedupe_enabled:
+        near_duplicate_index.backfill(engine)
@@ -0,0 +1,192 @@
+import asyncio
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+import orjson
+from sqlalchemy import event, func, insert
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+import logging
+
+from ..models.coordination import ChangeEvent
+
+logger = logging.getLogger(__name__)
+
+# Ids are assigned at insert but become visible at commit, so with
+# concurrent writers a lower id can show up after a higher one has been
+# tailed; each poll looks back this far and skips ids already published
+TAIL_LOOKBACK = 200
+
+class ChangeFeed:
+    """Fan-out of committed change records to SSE subscribers.
+
+    Records are written to the change_events table in the transaction
+    that makes the change, so their ids are the sequence numbers and are
+    the same on every worker. Each worker tails the table and keeps a
+    bounded history so reconnecting clients can resume from the last
+    sequence they saw. Subscribers are asyncio queues fed on their own
+    event loop.
+    """
+
+    def __init__(self, history_size: int = 5000, queue_size: int = 1000, poll_interval: float = 0.25):
+        self.queue_size = queue_size
+        self.poll_interval = poll_interval
+        self._history: Deque[Dict] = deque(maxlen=history_size)
+        self._seq = 0
+        # Sequence the history is complete from; earlier records weren't tailed here
+        self._start_seq = 0
+        self._published: Deque[int] = deque(maxlen=history_size)
+        self._published_ids: Set[int] = set()
+        self._lock = threading.Lock()
+        self._subscribers: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = set()
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+    def publish(self, records: List[Dict]) -> None:
+        """Add tailed records to the history and fan them out to subscribers"""
+        with self._lock:
+            records = [record for record in records if record["seq"] not in self._published_ids]
+            for record in records:
+                self._seq = max(self._seq, record["seq"])
+                self._history.append(record)
+                if len(self._published) == self._published.maxlen:
+                    self._published_ids.discard(self._published[0])
+                self._published.append(record["seq"])
+                self._published_ids.add(record["seq"])
+            subscribers = list(self._subscribers)
+
+        for loop, queue in subscribers:
+            for record in records:
+                try:
+                    loop.call_soon_threadsafe(self._deliver, queue, record)
+                except RuntimeError:
+                    # Subscriber's loop has closed
+                    self._subscribers.discard((loop, queue))
+                    break
+
+    @staticmethod
+    def _deliver(queue: asyncio.Queue, record: Dict) -> None:
+        try:
+            queue.put_nowait(record)
+        except asyncio.QueueFull:
+            # A client this far behind must resync from the list endpoints;
+            # replace its backlog with a reset marker
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
+
+    def since(self, seq: int) -> Optional[List[Dict]]:
+        """Records after seq, or None if some have already been dropped"""
+        with self._lock:
+            if seq > self._seq:
+                return None
+            oldest = self._history[0]["seq"] if self._history else self._seq + 1
+            if seq < self._start_seq or seq + 1 < oldest:
+                return None
+            return [record for record in self._history if record["seq"] > seq]
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        with self._lock:
+            self._subscribers = {entry for entry in self._subscribers if entry[1] is not queue}
+
+    async def run_tailer(self, session_factory) -> None:
+        """Poll change_events for records committed by any worker"""
+        start = await run_in_threadpool(self._max_id, session_factory)
+        with self._lock:
+            self._seq = self._start_seq = start
+
+        while True:
+            try:
+                after = max(self._seq - TAIL_LOOKBACK, self._start_seq)
+                with self._lock:
+                    skip = {seq for seq in range(after + 1, self._seq + 1) if seq in self._published_ids}
+                records = await run_in_threadpool(self._fetch_after, session_factory, after, skip)
+                if records:
+                    self.publish(records)
+            except Exception as e:
+                logger.error(f"Change feed poll failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    @staticmethod
+    def _max_id(session_factory) -> int:
+        db = session_factory()
+        try:
+            return db.query(func.max(ChangeEvent.id)).scalar() or 0
+        finally:
+            db.close()
+
+    @staticmethod
+    def _fetch_after(session_factory, seq: int, skip: Set[int], limit: int = 1000) -> List[Dict]:
+        db = session_factory()
+        try:
+            rows = (
+                db.query(ChangeEvent)
+                .filter(ChangeEvent.id > seq)
+                .order_by(ChangeEvent.id)
+                .limit(limit)
+                .all()
+            )
+            return [
+                {
+                    "seq": row.id,
+                    "entity": row.entity,
+                    "id": row.entity_id,
+                    "action": row.action,
+                    "changes": orjson.loads(row.changes),
+                    "at": row.created_at,
+                }
+                for row in rows
+                if row.id not in skip
+            ]
+        finally:
+            db.close()
+
+change_feed = ChangeFeed()
+
+def publish_on_commit(db: Session, entity: str, entity_id: Any, action: str, changes: Optional[Dict] = None) -> None:
+    """Queue a change record that is written with, and only with, the session's commit"""
+    db.info.setdefault("pending_changes", []).append((entity, entity_id, action, changes))
+
+def _write_pending_changes(session) -> None:
+    pending = session.info.pop("pending_changes", None)
+    if not pending:
+        return
+    now = datetime.utcnow()
+    session.execute(insert(ChangeEvent), [
+        {
+            "entity": entity,
+            "entity_id": entity_id,
+            "action": action,
+            "changes": orjson.dumps(changes or {}).decode("utf-8"),
+            "created_at": now,
+        }
+        for entity, entity_id, action, changes in pending
+    ])
+
+def _discard_after_rollback(session, previous_transaction) -> None:
+    session.info.pop("pending_changes", None)
+
+def register_change_feed(session_factory) -> None:
+    """Write queued change records as part of each commit"""
+    event.listen(session_factory, "before_commit", _write_pending_changes)
+    event.listen(session_factory, "after_soft_rollback", _discard_after_rollback)
+
+def prune_change_events(session_factory, keep_hours: float = 24) -> int:
+    """Delete change records older than anyone could still resume from"""
+    db = session_factory()
+    try:
+        cutoff = datetime.utcnow() - timedelta(hours=keep_hours)
+        deleted = db.query(ChangeEvent).filter(ChangeEvent.created_at < cutoff).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+    finally:
+        db.close()
@@ -0,0 +1,254 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, Tuple
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import case, event, func
+import logging
+
+from ..models.email import Email
+from .profiling import current_profile
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by router and route template",
+    ["router", "route", "method", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "SQL statement execution time by statement type",
+    ["operation"],
+    buckets=QUERY_BUCKETS,
+)
+UPSTREAM_REQUESTS = Counter(
+    "upstream_requests_total",
+    "Calls to Gmail, OpenAI and Clio by outcome",
+    ["service", "operation", "outcome"],
+)
+UPSTREAM_DURATION = Histogram(
+    "upstream_request_duration_seconds",
+    "Latency of calls to Gmail, OpenAI and Clio",
+    ["service", "operation"],
+    buckets=LATENCY_BUCKETS,
+)
+OPENAI_TOKENS = Counter(
+    "openai_tokens_total",
+    "OpenAI tokens used, by model and prompt/completion",
+    ["model", "kind"],
+)
+OPENAI_REQUEST_DURATION = Histogram(
+    "openai_request_duration_seconds",
+    "Latency of summarization calls by model",
+    ["model"],
+    buckets=LATENCY_BUCKETS,
+)
+OPENAI_COST = Counter(
+    "openai_cost_usd_total",
+    "Estimated OpenAI spend in USD by model",
+    ["model"],
+)
+MODEL_ROUTES = Counter(
+    "summarizer_model_routes_total",
+    "Summarization attempts by model and routing reason",
+    ["model", "reason"],
+)
+EMAILS_PREFILTERED = Counter(
+    "emails_prefiltered_total",
+    "Emails summarized by a pre-filter rule instead of the model",
+    ["rule", "action"],
+)
+SUMMARIES_REUSED = Counter(
+    "summaries_reused_total",
+    "Emails given the adapted summary of a near-duplicate instead of a model call",
+)
+
+class UpstreamCall:
+    """Handle yielded by track_upstream; set status for HTTP-style calls"""
+
+    __slots__ = ("status",)
+
+    def __init__(self):
+        self.status: Optional[int] = None
+
+@contextmanager
+def track_upstream(service: str, operation: str) -> Iterator[UpstreamCall]:
+    """Time an upstream call; exceptions and 4xx/5xx statuses count as errors"""
+    call = UpstreamCall()
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield call
+        outcome = "error" if call.status is not None and call.status >= 400 else "success"
+    finally:
+        elapsed = time.perf_counter() - started
+        UPSTREAM_DURATION.labels(service, operation).observe(elapsed)
+        UPSTREAM_REQUESTS.labels(service, operation, outcome).inc()
+        profile = current_profile.get()
+        if profile is not None:
+            profile.add_upstream(elapsed)
+
+def record_openai_usage(model: str, usage) -> None:
+    if usage is None:
+        return
+    OPENAI_TOKENS.labels(model, "prompt").inc(usage.prompt_tokens or 0)
+    OPENAI_TOKENS.labels(model, "completion").inc(usage.completion_tokens or 0)
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency per route template.
+
+    Labels come from the matched endpoint rather than the raw path, so
+    ids in URLs don't create new series. Written as plain ASGI so
+    streaming responses pass through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._routes: Optional[Dict[Callable, Tuple[str, str]]] = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            router, route = self._route_labels(scope)
+            HTTP_REQUEST_DURATION.labels(router, route, scope["method"], str(status)).observe(
+                time.perf_counter() - started
+            )
+
+    def _route_labels(self, scope) -> Tuple[str, str]:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "none", "unmatched"
+
+        if self._routes is None:
+            self._routes = {
+                route.endpoint: ((getattr(route, "tags", None) or ["App"])[0].lower(), route.path)
+                for route in scope["app"].routes
+                if hasattr(route, "endpoint")
+            }
+        return self._routes.get(endpoint, ("none", "unmatched"))
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+    profile = current_profile.get()
+    if profile is not None:
+        profile.query_threads.add(threading.get_ident())
+
+# Statement text -> histogram child; SQLAlchemy reuses statement strings,
+# so this skips the parse and label lookup on nearly every query
+_query_children: Dict[str, Histogram] = {}
+_QUERY_CHILDREN_MAX = 2000
+
+def _query_child(statement: str) -> Histogram:
+    child = _query_children.get(statement)
+    if child is None:
+        words = statement.split(None, 1)
+        child = DB_QUERY_DURATION.labels(words[0].upper() if words else "OTHER")
+        if len(_query_children) < _QUERY_CHILDREN_MAX:
+            _query_children[statement] = child
+    return child
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    _query_child(statement).observe(elapsed)
+    profile = current_profile.get()
+    if profile is not None:
+        profile.add_db(elapsed)
+        profile.query_threads.discard(threading.get_ident())
+
+def _discard_query_start(context) -> None:
+    profile = current_profile.get()
+    if profile is not None:
+        profile.query_threads.discard(threading.get_ident())
+    connection = context.connection
+    started = connection.info.get("query_started") if connection is not None else None
+    if started:
+        started.pop()
+
+def register_query_metrics(engine) -> None:
+    """Count and time every statement the engine executes"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _discard_query_start)
+
+class BacklogCollector:
+    """Unsummarized and unpushed counts for /metrics.
+
+    Counting scans the emails table, so the counts are cached and
+    recounted at most every refresh_seconds however often, and by
+    however many scrapers, /metrics is read.
+    """
+
+    def __init__(self, session_factory, refresh_seconds: float = 60):
+        self.session_factory = session_factory
+        self.refresh_seconds = refresh_seconds
+        self._counts: Optional[Tuple[int, int]] = None
+        self._counted_at = 0.0
+        self._lock = threading.Lock()
+
+    def describe(self):
+        # Lets the registry learn the metric names without querying at import
+        yield GaugeMetricFamily("emails_unsummarized", "Stored emails without a summary")
+        yield GaugeMetricFamily("emails_unpushed", "Summarized emails not yet pushed to Clio")
+
+    def collect(self):
+        counts = self._current_counts()
+        if counts is None:
+            return
+
+        unsummarized = GaugeMetricFamily("emails_unsummarized", "Stored emails without a summary")
+        unpushed = GaugeMetricFamily("emails_unpushed", "Summarized emails not yet pushed to Clio")
+        unsummarized.add_metric([], counts[0])
+        unpushed.add_metric([], counts[1])
+        yield unsummarized
+        yield unpushed
+
+    def _current_counts(self) -> Optional[Tuple[int, int]]:
+        with self._lock:
+            if self._counts is not None and time.monotonic() - self._counted_at < self.refresh_seconds:
+                return self._counts
+
+            db = self.session_factory()
+            try:
+                pending_summary, pending_push = db.query(
+                    func.sum(case((Email.summary.is_(None), 1), else_=0)),
+                    func.sum(case((
+                        Email.summary.isnot(None) & (Email.pushed_to_clio == False) & Email.billable.isnot(False)
+                        & Email.exclude_from_push.isnot(True), 1
+                    ), else_=0)),
+                ).one()
+            except Exception as e:
+                logger.warning(f"Backlog gauges unavailable: {e}")
+                # Serve the last counts rather than none; retry on the next scrape
+                return self._counts
+            finally:
+                db.close()
+
+            self._counts = (pending_summary or 0, pending_push or 0)
+            self._counted_at = time.monotonic()
+            return self._counts
+
+def register_backlog_gauges(session_factory, refresh_seconds: float = 60) -> None:
+    REGISTRY.register(BacklogCollector(session_factory, refresh_seconds))
+
+def render_metrics() -> Tuple[bytes, str]:
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,94 @@
+import hashlib
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateIndex, CreateTable
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Columns added to existing tables after their first release: (table, column, DDL type)
+ADDED_COLUMNS = [
+    ("emails", "body_hash", "VARCHAR(64)"),
+    ("emails", "matter_id", "VARCHAR"),
+    ("emails", "owner", "VARCHAR"),
+    ("emails", "billable", "BOOLEAN DEFAULT TRUE"),
+    ("emails", "filter_rule", "VARCHAR"),
+    ("emails", "signal_headers", "TEXT"),
+    ("emails", "simhash", "BIGINT"),
+    ("emails", "reused_from_id", "INTEGER"),
+    ("emails", "exclude_from_push", "BOOLEAN DEFAULT FALSE"),
+    ("emails_archive", "exclude_from_push", "BOOLEAN DEFAULT FALSE"),
+    ("gmail_sync_state", "email_address", "VARCHAR"),
+    ("emails", "summary_claimed_at", "TIMESTAMP"),
+    ("emails_archive", "summary_claimed_at", "TIMESTAMP"),
+    ("emails", "push_claimed_at", "TIMESTAMP"),
+    ("emails_archive", "push_claimed_at", "TIMESTAMP"),
+    ("emails", "summary_source", "VARCHAR"),
+    ("emails_archive", "summary_source", "VARCHAR"),
+]
+
+# Indexes for added columns, which create_all only builds for new tables
+ADDED_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_emails_body_hash ON emails (body_hash)",
+    "CREATE INDEX IF NOT EXISTS ix_emails_matter_id ON emails (matter_id)",
+    "CREATE INDEX IF NOT EXISTS ix_emails_updated_at ON emails (updated_at)",
+    "CREATE INDEX IF NOT EXISTS ix_emails_owner ON emails (owner)",
+]
+
+# Bump for schema work the models can't describe: triggers, full-text
+# indexes, data migrations run from init_db
+SCHEMA_REVISION = 1
+
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("fingerprint", String(40), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+def schema_fingerprint(engine: Engine, *metadatas: MetaData) -> str:
+    """Hash of the DDL for every model table plus the hand-written migrations"""
+    parts = [f"revision:{SCHEMA_REVISION}", *(" ".join(column) for column in ADDED_COLUMNS), *ADDED_INDEXES]
+    for metadata in metadatas:
+        for table in metadata.sorted_tables:
+            parts.append(str(CreateTable(table).compile(dialect=engine.dialect)))
+            parts.extend(
+                str(CreateIndex(index).compile(dialect=engine.dialect))
+                for index in sorted(table.indexes, key=lambda index: index.name or "")
+            )
+    return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()
+
+def applied_fingerprint(engine: Engine) -> Optional[str]:
+    """Fingerprint recorded by the last completed init_db, if any"""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(schema_version.select().with_only_columns(schema_version.c.fingerprint)).scalar()
+    except Exception:
+        # No schema_version table yet
+        return None
+
+def record_fingerprint(engine: Engine, fingerprint: str) -> None:
+    schema_version.create(bind=engine, checkfirst=True)
+    with engine.begin() as conn:
+        conn.execute(schema_version.delete())
+        conn.execute(schema_version.insert().values(fingerprint=fingerprint, applied_at=datetime.utcnow()))
+
+def add_missing_columns(engine: Engine) -> None:
+    """Bring tables created by older versions up to the current models"""
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        tables = set(inspector.get_table_names())
+        existing = {
+            table: {column["name"] for column in inspector.get_columns(table)}
+            for table in {table for table, _, _ in ADDED_COLUMNS} & tables
+        }
+        
+        for table, column, ddl_type in ADDED_COLUMNS:
+            if table in existing and column not in existing[table]:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+                logger.info(f"Added column {table}.{column}")
+        
+        for statement in ADDED_INDEXES:
+            conn.execute(text(statement))
@@ -0,0 +1,217 @@
+import asyncio
+import hmac
+import itertools
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Set
+import logging
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile-token"
+
+# Set while a profiled request is running; visible to its threadpool calls
+current_profile: ContextVar[Optional["Profile"]] = ContextVar("current_profile", default=None)
+
+class Profile:
+    """Timings and stack samples for one request"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, method: str, path: str, loop: asyncio.AbstractEventLoop, task: Optional[asyncio.Task]):
+        self.id = next(self._ids)
+        self.method = method
+        self.path = path
+        self.route: Optional[str] = None
+        self.status: Optional[int] = None
+        self.started_at = datetime.utcnow()
+        self.started = time.perf_counter()
+        self.wall_seconds = 0.0
+        self.db_seconds = 0.0
+        self.db_queries = 0
+        self.loop_db_seconds = 0.0
+        self.upstream_seconds = 0.0
+        self.upstream_calls = 0
+        self.loop = loop
+        self.task = task
+        self.loop_thread = threading.get_ident()
+        self.loop_cpu_started = time.thread_time()
+        self.loop_cpu_seconds = 0.0
+        # Worker threads currently running a statement for this request
+        self.query_threads: Set[int] = set()
+        self.stacks: Counter = Counter()
+
+    def add_db(self, seconds: float) -> None:
+        self.db_seconds += seconds
+        self.db_queries += 1
+        if threading.get_ident() == self.loop_thread:
+            self.loop_db_seconds += seconds
+
+    def add_upstream(self, seconds: float) -> None:
+        self.upstream_seconds += seconds
+        self.upstream_calls += 1
+
+    def folded(self) -> str:
+        """Stacks in folded format, as read by flamegraph.pl and speedscope"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+    def to_dict(self) -> Dict:
+        # CPU is the event-loop thread's CPU time over the request, less
+        # statements run on that thread (already counted as DB). Requests
+        # running concurrently on the same loop inflate it.
+        cpu_seconds = max(self.loop_cpu_seconds - self.loop_db_seconds, 0.0)
+        other_seconds = max(self.wall_seconds - self.db_seconds - self.upstream_seconds - cpu_seconds, 0.0)
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "started_at": self.started_at,
+            "wall_ms": round(self.wall_seconds * 1000, 2),
+            "db_ms": round(self.db_seconds * 1000, 2),
+            "db_queries": self.db_queries,
+            "upstream_ms": round(self.upstream_seconds * 1000, 2),
+            "upstream_calls": self.upstream_calls,
+            "cpu_ms": round(cpu_seconds * 1000, 2),
+            "other_ms": round(other_seconds * 1000, 2),
+            "samples": sum(self.stacks.values()),
+        }
+
+def _fold(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+class StackSampler:
+    """Samples the stacks of in-flight profiled requests from a daemon thread.
+
+    The thread only runs while at least one profile is active. A request's
+    event-loop stack is sampled only when the loop is running that
+    request's task, so concurrent requests don't pollute each other's
+    profiles; worker threads are sampled while they run its SQL.
+    """
+
+    def __init__(self, interval: float, history: int):
+        self.interval = interval
+        self.completed: Deque[Profile] = deque(maxlen=history)
+        self._active: Set[Profile] = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, profile: Profile) -> None:
+        with self._lock:
+            self._active.add(profile)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def stop(self, profile: Profile) -> None:
+        profile.wall_seconds = time.perf_counter() - profile.started
+        profile.loop_cpu_seconds = time.thread_time() - profile.loop_cpu_started
+        profile.task = None
+        with self._lock:
+            self._active.discard(profile)
+            self.completed.append(profile)
+
+    def get(self, profile_id: int) -> Optional[Profile]:
+        with self._lock:
+            return next((profile for profile in self.completed if profile.id == profile_id), None)
+
+    def recent(self) -> List[Profile]:
+        with self._lock:
+            return list(reversed(self.completed))
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                active = list(self._active)
+                if not active:
+                    self._wake.clear()
+            if not active:
+                self._wake.wait()
+                continue
+
+            frames = sys._current_frames()
+            for profile in active:
+                self._sample(profile, frames)
+            time.sleep(self.interval)
+
+    @staticmethod
+    def _sample(profile: Profile, frames: Dict) -> None:
+        task = profile.task
+        if task is not None and asyncio.current_task(profile.loop) is task:
+            frame = frames.get(profile.loop_thread)
+            if frame is not None:
+                profile.stacks[_fold(frame)] += 1
+
+        for thread_id in list(profile.query_threads):
+            if thread_id == profile.loop_thread:
+                continue
+            frame = frames.get(thread_id)
+            if frame is not None:
+                profile.stacks[_fold(frame)] += 1
+
+class ProfilingMiddleware:
+    """Profiles a random sample of requests plus any carrying the profile token.
+
+    Profiled responses get an X-Profile-Id header; the profile itself is
+    served from /api/admin/profiles.
+    """
+
+    def __init__(self, app, sampler: "StackSampler", sample_rate: float = 0.0, token: Optional[str] = None):
+        self.app = app
+        self.sampler = sampler
+        self.sample_rate = sample_rate
+        self.token = token
+
+    def _wants_profile(self, scope) -> bool:
+        if self.token:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER.encode("latin-1"):
+                    return hmac.compare_digest(value.decode("latin-1"), self.token)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(scope["method"], scope["path"], asyncio.get_running_loop(), asyncio.current_task())
+        reset = current_profile.set(profile)
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", str(profile.id).encode())]}
+            await send(message)
+
+        self.sampler.start(profile)
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            endpoint = scope.get("endpoint")
+            profile.route = next(
+                (route.path for route in scope["app"].routes if getattr(route, "endpoint", None) is endpoint),
+                None
+            ) if endpoint is not None else None
+            current_profile.reset(reset)
+            self.sampler.stop(profile)
+            logger.info(f"Profiled {profile.method} {profile.path} as #{profile.id}")
+
+profile_sampler = StackSampler(settings.profile_interval_ms / 1000, settings.profile_history)
+
+def token_matches(token: Optional[str], expected: Optional[str]) -> bool:
+    return bool(token and expected and hmac.compare_digest(token, expected))
@@ -0,0 +1,35 @@
+import importlib.util
+import logging
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+def run(host: str = "0.0.0.0", port: int = None, reload: bool = False) -> None:
+    """Run uvicorn with the production settings: N workers, uvloop and httptools.
+
+    Kept free of app imports so the supervising process stays light;
+    each worker imports the app itself.
+    """
+    import uvicorn
+    
+    workers = 1 if reload else settings.web_concurrency
+    loop = "uvloop" if _available("uvloop") else "asyncio"
+    http = "httptools" if _available("httptools") else "h11"
+    logger.info(f"Starting {workers} worker(s) with {loop} and {http}")
+    
+    uvicorn.run(
+        "backend.main:app",
+        host=host,
+        port=port or settings.port,
+        reload=reload,
+        workers=workers,
+        loop=loop,
+        http=http,
+        log_level="info",
+        # Keep uvicorn's loggers on the app's queue handler
+        log_config=None
+    )
@@ -1,28 +1,56 @@
 from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
-import uvicorn
+from starlette.concurrency import run_in_threadpool
 import os
+import asyncio
 from dotenv import load_dotenv
 import logging
 from contextlib import asynccontextmanager
 from datetime import datetime
 
-from .routers import gmail, clio, summarizer, extension
+from .routers import gmail, clio, summarizer, extension, search, reports, events, pipeline, admin, mailboxes, archive, export
+from .core import server
 from .core.config import settings
-from .core.database import init_db, get_db, ClioToken
+from .core.database import init_db, get_db, ClioToken, SessionLocal, engine
+from .core.events import change_feed, prune_change_events
+from .core.metrics import MetricsMiddleware, render_metrics
+from .core.profiling import ProfilingMiddleware, profile_sampler
+from .core.request_context import RequestIdMiddleware
+from .services.archive_service import archive_service
 from .services.clio_service import ClioService
+from .services.ingest_service import ingest_buffer
+from .services.push_service import push_service
+from .services.pipeline_service import pipeline_service
+from .services.lease_service import lease_service
+from .services.mailbox_sync_service import mailbox_sync_service
 from .utils.logging_config import setup_logging
 
 # Load environment variables
 load_dotenv()
 
 # Setup logging
-setup_logging(level=os.getenv("LOG_LEVEL", "INFO"))
+setup_logging(
+    level=os.getenv("LOG_LEVEL", "INFO"),
+    log_format=settings.log_format,
+    rate_limit_per_second=settings.log_rate_limit_per_second,
+    rate_limit_burst=settings.log_rate_limit_burst,
+    sql_sample_rate=settings.log_sql_sample_rate
+)
 logger = logging.getLogger(__name__)
 
+async def prune_change_events_hourly():
+    while True:
+        try:
+            deleted = await run_in_threadpool(prune_change_events, SessionLocal)
+            if deleted:
+                logger.info(f"Pruned {deleted} old change events")
+        except Exception as e:
+            logger.error(f"Change event pruning failed: {e}")
+        await asyncio.sleep(3600)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
@@ -40,10 +68,50 @@ async def lifespan(app: FastAPI):
         logger.error(f"Database initialization failed: {e}")
         raise
     
+    # Every worker tails the change log for its own SSE clients
+    background_tasks = [asyncio.create_task(change_feed.run_tailer(SessionLocal))]
+    
+    # Singleton jobs run on whichever worker holds their lease
+    background_tasks.append(asyncio.create_task(
+        lease_service.run_as_leader("change-events-prune", prune_change_events_hourly)
+    ))
+    if settings.gmail_pubsub_topic:
+        background_tasks.append(asyncio.create_task(
+            lease_service.run_as_leader("gmail-watch", push_service.run_watch_renewal)
+        ))
+    if settings.pipeline_interval_minutes > 0:
+        background_tasks.append(asyncio.create_task(
+            lease_service.run_as_leader(
+                "pipeline-schedule",
+                lambda: pipeline_service.run_scheduled(settings.pipeline_interval_minutes)
+            )
+        ))
+    
+    if settings.mailbox_sync_interval_minutes > 0:
+        background_tasks.append(asyncio.create_task(
+            lease_service.run_as_leader(
+                "mailbox-sync-schedule",
+                lambda: mailbox_sync_service.run_scheduled(settings.mailbox_sync_interval_minutes)
+            )
+        ))
+    
+    if settings.archive_interval_hours > 0:
+        background_tasks.append(asyncio.create_task(
+            lease_service.run_as_leader(
+                "archive-schedule",
+                lambda: archive_service.run_scheduled(engine, settings.archive_interval_hours)
+            )
+        ))
+    
     yield
     
     # Shutdown
     logger.info("Shutting down Legal Billing Email Summarizer")
+    for task in background_tasks:
+        task.cancel()
+    # Let leaders release their leases so another worker can take over at once
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await ingest_buffer.flush()
 
 app = FastAPI(
     title="Legal Billing Email Summarizer",
@@ -70,11 +138,34 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency per route for /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Request ids for log correlation, echoed back as X-Request-ID
+app.add_middleware(RequestIdMiddleware)
+
+# Opt-in request profiling, off unless a sample rate or token is configured
+if settings.profile_sample_rate > 0 or settings.profile_token:
+    app.add_middleware(
+        ProfilingMiddleware,
+        sampler=profile_sampler,
+        sample_rate=settings.profile_sample_rate,
+        token=settings.profile_token or None
+    )
+
 # Include routers
 app.include_router(gmail.router, prefix="/api/gmail", tags=["Gmail"])
 app.include_router(clio.router, prefix="/api/clio", tags=["Clio"])
 app.include_router(summarizer.router, prefix="/api/summarizer", tags=["Summarizer"])
 app.include_router(extension.router, prefix="/api/extension", tags=["Extension"])
+app.include_router(search.router, prefix="/api/search", tags=["Search"])
+app.include_router(reports.router, prefix="/api/reports", tags=["Reports"])
+app.include_router(events.router, prefix="/api/events", tags=["Events"])
+app.include_router(pipeline.router, prefix="/api/pipeline", tags=["Pipeline"])
+app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
+app.include_router(mailboxes.router, prefix="/api/mailboxes", tags=["Mailboxes"])
+app.include_router(archive.router, prefix="/api/archive", tags=["Archive"])
+app.include_router(export.router, prefix="/api/export", tags=["Export"])
 
 # OAuth callback route
 @app.get("/callback")
@@ -160,6 +251,12 @@ async def health_check():
         "clio_redirect_uri": settings.clio_redirect_uri
     }
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus metrics: HTTP, database, upstream calls and backlog"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -169,6 +266,7 @@ async def root():
         "docs": "/docs" if settings.debug else "Documentation disabled in production",
         "health": "/health",
         "status": "/api/status",
+        "metrics": "/metrics",
         "base_url": settings.base_url,
         "railway_domain": settings.railway_domain,
         "endpoints": {
@@ -177,7 +275,15 @@ async def root():
             "gmail": "/api/gmail/*",
             "clio": "/api/clio/*",
             "summarizer": "/api/summarizer/*",
-            "extension": "/api/extension/*"
+            "extension": "/api/extension/*",
+            "search": "/api/search",
+            "reports": "/api/reports/*",
+            "events": "/api/events",
+            "pipeline": "/api/pipeline/*",
+            "admin": "/api/admin/*",
+            "mailboxes": "/api/mailboxes/*",
+            "archive": "/api/archive/*",
+            "export": "/api/export/*"
         }
     }
 
@@ -202,13 +308,7 @@ def main():
     logger.info(f"Environment: {settings.railway_environment}")
     logger.info(f"Base URL: {settings.base_url}")
     
-    uvicorn.run(
-        "backend.main:app",
-        host=host,
-        port=port,
-        reload=settings.debug,
-        log_level="info"
-    )
+    server.run(host=host, port=port, reload=settings.debug)
 
 if __name__ == "__main__":
     main()
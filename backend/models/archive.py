@@ -0,0 +1,48 @@
+from sqlalchemy import BigInteger, Column, Integer, String, Text, DateTime, Boolean, Float, ForeignKey
+from sqlalchemy.orm import relationship
+from datetime import datetime
+
+from .email import Base
+
+class ArchivedEmail(Base):
+    """Emails moved out of the live table by the archival job.
+
+    Same columns as Email, with the original ids kept so search, the
+    cost ledger and rollups still point at the right row. Bodies stay
+    in email_contents, shared with live mail.
+    """
+    __tablename__ = "emails_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    gmail_id = Column(String, unique=True, index=True)
+    thread_id = Column(String)
+    owner = Column(String, index=True, nullable=True)
+    subject = Column(String)
+    sender = Column(String)
+    recipient = Column(String)
+    body_hash = Column(String(64), ForeignKey("email_contents.hash"), nullable=True)
+    date_sent = Column(DateTime, index=True)
+    summary = Column(Text, nullable=True)
+    billing_hours = Column(Float, nullable=True)
+    billing_description = Column(Text, nullable=True)
+    matter_id = Column(String, index=True, nullable=True)
+    pushed_to_clio = Column(Boolean, default=False)
+    billable = Column(Boolean, default=True)
+    filter_rule = Column(String, nullable=True)
+    exclude_from_push = Column(Boolean, default=False)
+    signal_headers = Column(Text, nullable=True)
+    simhash = Column(BigInteger, nullable=True)
+    reused_from_id = Column(Integer, nullable=True)
+    summary_source = Column(String, nullable=True)
+    summary_claimed_at = Column(DateTime, nullable=True)
+    push_claimed_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    content = relationship("EmailContent", lazy="select")
+
+    @property
+    def body(self) -> str:
+        """Decompressed message body"""
+        return self.content.text if self.content else ""
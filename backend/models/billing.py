@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, DateTime, Float, UniqueConstraint
+from datetime import datetime
+
+from .email import Base
+
+class BillingRollup(Base):
+    """Pre-aggregated billing totals, one row per (dimension, bucket)"""
+    __tablename__ = "billing_rollups"
+    __table_args__ = (UniqueConstraint("dimension", "bucket", name="uq_billing_rollups_dimension_bucket"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    dimension = Column(String, nullable=False)
+    bucket = Column(String, nullable=False)
+    hours = Column(Float, nullable=False, default=0.0)
+    entries = Column(Integer, nullable=False, default=0)
+    pushed_hours = Column(Float, nullable=False, default=0.0)
+    pushed_entries = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
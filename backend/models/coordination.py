@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from datetime import datetime
+
+from .email import Base
+
+class Lease(Base):
+    """Time-limited lock held by one worker, e.g. for a singleton job"""
+    __tablename__ = "leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    acquired_at = Column(DateTime, default=datetime.utcnow)
+
+class ChangeEvent(Base):
+    """Committed change record; every worker tails this table for its SSE clients"""
+    __tablename__ = "change_events"
+
+    id = Column(Integer, primary_key=True)
+    entity = Column(String, nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    action = Column(String, nullable=False)
+    changes = Column(Text, nullable=False, default="{}")
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
@@ -1,7 +1,10 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Float
+from sqlalchemy import BigInteger, Column, Integer, String, Text, DateTime, Boolean, Float, LargeBinary, ForeignKey
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import relationship
 from datetime import datetime
 
+from ..utils.compression import decompress
+
 Base = declarative_base()
 
 class Email(Base):
@@ -10,14 +13,59 @@ class Email(Base):
     id = Column(Integer, primary_key=True, index=True)
     gmail_id = Column(String, unique=True, index=True)
     thread_id = Column(String)
+    # Address of the mailbox it was synced from; None for the default token.pickle mailbox
+    owner = Column(String, index=True, nullable=True)
     subject = Column(String)
     sender = Column(String)
     recipient = Column(String)
-    body = Column(Text)
+    body_hash = Column(String(64), ForeignKey("email_contents.hash"), index=True, nullable=True)
     date_sent = Column(DateTime)
     summary = Column(Text, nullable=True)
     billing_hours = Column(Float, nullable=True)
     billing_description = Column(Text, nullable=True)
+    matter_id = Column(String, index=True, nullable=True)
     pushed_to_clio = Column(Boolean, default=False)
+    # Set by the pre-filter: non-billable mail is summarized without a model call,
+    # counts for no hours and is never pushed
+    billable = Column(Boolean, default=True)
+    filter_rule = Column(String, nullable=True)
+    # Set by a reviewer: the entry stays in the app but is never pushed or billed
+    exclude_from_push = Column(Boolean, default=False)
+    # JSON of the headers the pre-filter looks at (List-Unsubscribe, Auto-Submitted, ...)
+    signal_headers = Column(Text, nullable=True)
+    # 64-bit SimHash of the body (signed to fit BIGINT; 0 = too short to compare)
+    # and the email whose summary was reused for this one
+    simhash = Column(BigInteger, nullable=True)
+    reused_from_id = Column(Integer, nullable=True)
+    # Where the summary came from, as in summary_attempts.source; only "model"
+    # summaries are offered for reuse
+    summary_source = Column(String, nullable=True)
+    # Set while a summarizer owns the email; expires so a crashed worker's claims free up
+    summary_claimed_at = Column(DateTime, nullable=True)
+    # Set while a Clio push owns the email, likewise expiring
+    push_claimed_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    # Loaded only when accessed; use selectinload(Email.content) on paths that read bodies
+    content = relationship("EmailContent", lazy="select")
+
+    @property
+    def body(self) -> str:
+        """Decompressed message body"""
+        return self.content.text if self.content else ""
+
+class EmailContent(Base):
+    """Compressed message bodies, stored once per distinct content hash"""
+    __tablename__ = "email_contents"
+
+    hash = Column(String(64), primary_key=True)
+    codec = Column(String, nullable=False, default="zlib")
+    body = Column(LargeBinary, nullable=False)
+    raw_mime = Column(LargeBinary, nullable=True)
+    size = Column(Integer)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    @property
+    def text(self) -> str:
+        return decompress(self.body, self.codec).decode("utf-8")
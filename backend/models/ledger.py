@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, DateTime, Float, Boolean, Text
+from datetime import datetime
+
+from .email import Base
+
+class SummaryAttempt(Base):
+    """One summarization of one email: where the summary came from and what it cost"""
+    __tablename__ = "summary_attempts"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    email_id = Column(Integer, index=True, nullable=False)
+    # model, rule (pre-filter), reused (near-duplicate) or fallback (no usable answer)
+    source = Column(String, nullable=False)
+    model = Column(String, index=True, nullable=True)
+    route_reason = Column(String, nullable=True)
+    model_calls = Column(Integer, nullable=False, default=0)
+    retries = Column(Integer, nullable=False, default=0)
+    prompt_tokens = Column(Integer, nullable=False, default=0)
+    completion_tokens = Column(Integer, nullable=False, default=0)
+    cost_usd = Column(Float, nullable=False, default=0.0)
+    latency_ms = Column(Float, nullable=False, default=0.0)
+    cache_hit = Column(Boolean, nullable=False, default=False)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
@@ -0,0 +1,40 @@
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel
+
+class StoredEmail(BaseModel):
+    id: str
+    subject: Optional[str] = None
+    sender: Optional[str] = None
+    recipient: Optional[str] = None
+    body: str = ""
+    date_sent: Optional[datetime] = None
+    summary: Optional[str] = None
+    billing_hours: Optional[float] = None
+    billing_description: Optional[str] = None
+    pushed_to_clio: Optional[bool] = None
+    owner: Optional[str] = None
+
+class StoredEmailList(BaseModel):
+    success: bool
+    emails: List[StoredEmail]
+
+class SummaryItem(BaseModel):
+    id: int
+    email_id: Optional[str] = None
+    subject: Optional[str] = None
+    summary: str
+    billing_hours: float
+    billing_description: str
+    date_sent: Optional[datetime] = None
+    pushed_to_clio: Optional[bool] = None
+    owner: Optional[str] = None
+    billable: bool = True
+    filter_rule: Optional[str] = None
+    matter_id: Optional[str] = None
+    exclude_from_push: bool = False
+    updated_at: Optional[datetime] = None
+
+class SummaryList(BaseModel):
+    success: bool
+    summaries: List[SummaryItem]
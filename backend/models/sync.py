@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean
+from datetime import datetime
+
+from .email import Base
+
+class GmailSyncState(Base):
+    """Incremental sync position and push watch of a mailbox"""
+    __tablename__ = "gmail_sync_state"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    mailbox = Column(String, unique=True, index=True, default="me")
+    # Address the watch was started for; notifications for any other mailbox are ignored
+    email_address = Column(String, nullable=True)
+    history_id = Column(String, nullable=True)
+    watch_expiration = Column(DateTime, nullable=True)
+    last_synced_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class GmailAccount(Base):
+    """OAuth credentials of a connected mailbox, keyed by its address"""
+    __tablename__ = "gmail_accounts"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    owner = Column(String, unique=True, index=True, nullable=False)
+    credentials = Column(Text, nullable=False)
+    active = Column(Boolean, default=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+import logging
+
+from ..core.config import settings
+from ..core.profiling import profile_sampler, token_matches
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+def _require_token(token: Optional[str]) -> None:
+    if not token_matches(token, settings.profile_token):
+        raise HTTPException(status_code=403, detail="A valid X-Profile-Token header is required")
+
+@router.get("/profiles")
+async def list_profiles(x_profile_token: Optional[str] = Header(None)):
+    """Most recent request profiles, newest first"""
+    _require_token(x_profile_token)
+    return {
+        "success": True,
+        "interval_ms": settings.profile_interval_ms,
+        "profiles": [profile.to_dict() for profile in profile_sampler.recent()]
+    }
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: int, x_profile_token: Optional[str] = Header(None)):
+    """Timing breakdown and hottest stacks for one profile"""
+    _require_token(x_profile_token)
+    profile = profile_sampler.get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    return {
+        "success": True,
+        "profile": profile.to_dict(),
+        "top_stacks": [
+            {"stack": stack, "samples": count}
+            for stack, count in profile.stacks.most_common(20)
+        ]
+    }
+
+@router.get("/profiles/{profile_id}/folded", response_class=PlainTextResponse)
+async def get_profile_folded(profile_id: int, x_profile_token: Optional[str] = Header(None)):
+    """Folded stacks, ready for flamegraph.pl or speedscope"""
+    _require_token(x_profile_token)
+    profile = profile_sampler.get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    return profile.folded()
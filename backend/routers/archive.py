@@ -0,0 +1,58 @@
+from fastapi import APIRouter, HTTPException, Depends
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+import logging
+
+from ..core.database import get_db
+from ..services.archive_service import archive_service
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+class ArchiveRun(BaseModel):
+    # Caps the rows moved by this run; unset moves everything due
+    limit: Optional[int] = None
+
+class RestoreRequest(BaseModel):
+    email_ids: List[int]
+
+@router.get("/status")
+async def get_archive_status(db: Session = Depends(get_db)):
+    """Live and archived row counts, rows due for archival and the last run"""
+    try:
+        return {"success": True, **archive_service.status(db)}
+
+    except Exception as e:
+        logger.error(f"Archive status error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/run")
+async def run_archive(request: Optional[ArchiveRun] = None, db: Session = Depends(get_db)):
+    """Move pushed and aged emails to the archive now"""
+    try:
+        limit = request.limit if request else None
+        archived = await run_in_threadpool(archive_service.archive, db.get_bind(), None, limit)
+
+        return {"success": True, "archived": archived}
+
+    except Exception as e:
+        logger.error(f"Archive run error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/restore")
+async def restore_archived(request: RestoreRequest, db: Session = Depends(get_db)):
+    """Move archived emails back to the live table so they can be edited or pushed"""
+    try:
+        restored = await run_in_threadpool(archive_service.restore, db.get_bind(), request.email_ids)
+
+        return {
+            "success": True,
+            "restored": restored,
+            "not_archived": sorted(set(request.email_ids) - set(restored))
+        }
+
+    except Exception as e:
+        logger.error(f"Archive restore error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
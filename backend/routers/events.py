@@ -0,0 +1,84 @@
+from fastapi import APIRouter, Header, Request
+from fastapi.responses import StreamingResponse
+from typing import Dict, Optional
+import asyncio
+import logging
+import orjson
+
+from ..core.events import change_feed
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_SECONDS = 15
+
+def _format_event(record: Dict) -> bytes:
+    return b"id: %d\nevent: change\ndata: %s\n\n" % (record["seq"], orjson.dumps(record))
+
+def _format_reset(seq: int) -> bytes:
+    # Clients must refetch the list endpoints, then apply changes after seq
+    return b"id: %d\nevent: reset\ndata: %s\n\n" % (seq, orjson.dumps({"seq": seq}))
+
+@router.get("")
+async def stream_events(
+    request: Request,
+    since: Optional[int] = None,
+    last_event_id: Optional[str] = Header(None)
+):
+    """Server-sent change feed for emails and summaries.
+    
+    Resumes after `since`, or after the Last-Event-ID header browsers send
+    on reconnect. A `reset` event means the requested position is no
+    longer available and the client should reload its lists.
+    """
+    if since is None and last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+    
+    async def stream():
+        # Subscribe before reading history so nothing published in between is lost
+        queue = change_feed.subscribe()
+        sent = set()
+        try:
+            yield b"retry: 3000\n\n"
+            
+            if since is None:
+                last_seq = change_feed.last_seq
+                yield b"event: ready\ndata: %s\n\n" % orjson.dumps({"seq": last_seq})
+            else:
+                backlog = change_feed.since(since)
+                if backlog is None:
+                    last_seq = change_feed.last_seq
+                    yield _format_reset(last_seq)
+                else:
+                    last_seq = since
+                    for record in backlog:
+                        yield _format_event(record)
+                        sent.add(record["seq"])
+                        last_seq = record["seq"]
+            
+            while not await request.is_disconnected():
+                try:
+                    record = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                
+                if record is None:
+                    last_seq = change_feed.last_seq
+                    yield _format_reset(last_seq)
+                elif record["seq"] not in sent:
+                    # A late-committed record can arrive below last_seq;
+                    # the set only skips what the backlog already sent
+                    yield _format_event(record)
+                    sent.add(record["seq"])
+                    last_seq = max(last_seq, record["seq"])
+                    if len(sent) > 10000:
+                        sent = {seq for seq in sent if seq > last_seq - 1000}
+        finally:
+            change_feed.unsubscribe(queue)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
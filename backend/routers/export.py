@@ -0,0 +1,69 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from datetime import date
+from typing import Optional
+import logging
+
+from ..services.export_service import ExportFilters, ExportService
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+def _filters(start: Optional[str], end: Optional[str], matter_id: Optional[str], pushed: Optional[bool], include_archived: bool) -> ExportFilters:
+    try:
+        return ExportFilters.parse(start, end, matter_id=matter_id, pushed=pushed, include_archived=include_archived)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Dates must be YYYY-MM-DD: {e}")
+
+def _attachment(name: str) -> dict:
+    return {"Content-Disposition": f'attachment; filename="{name}"', "Cache-Control": "no-cache"}
+
+@router.get("/csv")
+async def export_csv(
+    start: Optional[str] = Query(None, description="First day (YYYY-MM-DD)"),
+    end: Optional[str] = Query(None, description="Last day (YYYY-MM-DD)"),
+    matter_id: Optional[str] = Query(None, description="One matter; UNASSIGNED for entries without one"),
+    pushed: Optional[bool] = Query(None, description="Only entries pushed (true) or not yet pushed (false) to Clio"),
+    include_archived: bool = True
+):
+    """Billable time entries as CSV, streamed"""
+    filters = _filters(start, end, matter_id, pushed, include_archived)
+    try:
+        export_service = ExportService()
+        
+        return StreamingResponse(
+            export_service.csv_chunks(filters),
+            media_type="text/csv",
+            headers=_attachment(f"time-entries-{date.today():%Y%m%d}.csv")
+        )
+    
+    except Exception as e:
+        logger.error(f"CSV export error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/ledes")
+async def export_ledes(
+    start: Optional[str] = Query(None, description="First day (YYYY-MM-DD)"),
+    end: Optional[str] = Query(None, description="Last day (YYYY-MM-DD)"),
+    matter_id: Optional[str] = Query(None, description="One matter; UNASSIGNED for entries without one"),
+    pushed: Optional[bool] = Query(None, description="Only entries pushed (true) or not yet pushed (false) to Clio"),
+    include_archived: bool = True,
+    invoice_number: Optional[str] = Query(None, description="Defaults to INV-<today>; suffixed -N per matter"),
+    client_id: str = "",
+    rate: Optional[float] = Query(None, ge=0, description="Hourly rate; defaults to LEDES_HOURLY_RATE")
+):
+    """Billable time entries as a LEDES 1998B file with one invoice per matter, streamed"""
+    filters = _filters(start, end, matter_id, pushed, include_archived)
+    try:
+        export_service = ExportService()
+        invoice_number = invoice_number or f"INV-{date.today():%Y%m%d}"
+        
+        return StreamingResponse(
+            export_service.ledes_chunks(filters, invoice_number, client_id=client_id, rate=rate),
+            media_type="text/plain",
+            headers=_attachment(f"{invoice_number}.txt")
+        )
+    
+    except Exception as e:
+        logger.error(f"LEDES export error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
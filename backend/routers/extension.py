@@ -1,9 +1,44 @@
 from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
 import logging
 
+from ..services.ingest_service import ingest_buffer
+
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+class CapturedEmail(BaseModel):
+    id: str = Field(..., min_length=1, description="Gmail message id")
+    thread_id: Optional[str] = None
+    subject: str = ""
+    sender: str = ""
+    recipient: str = ""
+    body: str = ""
+    date_sent: Optional[datetime] = None
+    source: str = "chrome_extension"
+
+class CaptureBatch(BaseModel):
+    emails: List[CapturedEmail] = Field(..., min_length=1, max_length=500)
+
+def _to_record(captured: CapturedEmail) -> dict:
+    """Convert a capture into the email dict shape GmailService produces"""
+    date_sent = captured.date_sent
+    if date_sent and date_sent.tzinfo:
+        # Stored dates are naive local time, like parse_email_date() returns
+        date_sent = date_sent.astimezone().replace(tzinfo=None)
+    
+    return {
+        "id": captured.id,
+        "thread_id": captured.thread_id,
+        "subject": captured.subject,
+        "sender": captured.sender,
+        "recipient": captured.recipient,
+        "body": captured.body,
+        "date_sent": date_sent
+    }
+
 @router.get("/status")
 async def extension_status():
     """Check extension status"""
@@ -12,26 +47,47 @@ async def extension_status():
         "message": "Extension API is running",
         "endpoints": {
             "capture": "/api/extension/capture",
+            "capture_batch": "/api/extension/capture/batch",
             "status": "/api/extension/status"
         }
     }
 
 @router.post("/capture")
-async def capture_email(email_data: dict):
+async def capture_email(email_data: CapturedEmail):
     """Capture email from Chrome extension"""
     try:
-        # Process email data from extension
-        logger.info(f"Received email from extension: {email_data.get('subject', 'No subject')}")
+        logger.info(f"Received email from extension: {email_data.subject or 'No subject'}")
         
-        # Here you would process and store the email
-        # This is a placeholder for the actual implementation
+        outcomes = await ingest_buffer.submit([_to_record(email_data)])
         
         return {
             "success": True,
             "message": "Email captured successfully",
-            "email_id": email_data.get("id")
+            "email_id": email_data.id,
+            "status": outcomes[0]["status"]
         }
     
     except Exception as e:
         logger.error(f"Extension capture error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/capture/batch")
+async def capture_email_batch(batch: CaptureBatch):
+    """Capture many emails from Chrome extension in one request"""
+    try:
+        logger.info(f"Received {len(batch.emails)} emails from extension")
+        
+        outcomes = await ingest_buffer.submit([_to_record(email) for email in batch.emails])
+        captured = sum(1 for outcome in outcomes if outcome["status"] == "created")
+        
+        return {
+            "success": True,
+            "message": f"Captured {captured} emails",
+            "captured": captured,
+            "duplicates": len(outcomes) - captured,
+            "results": outcomes
+        }
+    
+    except Exception as e:
+        logger.error(f"Extension batch capture error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,12 +1,19 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
+import hmac
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import logging
 from datetime import datetime, timedelta
 
 from ..core.database import get_db
+from ..core.cache import conditional_json, table_etag
 from ..services.gmail_service import GmailService
+from ..services.ingest_service import IngestService
+from ..services.push_service import push_service
+from ..core.config import settings
+from ..services.listing_service import ListingService
 from ..models.email import Email
+from ..models.schemas import StoredEmailList
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -48,35 +55,19 @@ async def fetch_emails(
             max_results=max_results
         )
         
-        # Store emails in database
-        new_emails = 0
-        stored_emails = []
+        # Store emails in database, skipping ones already stored
+        ingest_service = IngestService()
+        result = ingest_service.store_emails(db, emails)
         
+        stored_emails = []
         for email_data in emails:
-            # Check if email already exists
-            existing_email = db.query(Email).filter(Email.gmail_id == email_data["id"]).first()
-            
-            if not existing_email:
-                email = Email(
-                    gmail_id=email_data["id"],
-                    subject=email_data.get("subject", ""),
-                    sender=email_data.get("sender", ""),
-                    recipient=email_data.get("recipient", ""),
-                    body=email_data.get("body", ""),
-                    date_sent=email_data.get("date_sent"),
-                    thread_id=email_data.get("thread_id")
-                )
-                db.add(email)
-                new_emails += 1
-            else:
-                email = existing_email
-            
+            email = result["emails"][email_data["id"]]
             stored_emails.append({
                 "id": email.gmail_id,
                 "subject": email.subject,
                 "sender": email.sender,
                 "recipient": email.recipient,
-                "body": email.body,
+                "body": email_data.get("body", ""),
                 "date_sent": email.date_sent.isoformat() if email.date_sent else None,
                 "summary": email.summary,
                 "pushed_to_clio": email.pushed_to_clio
@@ -87,7 +78,7 @@ async def fetch_emails(
         return {
             "success": True,
             "emails_fetched": len(emails),
-            "new_emails": new_emails,
+            "new_emails": len(result["new_ids"]),
             "emails": stored_emails
         }
     
@@ -95,29 +86,62 @@ async def fetch_emails(
         logger.error(f"Email fetch error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/emails/stored")
-async def get_stored_emails(db: Session = Depends(get_db)):
-    """Get stored emails from database"""
+@router.get("/emails/stored", response_model=StoredEmailList)
+async def get_stored_emails(request: Request, owner: Optional[str] = None, db: Session = Depends(get_db)):
+    """Get stored emails from database, or those of one mailbox owner"""
     try:
-        emails = db.query(Email).order_by(Email.date_sent.desc()).all()
-        
-        email_list = []
-        for email in emails:
-            email_list.append({
-                "id": email.gmail_id,
-                "subject": email.subject,
-                "sender": email.sender,
-                "recipient": email.recipient,
-                "body": email.body,
-                "date_sent": email.date_sent.isoformat() if email.date_sent else None,
-                "summary": email.summary,
-                "billing_hours": email.billing_hours,
-                "billing_description": email.billing_description,
-                "pushed_to_clio": email.pushed_to_clio
-            })
+        etag = table_etag(db, f"emails:{owner or ''}", Email, *([Email.owner == owner] if owner else []))
+        listing_service = ListingService()
         
-        return {"success": True, "emails": email_list}
+        return conditional_json(
+            request,
+            f"emails/stored:{owner or ''}",
+            etag,
+            lambda: {"success": True, "emails": listing_service.stored_emails(db, owner)}
+        )
     
     except Exception as e:
         logger.error(f"Error fetching stored emails: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/push")
+async def receive_push_notification(envelope: dict, token: Optional[str] = None):
+    """Receive a Gmail watch notification in the Pub/Sub push envelope format"""
+    if settings.gmail_push_token and not hmac.compare_digest(token or "", settings.gmail_push_token):
+        raise HTTPException(status_code=403, detail="Invalid push token")
+    
+    try:
+        notification = push_service.decode_envelope(envelope)
+    except Exception as e:
+        # Acknowledge anyway: Pub/Sub would redeliver a malformed message forever
+        logger.warning(f"Ignoring malformed Gmail push envelope: {e}")
+        return {"success": False, "message": str(e)}
+    
+    if not await push_service.is_own_mailbox(notification["email_address"]):
+        # Acknowledged too; history ids of another mailbox mean nothing here
+        logger.warning(f"Ignoring Gmail push for {notification['email_address']}, not the synced mailbox")
+        return {"success": False, "message": "Notification is for another mailbox"}
+    
+    push_service.notify(notification["history_id"])
+    return {"success": True, "history_id": notification["history_id"]}
+
+@router.get("/push/status")
+async def get_push_status():
+    """Get Gmail push notification counters"""
+    return {"success": True, **push_service.status()}
+
+@router.post("/watch")
+async def start_watch():
+    """Start or renew the Gmail watch on the configured Pub/Sub topic"""
+    try:
+        watch = await push_service.renew_watch()
+        
+        return {
+            "success": True,
+            "history_id": watch["history_id"],
+            "expiration": watch["expiration"].isoformat()
+        }
+    
+    except Exception as e:
+        logger.error(f"Gmail watch error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
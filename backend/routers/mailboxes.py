@@ -0,0 +1,97 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import RedirectResponse
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional, Set
+import asyncio
+import logging
+
+from ..services.mailbox_service import MailboxService
+from ..services.mailbox_sync_service import mailbox_sync_service
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# The event loop only keeps weak references to tasks
+_background_tasks: Set[asyncio.Task] = set()
+
+def _start_background(coroutine) -> None:
+    task = asyncio.create_task(coroutine)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_done)
+
+def _background_done(task: asyncio.Task) -> None:
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Background mailbox sync failed: {task.exception()}")
+
+@router.get("")
+async def list_mailboxes():
+    """Connected mailboxes and when each was last synced"""
+    try:
+        accounts = await run_in_threadpool(MailboxService().list_accounts)
+        return {"success": True, "mailboxes": accounts}
+
+    except Exception as e:
+        logger.error(f"Error listing mailboxes: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/auth")
+async def get_auth_url():
+    """Get the Google OAuth URL an attorney opens to connect their mailbox"""
+    try:
+        return {"auth_url": MailboxService().authorization_url()}
+
+    except Exception as e:
+        logger.error(f"Mailbox auth URL error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/callback")
+async def oauth_callback(code: str = None, state: str = None, error: str = None):
+    """Handle the Google OAuth callback and store the mailbox credentials"""
+    if error or not code:
+        logger.error(f"Mailbox OAuth error: {error or 'no code'}")
+        return RedirectResponse(url=f"/?mailbox_error={error or 'no_code'}")
+
+    try:
+        owner = await run_in_threadpool(MailboxService().complete_authorization, code, state)
+        return RedirectResponse(url=f"/?mailbox_connected={owner}")
+
+    except Exception as e:
+        logger.error(f"Mailbox OAuth callback error: {e}")
+        return RedirectResponse(url=f"/?mailbox_error={str(e)}")
+
+@router.delete("/{owner}")
+async def disconnect_mailbox(owner: str):
+    """Stop syncing a mailbox; emails already synced are kept"""
+    try:
+        if not await run_in_threadpool(MailboxService().deactivate, owner):
+            raise HTTPException(status_code=404, detail="Mailbox not found")
+        return {"success": True, "message": f"Mailbox {owner} disconnected"}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error disconnecting mailbox {owner}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/sync")
+async def sync_mailboxes(owners: Optional[List[str]] = Query(None), wait: bool = False):
+    """Sync every connected mailbox, or the listed ones"""
+    try:
+        if mailbox_sync_service.running:
+            return {"success": False, "message": "Mailbox sync is already running"}
+
+        if wait:
+            return await mailbox_sync_service.run_once(owners)
+
+        _start_background(mailbox_sync_service.run_once(owners))
+        return {"success": True, "message": "Mailbox sync started"}
+
+    except Exception as e:
+        logger.error(f"Mailbox sync error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/sync/status")
+async def get_sync_status():
+    """Per-mailbox progress, quota use and throttling of the current or last run"""
+    return {"success": True, **mailbox_sync_service.status()}
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, HTTPException
+import asyncio
+from typing import Set
+import logging
+
+from ..services.pipeline_service import pipeline_service
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# The event loop only keeps weak references to tasks
+_background_tasks: Set[asyncio.Task] = set()
+
+def _start_background(coroutine) -> None:
+    task = asyncio.create_task(coroutine)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_done)
+
+def _background_done(task: asyncio.Task) -> None:
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Background pipeline run failed: {task.exception()}")
+
+@router.post("/run")
+async def run_pipeline(wait: bool = False):
+    """Run fetch -> prepare -> summarize -> push once"""
+    try:
+        if pipeline_service.running:
+            return {"success": False, "message": "Pipeline is already running"}
+        
+        if wait:
+            return await pipeline_service.run_once()
+        
+        _start_background(pipeline_service.run_once())
+        return {"success": True, "message": "Pipeline run started"}
+    
+    except Exception as e:
+        logger.error(f"Pipeline run error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/status")
+async def get_pipeline_status():
+    """Per-stage counters, queue depth and throughput"""
+    return {"success": True, **pipeline_service.status()}
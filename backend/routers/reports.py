@@ -0,0 +1,76 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+import logging
+
+from ..core.database import get_db
+from ..services.ledger_service import LedgerService
+from ..services.rollup_service import RollupService
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+@router.get("/billing")
+async def get_billing_report(
+    group_by: str = Query("day", pattern="^(day|week|domain|thread|matter|owner)$"),
+    start: Optional[str] = Query(None, description="First day (YYYY-MM-DD) or week (YYYY-Www)"),
+    end: Optional[str] = Query(None, description="Last day (YYYY-MM-DD) or week (YYYY-Www)"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """Billing hours and entry counts grouped by day, week, sender domain, thread, matter or mailbox owner"""
+    try:
+        rollup_service = RollupService()
+        report = rollup_service.report(db, group_by, start=start, end=end, limit=limit)
+        
+        return {"success": True, **report}
+    
+    except Exception as e:
+        logger.error(f"Billing report error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/billing/rebuild")
+async def rebuild_billing_rollups(db: Session = Depends(get_db)):
+    """Recompute billing rollups from the emails table"""
+    try:
+        rollup_service = RollupService()
+        counted = rollup_service.rebuild(db.get_bind())
+        
+        return {"success": True, "summaries_counted": counted}
+    
+    except Exception as e:
+        logger.error(f"Billing rollup rebuild error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/costs")
+async def get_cost_report(
+    group_by: str = Query("day", pattern="^(day|model|matter|owner|source)$"),
+    start: Optional[str] = Query(None, description="First day (YYYY-MM-DD)"),
+    end: Optional[str] = Query(None, description="Last day (YYYY-MM-DD)"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """Summarization attempts, tokens, OpenAI cost, latency and cache hits grouped by day, model, matter, owner or source"""
+    try:
+        ledger_service = LedgerService()
+        report = ledger_service.report(db, group_by, start=start, end=end, limit=limit)
+        
+        return {"success": True, **report}
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Cost report error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/costs/emails/{email_id}")
+async def get_email_costs(email_id: int, db: Session = Depends(get_db)):
+    """Every summarization attempt of one email with its tokens, cost and latency"""
+    try:
+        ledger_service = LedgerService()
+        
+        return {"success": True, "email_id": email_id, "attempts": ledger_service.attempts(db, email_id)}
+    
+    except Exception as e:
+        logger.error(f"Email cost ledger error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
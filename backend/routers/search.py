@@ -0,0 +1,27 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy.orm import Session
+import logging
+
+from ..core.database import get_db
+from ..services.search_service import SearchService
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+@router.get("")
+async def search_emails(
+    q: str = Query(..., min_length=1),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """Search emails and summaries by subject, sender, body and summary"""
+    try:
+        search_service = SearchService()
+        result = search_service.search(db, q, page=page, page_size=page_size)
+        
+        return {"success": True, "query": q, **result}
+    
+    except Exception as e:
+        logger.error(f"Search error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,19 +1,59 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from typing import Dict, List, Optional
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 import logging
+import orjson
 
+from ..core.config import settings
 from ..core.database import get_db
+from ..core.cache import conditional_json, table_etag
+from ..core.events import publish_on_commit
+from ..services.bulk_edit_service import MAX_BULK_ITEMS, BulkEditService
+from ..services.model_router import model_router
 from ..services.summarizer_service import SummarizerService
+from ..services.rollup_service import RollupService
+from ..services.listing_service import ListingService
+from ..models.archive import ArchivedEmail
 from ..models.email import Email
+from ..models.schemas import SummaryList
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+HEARTBEAT_SECONDS = 15
+
+def _format_ndjson(record: Dict) -> bytes:
+    return orjson.dumps(record) + b"\n"
+
+def _format_sse(record: Dict) -> bytes:
+    if record["type"] == "heartbeat":
+        return b": keep-alive\n\n"
+    return b"event: %s\ndata: %s\n\n" % (record["type"].encode(), orjson.dumps(record))
+
 class SummaryUpdate(BaseModel):
     billing_hours: float
     billing_description: str
     summary: str
+    # Overrides the pre-filter, e.g. to bill mail it marked non-billable
+    billable: Optional[bool] = None
+
+class SummaryPatch(BaseModel):
+    id: int
+    # updated_at from the listing the reviewer edited; a newer row is a conflict
+    expected_updated_at: Optional[datetime] = None
+    summary: Optional[str] = None
+    billing_hours: Optional[float] = Field(None, ge=0)
+    billing_description: Optional[str] = None
+    matter_id: Optional[str] = None
+    exclude_from_push: Optional[bool] = None
+
+class BulkSummaryPatch(BaseModel):
+    updates: List[SummaryPatch] = Field(..., min_length=1, max_length=MAX_BULK_ITEMS)
+    # Apply nothing unless every update can be applied
+    all_or_nothing: bool = False
 
 @router.post("/generate")
 async def generate_summaries(db: Session = Depends(get_db)):
@@ -25,6 +65,10 @@ async def generate_summaries(db: Session = Depends(get_db)):
         return {
             "success": result.get("success", False),
             "summaries_generated": result.get("summaries_generated", 0),
+            "filtered": result.get("filtered", 0),
+            "filtered_by_rule": result.get("filtered_by_rule", {}),
+            "reused": result.get("reused", 0),
+            "by_model": result.get("by_model", {}),
             "errors": result.get("errors", []),
             "message": result.get("message", "")
         }
@@ -33,31 +77,96 @@ async def generate_summaries(db: Session = Depends(get_db)):
         logger.error(f"Summary generation error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/summaries")
-async def get_summaries(db: Session = Depends(get_db)):
-    """Get all generated summaries"""
+@router.post("/generate/stream")
+async def stream_summaries(
+    request: Request,
+    format: Optional[str] = None,
+    limit: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """Generate summaries, streaming one record per email as each completes.
+    
+    NDJSON by default; server-sent events with `format=sse` or an
+    `Accept: text/event-stream` header. POST only, read with fetch:
+    every request starts a new run, so an EventSource reconnecting with
+    GET would start summarizing again. Records are `start`, `result` (summary, hours, elapsed_ms, error),
+    `heartbeat` while a slow batch is in flight, and `done` with totals.
+    """
     try:
-        emails = db.query(Email).filter(Email.summary.isnot(None)).order_by(Email.date_sent.desc()).all()
-        
-        summaries = []
-        for email in emails:
-            summaries.append({
-                "id": email.id,
-                "email_id": email.gmail_id,
-                "subject": email.subject,
-                "summary": email.summary,
-                "billing_hours": email.billing_hours or 0.25,
-                "billing_description": email.billing_description or "",
-                "date_sent": email.date_sent.isoformat() if email.date_sent else None,
-                "pushed_to_clio": email.pushed_to_clio
-            })
+        query = db.query(Email.id).filter(Email.summary.is_(None)).order_by(Email.id)
+        if limit:
+            query = query.limit(limit)
+        email_ids = [email_id for email_id, in query]
+    
+    except Exception as e:
+        logger.error(f"Summary stream error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    use_sse = format == "sse" or (format is None and "text/event-stream" in request.headers.get("accept", ""))
+    formatter = _format_sse if use_sse else _format_ndjson
+    summarizer_service = SummarizerService()
+    
+    async def stream():
+        async for record in summarizer_service.stream_summaries(
+            email_ids,
+            concurrency=settings.summarizer_stream_concurrency,
+            heartbeat_seconds=HEARTBEAT_SECONDS
+        ):
+            yield formatter(record)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream" if use_sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/models")
+async def get_model_routing():
+    """Routing thresholds and per-model calls, tokens, cost and latency in this worker"""
+    return {"success": True, **model_router.status()}
+
+@router.get("/summaries", response_model=SummaryList)
+async def get_summaries(request: Request, owner: Optional[str] = None, db: Session = Depends(get_db)):
+    """Get all generated summaries, or those of one mailbox owner"""
+    try:
+        criteria = [Email.summary.isnot(None)] + ([Email.owner == owner] if owner else [])
+        etag = table_etag(db, f"summaries:{owner or ''}", Email, *criteria)
+        listing_service = ListingService()
         
-        return {"success": True, "summaries": summaries}
+        return conditional_json(
+            request,
+            f"summaries:{owner or ''}",
+            etag,
+            lambda: {"success": True, "summaries": listing_service.summaries(db, owner)}
+        )
     
     except Exception as e:
         logger.error(f"Error fetching summaries: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.patch("/summaries")
+async def bulk_update_summaries(request: BulkSummaryPatch, db: Session = Depends(get_db)):
+    """Apply many partial summary edits in one transaction, with a result per update.
+    
+    Only the fields sent are changed. Each result has a status of updated,
+    unchanged, conflict (the row changed since expected_updated_at),
+    not_found, archived, invalid or not_applied, and the row's updated_at
+    for the next edit.
+    """
+    try:
+        bulk_edit_service = BulkEditService()
+        result = bulk_edit_service.apply(
+            db,
+            [update.model_dump(exclude_unset=True) for update in request.updates],
+            all_or_nothing=request.all_or_nothing
+        )
+        
+        return {"success": result["failed"] == 0, **result}
+    
+    except Exception as e:
+        logger.error(f"Error bulk updating summaries: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.put("/summaries/{summary_id}")
 async def update_summary(
     summary_id: int,
@@ -69,16 +178,32 @@ async def update_summary(
         email = db.query(Email).filter(Email.id == summary_id).first()
         
         if not email:
+            if db.get(ArchivedEmail, summary_id):
+                raise HTTPException(status_code=409, detail="Summary is archived; restore it with /api/archive/restore first")
             raise HTTPException(status_code=404, detail="Summary not found")
         
+        rollup_service = RollupService()
+        before = rollup_service.snapshot(email)
+        
         email.billing_hours = summary_update.billing_hours
         email.billing_description = summary_update.billing_description
         email.summary = summary_update.summary
+        if summary_update.billable is not None:
+            email.billable = summary_update.billable
         
+        rollup_service.apply(db, before, rollup_service.snapshot(email))
+        publish_on_commit(db, "email", email.id, "updated", {
+            "summary": email.summary,
+            "billing_hours": email.billing_hours,
+            "billing_description": email.billing_description,
+            "billable": email.billable,
+        })
         db.commit()
         
         return {"success": True, "message": "Summary updated successfully"}
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error updating summary: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,147 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import bindparam, delete, func, or_, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, selectinload
+from starlette.concurrency import run_in_threadpool
+import logging
+
+from ..core.config import settings
+from ..models.archive import ArchivedEmail
+from ..models.email import Email
+from .search_service import SearchService
+
+logger = logging.getLogger(__name__)
+
+# Full-text columns the search triggers maintain on Postgres, moved along with each row
+POSTGRES_SEARCH_COLUMNS = ("search_vector", "body_vector")
+
+class ArchiveService:
+    """Moves pushed and aged emails from the live table to emails_archive.
+
+    Entries pushed to Clio more than pushed_after_days ago, and any mail
+    older than after_days, are copied with their ids and deleted from
+    emails one batch per transaction. Billing rollups keep counting them
+    and their full-text entries stay, so search and reports read through
+    to the archive; editing an archived email needs restore() first.
+    """
+
+    def __init__(self, pushed_after_days: int = 90, after_days: int = 365, batch_size: int = 500):
+        self.pushed_after_days = pushed_after_days
+        self.after_days = after_days
+        self.batch_size = batch_size
+        self.last_run: Optional[Dict] = None
+
+    def criteria(self, now: datetime) -> List:
+        """Filters selecting live emails due for archival"""
+        due = [Email.pushed_to_clio.is_(True) & (Email.date_sent < now - timedelta(days=self.pushed_after_days))]
+        if self.after_days > 0:
+            due.append(Email.date_sent < now - timedelta(days=self.after_days))
+        # SQLite hands out max(id) + 1 for new rows, so archiving the newest
+        # row would let the next insert reuse an archived id
+        return [or_(*due), Email.id < select(func.max(Email.id)).scalar_subquery()]
+
+    @staticmethod
+    def _columns(engine: Engine) -> str:
+        columns = [column.name for column in Email.__table__.columns]
+        if engine.dialect.name == "postgresql":
+            columns.extend(POSTGRES_SEARCH_COLUMNS)
+        return ", ".join(columns)
+
+    def archive(self, engine: Engine, now: Optional[datetime] = None, limit: Optional[int] = None) -> int:
+        """Move due emails to the archive; returns how many were moved"""
+        now = now or datetime.utcnow()
+        columns = self._columns(engine)
+        copy = text(
+            f"INSERT INTO emails_archive ({columns}, archived_at) "
+            f"SELECT {columns}, :archived_at FROM emails WHERE id IN :ids"
+        ).bindparams(bindparam("ids", expanding=True))
+        criteria = self.criteria(now)
+        started = datetime.utcnow()
+        moved = 0
+
+        while limit is None or moved < limit:
+            batch_size = self.batch_size if limit is None else min(self.batch_size, limit - moved)
+            with engine.begin() as conn:
+                ids = list(conn.execute(
+                    select(Email.id).where(*criteria).order_by(Email.id).limit(batch_size)
+                ).scalars())
+                if not ids:
+                    break
+                conn.execute(copy, {"ids": ids, "archived_at": now})
+                conn.execute(delete(Email.__table__).where(Email.id.in_(ids)))
+            moved += len(ids)
+
+        self.last_run = {
+            "started_at": started.isoformat(),
+            "seconds": round((datetime.utcnow() - started).total_seconds(), 3),
+            "archived": moved,
+        }
+        if moved:
+            logger.info(f"Archived {moved} emails")
+        return moved
+
+    def restore(self, engine: Engine, email_ids: List[int]) -> List[int]:
+        """Move archived emails back to the live table; returns the ids restored"""
+        if not email_ids:
+            return []
+        columns = self._columns(engine)
+        dialect = engine.dialect.name
+
+        with Session(bind=engine) as db:
+            ids = list(db.execute(
+                select(ArchivedEmail.id).where(ArchivedEmail.id.in_(email_ids))
+            ).scalars())
+            if not ids:
+                return []
+            expanding = bindparam("ids", expanding=True)
+            if dialect == "sqlite":
+                # The insert trigger indexes the row again; bodies are added back below
+                db.execute(text("DELETE FROM emails_fts WHERE rowid IN :ids").bindparams(expanding), {"ids": ids})
+            db.execute(
+                text(f"INSERT INTO emails ({columns}) SELECT {columns} FROM emails_archive WHERE id IN :ids")
+                .bindparams(expanding),
+                {"ids": ids}
+            )
+            db.execute(delete(ArchivedEmail.__table__).where(ArchivedEmail.id.in_(ids)))
+            if dialect == "sqlite":
+                emails = db.query(Email).options(selectinload(Email.content)).filter(Email.id.in_(ids)).all()
+                for email in emails:
+                    if email.content:
+                        SearchService.index_body(db, email.id, email.body)
+            db.commit()
+
+        logger.info(f"Restored {len(ids)} archived emails")
+        return ids
+
+    def status(self, db: Session) -> Dict:
+        now = datetime.utcnow()
+        live, oldest = db.query(func.count(Email.id), func.min(Email.date_sent)).one()
+        archived, newest_archived = db.query(func.count(ArchivedEmail.id), func.max(ArchivedEmail.date_sent)).one()
+        due = db.query(func.count(Email.id)).filter(*self.criteria(now)).scalar()
+        return {
+            "pushed_after_days": self.pushed_after_days,
+            "after_days": self.after_days or None,
+            "live": live,
+            "archived": archived,
+            "due": due,
+            "oldest_live": oldest.isoformat() if oldest else None,
+            "newest_archived": newest_archived.isoformat() if newest_archived else None,
+            "last_run": self.last_run,
+        }
+
+    async def run_scheduled(self, engine: Engine, interval_hours: float) -> None:
+        """Archive due emails every interval_hours until cancelled"""
+        while True:
+            try:
+                await run_in_threadpool(self.archive, engine)
+            except Exception as e:
+                logger.error(f"Scheduled archival failed: {e}")
+            await asyncio.sleep(interval_hours * 3600)
+
+archive_service = ArchiveService(
+    pushed_after_days=settings.archive_pushed_after_days,
+    after_days=settings.archive_after_days,
+    batch_size=settings.archive_batch_size
+)
@@ -6,6 +6,8 @@ from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 import logging
 
+from ..utils.file_lock import locked, write_pickle_atomic
+
 logger = logging.getLogger(__name__)
 
 class AuthService:
@@ -22,27 +24,27 @@ class AuthService:
         try:
             creds = None
             
-            # Load existing credentials
-            if os.path.exists(self.token_file):
-                with open(self.token_file, 'rb') as token:
-                    creds = pickle.load(token)
-            
-            # If no valid credentials, get new ones
-            if not creds or not creds.valid:
-                if creds and creds.expired and creds.refresh_token:
-                    creds.refresh(Request())
-                else:
-                    if not os.path.exists(self.credentials_file):
-                        logger.error(f"Credentials file not found: {self.credentials_file}")
-                        return None
-                    
-                    flow = InstalledAppFlow.from_client_secrets_file(
-                        self.credentials_file, self.GMAIL_SCOPES)
-                    creds = flow.run_local_server(port=0)
+            with locked(self.token_file):
+                # Load existing credentials
+                if os.path.exists(self.token_file):
+                    with open(self.token_file, 'rb') as token:
+                        creds = pickle.load(token)
                 
-                # Save credentials
-                with open(self.token_file, 'wb') as token:
-                    pickle.dump(creds, token)
+                # If no valid credentials, get new ones
+                if not creds or not creds.valid:
+                    if creds and creds.expired and creds.refresh_token:
+                        creds.refresh(Request())
+                    else:
+                        if not os.path.exists(self.credentials_file):
+                            logger.error(f"Credentials file not found: {self.credentials_file}")
+                            return None
+                        
+                        flow = InstalledAppFlow.from_client_secrets_file(
+                            self.credentials_file, self.GMAIL_SCOPES)
+                        creds = flow.run_local_server(port=0)
+                    
+                    # Save credentials
+                    write_pickle_atomic(self.token_file, creds)
             
             return creds
         
@@ -0,0 +1,154 @@
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import Session
+import logging
+
+from ..core.events import publish_on_commit
+from ..models.archive import ArchivedEmail
+from ..models.email import Email
+from .rollup_service import RollupService
+
+logger = logging.getLogger(__name__)
+
+# Fields a bulk edit may change, in the order results report them
+EDITABLE_FIELDS = ("summary", "billing_hours", "billing_description", "matter_id", "exclude_from_push")
+
+# Everything but matter_id has to keep a value
+REQUIRED_FIELDS = ("summary", "billing_hours", "billing_description", "exclude_from_push")
+
+# Keeps the id list of one request under SQLite's bound-parameter limit
+MAX_BULK_ITEMS = 500
+
+def _utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    """Stored timestamps are naive UTC; clients may send an offset"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+class BulkEditService:
+    """Applies many partial summary edits in one transaction.
+
+    Each item names an email, the fields to change and optionally the
+    updated_at the reviewer last saw. Items are checked against the
+    current rows, then written with one UPDATE per distinct set of
+    fields, each guarded by updated_at, so an edit saved by someone else
+    in the meantime is reported as a conflict instead of overwritten.
+    """
+
+    def __init__(self):
+        self.rollup_service = RollupService()
+
+    def apply(self, db: Session, items: List[Dict], all_or_nothing: bool = False) -> Dict:
+        """Apply the items and report an outcome per item, in request order.
+
+        Items are dicts with "id", optionally "expected_updated_at", and
+        the EDITABLE_FIELDS to change. With all_or_nothing, a single
+        failed item leaves every row untouched.
+        """
+        if len(items) > MAX_BULK_ITEMS:
+            raise ValueError(f"At most {MAX_BULK_ITEMS} updates per request")
+
+        ids = [item["id"] for item in items]
+        # Row locks on Postgres; SQLite conflicts are caught by the updated_at guard
+        rows = {email.id: email for email in db.query(Email).filter(Email.id.in_(ids)).with_for_update()}
+        missing = set(ids) - set(rows)
+        archived = set(db.execute(
+            select(ArchivedEmail.id).where(ArchivedEmail.id.in_(missing))
+        ).scalars()) if missing else set()
+
+        results: List[Dict] = []
+        accepted = []
+        seen = set()
+        for item in items:
+            email_id = item["id"]
+            email = rows.get(email_id)
+            changes = {field: item[field] for field in EDITABLE_FIELDS if field in item}
+            expected = _utc_naive(item.get("expected_updated_at"))
+            nulled = [field for field in REQUIRED_FIELDS if field in changes and changes[field] is None]
+
+            if email_id in seen:
+                result = {"id": email_id, "status": "invalid", "detail": "Listed more than once"}
+            elif email is None:
+                result = {"id": email_id, "status": "archived" if email_id in archived else "not_found"}
+            elif nulled:
+                result = {"id": email_id, "status": "invalid", "detail": f"{', '.join(nulled)} can't be null"}
+            elif expected is not None and email.updated_at != expected:
+                result = {"id": email_id, "status": "conflict", "updated_at": email.updated_at}
+            elif not changes:
+                result = {"id": email_id, "status": "unchanged", "updated_at": email.updated_at}
+            else:
+                result = {"id": email_id, "status": "pending"}
+                accepted.append((email, changes, email.updated_at, result))
+            seen.add(email_id)
+            results.append(result)
+
+        failed = sum(result["status"] not in ("pending", "unchanged") for result in results)
+        if all_or_nothing and failed:
+            db.rollback()
+            for _, _, _, result in accepted:
+                result["status"] = "not_applied"
+            return self._summary(results, applied=False)
+
+        if accepted:
+            self._write(db, accepted)
+        if all_or_nothing and any(result["status"] == "conflict" for _, _, _, result in accepted):
+            db.rollback()
+            for _, _, _, result in accepted:
+                if result["status"] == "updated":
+                    result.update(status="not_applied", updated_at=None)
+            return self._summary(results, applied=False)
+
+        db.commit()
+        summary = self._summary(results, applied=True)
+        logger.info(f"Bulk edit updated {summary['updated']} of {len(items)} summaries")
+        return summary
+
+    def _write(self, db: Session, accepted: List) -> None:
+        """Set-based updates, then rollups and change events for the rows written"""
+        now = datetime.utcnow()
+        befores = {email.id: self.rollup_service.snapshot(email) for email, _, _, _ in accepted}
+
+        groups: Dict[tuple, List[Dict]] = defaultdict(list)
+        for email, changes, expected, _ in accepted:
+            groups[tuple(sorted(changes))].append({"_id": email.id, "_expected": expected, **changes})
+
+        table = Email.__table__
+        for fields, params in groups.items():
+            statement = (
+                update(table)
+                .where(table.c.id == bindparam("_id"), table.c.updated_at == bindparam("_expected"))
+                .values({**{field: bindparam(field) for field in fields}, "updated_at": now})
+            )
+            db.execute(statement, params)
+
+        # Rows whose updated_at isn't ours were saved by someone else between the read and the write
+        refreshed = {
+            email.id: email
+            for email in db.query(Email).populate_existing().filter(Email.id.in_(list(befores)))
+        }
+        changed = []
+        for _, changes, _, result in accepted:
+            email = refreshed[result["id"]]
+            if email.updated_at != now:
+                result.update(status="conflict", updated_at=email.updated_at)
+                continue
+            result.update(status="updated", updated_at=now)
+            changed.append((befores[email.id], self.rollup_service.snapshot(email)))
+            publish_on_commit(db, "email", email.id, "updated", changes)
+
+        self.rollup_service.apply_many(db, changed)
+
+    @staticmethod
+    def _summary(results: List[Dict], applied: bool) -> Dict:
+        counts: Dict[str, int] = defaultdict(int)
+        for result in results:
+            counts[result["status"]] += 1
+        return {
+            "applied": applied,
+            "updated": counts["updated"],
+            "conflicts": counts["conflict"],
+            "failed": sum(count for status, count in counts.items() if status not in ("updated", "unchanged")),
+            "results": results,
+        }
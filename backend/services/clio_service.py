@@ -1,15 +1,27 @@
 import os
-import httpx
+from datetime import datetime, timedelta
 from typing import Dict, List, Optional
+from sqlalchemy import or_, update
 from sqlalchemy.orm import Session
 import logging
 
 from ..core.database import ClioToken
+from ..core.events import publish_on_commit
+from ..core.metrics import track_upstream
 from ..models.email import Email
 from ..core.config import settings
+from .rollup_service import RollupService
 
 logger = logging.getLogger(__name__)
 
+# Ids per IN (...) list, under SQLite's bound-parameter limit
+PUSH_CHUNK_SIZE = 500
+
+def _http_client():
+    # httpx is imported on first use to keep it off the startup path
+    import httpx
+    return httpx.AsyncClient()
+
 class ClioService:
     def __init__(self):
         self.client_id = settings.clio_client_id
@@ -29,17 +41,19 @@ class ClioService:
     
     async def exchange_code_for_token(self, code: str) -> Dict:
         """Exchange authorization code for access token"""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/oauth/token",
-                data={
-                    "client_id": self.client_id,
-                    "client_secret": self.client_secret,
-                    "code": code,
-                    "grant_type": "authorization_code",
-                    "redirect_uri": self.redirect_uri
-                }
-            )
+        async with _http_client() as client:
+            with track_upstream("clio", "oauth.token") as call:
+                response = await client.post(
+                    f"{self.base_url}/oauth/token",
+                    data={
+                        "client_id": self.client_id,
+                        "client_secret": self.client_secret,
+                        "code": code,
+                        "grant_type": "authorization_code",
+                        "redirect_uri": self.redirect_uri
+                    }
+                )
+                call.status = response.status_code
             
             if response.status_code == 200:
                 return response.json()
@@ -53,11 +67,13 @@ class ClioService:
             if not token:
                 return {"connected": False, "message": "No Clio token found"}
             
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/api/v4/users/who_am_i.json",
-                    headers={"Authorization": f"Bearer {token.access_token}"}
-                )
+            async with _http_client() as client:
+                with track_upstream("clio", "users.who_am_i") as call:
+                    response = await client.get(
+                        f"{self.base_url}/api/v4/users/who_am_i.json",
+                        headers={"Authorization": f"Bearer {token.access_token}"}
+                    )
+                    call.status = response.status_code
                 
                 if response.status_code == 200:
                     user_data = response.json()
@@ -76,60 +92,73 @@ class ClioService:
             logger.error(f"Clio connection test error: {e}")
             return {"connected": False, "message": str(e)}
     
-    async def push_time_entries(self, db: Session) -> Dict:
-        """Push time entries to Clio"""
+    async def push_time_entries(self, db: Session, email_ids: Optional[List[int]] = None) -> Dict:
+        """Push time entries to Clio, optionally only for the given email ids"""
         try:
             token = db.query(ClioToken).first()
             if not token:
                 return {"success": False, "message": "No Clio token found"}
             
-            # Get emails with summaries that haven't been pushed
-            emails = db.query(Email).filter(
-                Email.summary.isnot(None),
-                Email.pushed_to_clio == False
-            ).all()
+            # Claim billable emails with summaries that haven't been pushed;
+            # ones another worker is posting are left to it
+            claimed = self.claim(db, email_ids)
             
-            if not emails:
+            if not claimed:
                 return {
                     "success": True,
                     "pushed_count": 0,
                     "message": "No summaries to push"
                 }
             
+            rollup_service = RollupService()
             pushed_count = 0
             errors = []
             
-            async with httpx.AsyncClient() as client:
-                for email in emails:
-                    try:
-                        # Create time entry data
-                        time_entry_data = {
-                            "data": {
-                                "date": email.date_sent.strftime("%Y-%m-%d") if email.date_sent else None,
-                                "quantity": email.billing_hours or 0.25,
-                                "price": 0,  # Set appropriate rate
-                                "description": email.billing_description or email.summary[:200],
-                                "note": email.summary
+            async with _http_client() as client:
+                for start in range(0, len(claimed), PUSH_CHUNK_SIZE):
+                    chunk = claimed[start:start + PUSH_CHUNK_SIZE]
+                    emails = db.query(Email).filter(Email.id.in_(chunk)).order_by(Email.id).all()
+                    for email in emails:
+                        email_id = email.id
+                        try:
+                            # Create time entry data
+                            time_entry_data = {
+                                "data": {
+                                    "date": email.date_sent.strftime("%Y-%m-%d") if email.date_sent else None,
+                                    "quantity": email.billing_hours or 0.25,
+                                    "price": 0,  # Set appropriate rate
+                                    "description": email.billing_description or email.summary[:200],
+                                    "note": email.summary
+                                }
                             }
-                        }
-                        
-                        # Push to Clio
-                        response = await client.post(
-                            f"{self.base_url}/api/v4/time_entries.json",
-                            headers={"Authorization": f"Bearer {token.access_token}"},
-                            json=time_entry_data
-                        )
+                            
+                            # Push to Clio
+                            with track_upstream("clio", "time_entries.create") as call:
+                                response = await client.post(
+                                    f"{self.base_url}/api/v4/time_entries.json",
+                                    headers={"Authorization": f"Bearer {token.access_token}"},
+                                    json=time_entry_data
+                                )
+                                call.status = response.status_code
+                            
+                            if response.status_code in [200, 201]:
+                                before = rollup_service.snapshot(email)
+                                email.pushed_to_clio = True
+                                email.push_claimed_at = None
+                                rollup_service.apply(db, before, rollup_service.snapshot(email))
+                                publish_on_commit(db, "email", email_id, "pushed", {"pushed_to_clio": True})
+                                # Each entry commits on its own, so a later failure can't
+                                # lose the record of one Clio already has
+                                db.commit()
+                                pushed_count += 1
+                            else:
+                                errors.append(f"Email {email_id}: {response.text}")
+                                self.release(db, email_id)
                         
-                        if response.status_code in [200, 201]:
-                            email.pushed_to_clio = True
-                            pushed_count += 1
-                        else:
-                            errors.append(f"Email {email.id}: {response.text}")
-                    
-                    except Exception as e:
-                        errors.append(f"Email {email.id}: {str(e)}")
-            
-            db.commit()
+                        except Exception as e:
+                            db.rollback()
+                            self.release(db, email_id)
+                            errors.append(f"Email {email_id}: {str(e)}")
             
             return {
                 "success": True,
@@ -142,6 +171,56 @@ class ClioService:
             logger.error(f"Error pushing time entries: {e}")
             return {"success": False, "message": str(e)}
     
+    @staticmethod
+    def claim(db: Session, email_ids: Optional[List[int]] = None) -> List[int]:
+        """Claim pushable emails, all of them or the ones listed, and commit.
+        
+        An email is only claimed if it is billable, summarized, not yet
+        pushed and has no unexpired push claim, so concurrent pushes
+        never post the same time entry. Returns the ids claimed.
+        """
+        now = datetime.utcnow()
+        expired = now - timedelta(seconds=settings.push_claim_seconds)
+        table = Email.__table__
+        statement = (
+            update(table)
+            .where(
+                table.c.summary.isnot(None),
+                table.c.pushed_to_clio == False,
+                table.c.billable.isnot(False),
+                table.c.exclude_from_push.isnot(True),
+                or_(table.c.push_claimed_at.is_(None), table.c.push_claimed_at < expired)
+            )
+            # A claim isn't an edit: ETags and bulk-edit conflict checks go by updated_at
+            .values(push_claimed_at=now, updated_at=table.c.updated_at)
+            .returning(table.c.id)
+        )
+        if email_ids is None:
+            claimed = list(db.execute(statement).scalars())
+        else:
+            claimed = []
+            for start in range(0, len(email_ids), PUSH_CHUNK_SIZE):
+                chunk = email_ids[start:start + PUSH_CHUNK_SIZE]
+                claimed.extend(db.execute(statement.where(table.c.id.in_(chunk))).scalars())
+        db.commit()
+        return sorted(claimed)
+    
+    @staticmethod
+    def release(db: Session, email_id: int) -> None:
+        """Give up the push claim on an email whose time entry wasn't created"""
+        table = Email.__table__
+        try:
+            db.execute(
+                update(table)
+                .where(table.c.id == email_id, table.c.pushed_to_clio == False)
+                .values(push_claimed_at=None, updated_at=table.c.updated_at)
+            )
+            db.commit()
+        except Exception as e:
+            # The claim still expires after PUSH_CLAIM_SECONDS
+            db.rollback()
+            logger.warning(f"Could not release the push claim on email {email_id}: {e}")
+    
     async def get_matters(self, db: Session) -> List[Dict]:
         """Get matters from Clio"""
         try:
@@ -149,11 +228,13 @@ class ClioService:
             if not token:
                 raise Exception("No Clio token found")
             
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/api/v4/matters.json",
-                    headers={"Authorization": f"Bearer {token.access_token}"}
-                )
+            async with _http_client() as client:
+                with track_upstream("clio", "matters.list") as call:
+                    response = await client.get(
+                        f"{self.base_url}/api/v4/matters.json",
+                        headers={"Authorization": f"Bearer {token.access_token}"}
+                    )
+                    call.status = response.status_code
                 
                 if response.status_code == 200:
                     data = response.json()
@@ -0,0 +1,122 @@
+import hashlib
+from typing import Dict, List, Optional
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+import logging
+
+from ..models.email import EmailContent
+from ..utils.compression import compress, default_codec
+from .search_service import SearchService
+
+logger = logging.getLogger(__name__)
+
+class ContentStore:
+    """Content-addressed, compressed storage for message bodies"""
+
+    @staticmethod
+    def content_hash(body: str) -> str:
+        return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+    def put(self, db: Session, body: str, raw_mime: Optional[bytes] = None) -> Optional[str]:
+        """Store a body and return its hash"""
+        return self.put_many(db, [body], raw_mimes=[raw_mime])[0]
+
+    def put_many(
+        self,
+        db: Session,
+        bodies: List[str],
+        raw_mimes: Optional[List[Optional[bytes]]] = None
+    ) -> List[Optional[str]]:
+        """Store bodies, writing each distinct body once, and return their hashes"""
+        raw_mimes = raw_mimes or [None] * len(bodies)
+        hashes: List[Optional[str]] = []
+        pending: Dict[str, tuple] = {}
+
+        for body, raw_mime in zip(bodies, raw_mimes):
+            if not body:
+                hashes.append(None)
+                continue
+            digest = self.content_hash(body)
+            hashes.append(digest)
+            pending.setdefault(digest, (body, raw_mime))
+
+        if not pending:
+            return hashes
+
+        existing = {
+            row[0] for row in
+            db.query(EmailContent.hash).filter(EmailContent.hash.in_(list(pending))).all()
+        }
+
+        codec = default_codec()
+        rows = []
+        for digest, (body, raw_mime) in pending.items():
+            if digest in existing:
+                continue
+            data = body.encode("utf-8")
+            rows.append({
+                "hash": digest,
+                "codec": codec,
+                "body": compress(data, codec),
+                "raw_mime": compress(raw_mime, codec) if raw_mime else None,
+                "size": len(data),
+            })
+
+        # Another writer may store the same body between the lookup and the
+        # insert; identical hashes mean identical content, so keep theirs
+        if rows:
+            db.execute(self._insert_ignoring_duplicates(db), rows)
+        return hashes
+
+    @staticmethod
+    def _insert_ignoring_duplicates(db: Session):
+        dialect = db.get_bind().dialect.name
+        # Only the dialect in use gets imported
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            raise Exception(f"Content store not supported on {dialect}")
+        return insert(EmailContent.__table__).on_conflict_do_nothing(index_elements=["hash"])
+
+    def migrate_inline_bodies(self, engine: Engine, batch_size: int = 500) -> int:
+        """Move bodies from the legacy emails.body column into email_contents"""
+        with engine.connect() as conn:
+            columns = {column["name"] for column in inspect(conn).get_columns("emails")}
+        if "body" not in columns:
+            return 0
+
+        search_service = SearchService()
+        migrated = 0
+
+        with Session(bind=engine) as db:
+            while True:
+                rows = db.execute(
+                    text("SELECT id, body FROM emails WHERE body IS NOT NULL LIMIT :limit"),
+                    {"limit": batch_size}
+                ).all()
+                if not rows:
+                    break
+
+                hashes = self.put_many(db, [row.body for row in rows])
+                db.execute(
+                    text("UPDATE emails SET body_hash = :hash, body = NULL WHERE id = :id"),
+                    [{"hash": digest, "id": row.id} for row, digest in zip(rows, hashes)]
+                )
+                for row in rows:
+                    search_service.index_body(db, row.id, row.body)
+                db.commit()
+                migrated += len(rows)
+
+        if migrated:
+            logger.info(f"Moved {migrated} inline email bodies to email_contents")
+
+        try:
+            with engine.begin() as conn:
+                conn.execute(text("ALTER TABLE emails DROP COLUMN body"))
+        except Exception as e:
+            logger.warning(f"Could not drop legacy emails.body column: {e}")
+
+        return migrated
@@ -0,0 +1,281 @@
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import chain, combinations
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import bindparam, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, selectinload
+import logging
+
+from ..core.config import settings
+from ..models.email import Email
+from ..utils.email_parser import extract_email_address
+from ..utils.simhash import BITS, fingerprint, hamming, to_signed, to_unsigned
+
+logger = logging.getLogger(__name__)
+
+_REPLY_PREFIX = re.compile(r"^\s*((re|fw|fwd)\s*:\s*)+", re.IGNORECASE)
+
+# Pending entries that force a merge before the next refresh
+PENDING_LIMIT = 4096
+
+class NearDuplicateIndex:
+    """SimHash index over the bodies of model-written summaries.
+
+    Fingerprints are split into max_distance + 2 blocks, and each table
+    is keyed on one pair of blocks. Two fingerprints within max_distance
+    bits differ in at most max_distance blocks, so they agree exactly on
+    some pair and share a key in that table; a lookup only compares
+    against entries sharing a key instead of the whole history. Keying
+    on pairs rather than single blocks keeps buckets small even though
+    templated mail makes many fingerprint bits agree. Fingerprints and
+    email ids live in flat arrays. Each table is a sorted array of keys
+    with a parallel array of positions in them, searched with bisect, so
+    an entry costs 12 bytes per table rather than a dict slot and a
+    small array of its own. New entries wait in a small dict per table
+    and are merged into the sorted arrays on refresh, or sooner once
+    PENDING_LIMIT of them have built up; a large batch, like the first
+    sync, rebuilds the tables with one sort instead.
+
+    Each worker keeps its own index and catches up from the database at
+    most every refresh_seconds.
+    """
+
+    def __init__(self, max_distance: int = 5, refresh_seconds: float = 30):
+        self.max_distance = max_distance
+        self.refresh_seconds = refresh_seconds
+        blocks = max_distance + 2
+        edges = [BITS * block // blocks for block in range(blocks + 1)]
+        block_masks = [((1 << (end - start)) - 1) << start for start, end in zip(edges, edges[1:])]
+        self._key_masks = [first | second for first, second in combinations(block_masks, 2)]
+        self._fingerprints = array("Q")
+        self._ids = array("q")
+        self._known: set = set()
+        self._table_keys: List[array] = [array("Q") for _ in self._key_masks]
+        self._table_positions: List[array] = [array("L") for _ in self._key_masks]
+        self._pending: List[Dict[int, List[int]]] = [{} for _ in self._key_masks]
+        self._pending_count = 0
+        self._synced_until: Optional[datetime] = None
+        self._synced_at = 0.0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _keys(self, value: int) -> List[int]:
+        return [value & mask for mask in self._key_masks]
+
+    def add(self, email_id: int, value: int) -> None:
+        self.add_many([(email_id, value)])
+
+    def add_many(self, entries: Iterable[Tuple[int, int]]) -> None:
+        """Index (email id, fingerprint) pairs; ids already indexed are ignored"""
+        with self._lock:
+            start = len(self._ids)
+            for email_id, value in entries:
+                if email_id in self._known:
+                    continue
+                self._ids.append(email_id)
+                self._fingerprints.append(value)
+                self._known.add(email_id)
+            added = len(self._ids) - start
+            if (self._pending_count + added) * 8 >= len(self._ids):
+                # A backlog this size, like the first sync, is cheaper to sort than to merge
+                self._rebuild()
+                return
+            for position in range(start, len(self._ids)):
+                for pending, key in zip(self._pending, self._keys(self._fingerprints[position])):
+                    pending.setdefault(key, []).append(position)
+            self._pending_count += added
+            if self._pending_count >= PENDING_LIMIT:
+                self._merge_pending()
+
+    def _merge_pending(self) -> None:
+        """Fold pending entries into the sorted tables; the caller holds the lock"""
+        if not self._pending_count:
+            return
+        for table, pending in enumerate(self._pending):
+            keys, positions = self._table_keys[table], self._table_positions[table]
+            merged_keys, merged_positions = array("Q"), array("L")
+            start = 0
+            for key in sorted(pending):
+                end = bisect_right(keys, key, start)
+                merged_keys.extend(keys[start:end])
+                merged_positions.extend(positions[start:end])
+                merged_keys.extend([key] * len(pending[key]))
+                merged_positions.extend(pending[key])
+                start = end
+            merged_keys.extend(keys[start:])
+            merged_positions.extend(positions[start:])
+            self._table_keys[table], self._table_positions[table] = merged_keys, merged_positions
+        self._pending = [{} for _ in self._key_masks]
+        self._pending_count = 0
+
+    def _rebuild(self) -> None:
+        """Sort every table from scratch; the caller holds the lock"""
+        for table, mask in enumerate(self._key_masks):
+            keys = [value & mask for value in self._fingerprints]
+            order = sorted(range(len(keys)), key=keys.__getitem__)
+            self._table_keys[table] = array("Q", [keys[position] for position in order])
+            self._table_positions[table] = array("L", order)
+        self._pending = [{} for _ in self._key_masks]
+        self._pending_count = 0
+
+    def nearest(self, value: int, exclude_id: Optional[int] = None) -> Optional[Tuple[int, int]]:
+        """(email id, bit distance) of the closest entry within max_distance, if any"""
+        best = None
+        with self._lock:
+            seen = set()
+            for table, key in enumerate(self._keys(value)):
+                keys = self._table_keys[table]
+                start = end = bisect_left(keys, key)
+                if start < len(keys) and keys[start] == key:
+                    end = bisect_right(keys, key, start)
+                for position in chain(self._table_positions[table][start:end], self._pending[table].get(key, ())):
+                    if position in seen:
+                        continue
+                    seen.add(position)
+                    email_id = self._ids[position]
+                    if email_id == exclude_id:
+                        continue
+                    distance = hamming(value, self._fingerprints[position])
+                    if distance <= self.max_distance and (best is None or distance < best[1]):
+                        best = (email_id, distance)
+                        if distance == 0:
+                            return best
+        return best
+
+    def sync(self, db: Session, force: bool = False) -> None:
+        """Pick up summaries written since the last sync, here or by other workers"""
+        if not force and time.monotonic() - self._synced_at < self.refresh_seconds:
+            return
+        self._synced_at = time.monotonic()
+
+        query = db.query(Email.id, Email.simhash, Email.updated_at).filter(
+            *self.donor_criteria(), Email.simhash.isnot(None), Email.simhash != 0
+        )
+        if self._synced_until is not None:
+            query = query.filter(Email.updated_at >= self._synced_until)
+        entries = []
+        for email_id, value, updated_at in query.yield_per(1000):
+            entries.append((email_id, to_unsigned(value)))
+            if updated_at and (self._synced_until is None or updated_at > self._synced_until):
+                self._synced_until = updated_at
+        if self._synced_until is None:
+            self._synced_until = datetime.min
+        self.add_many(entries)
+        with self._lock:
+            self._merge_pending()
+
+    @staticmethod
+    def donor_criteria() -> list:
+        """Summaries worth reusing: written by the model, not a rule, another reuse or the fallback"""
+        return [
+            Email.summary.isnot(None),
+            Email.summary_source == "model",
+        ]
+
+    def backfill(self, engine: Engine, batch_size: int = 500) -> None:
+        """Fingerprint summarized emails that have none yet.
+
+        Covers mail stored before fingerprints existed or summarized
+        while near-duplicate reuse was off. Run from init_db, before any
+        request can hold a write transaction it would wait on.
+        """
+        emails_table = Email.__table__
+        statement = (
+            update(emails_table)
+            .where(emails_table.c.id == bindparam("email_id"))
+            # Leave updated_at alone: nothing a client can see has changed
+            .values(simhash=bindparam("value"), updated_at=emails_table.c.updated_at)
+        )
+        filled = 0
+        last_id = 0
+        with Session(bind=engine) as db:
+            while True:
+                emails = (
+                    db.query(Email)
+                    .options(selectinload(Email.content))
+                    .filter(*self.donor_criteria(), Email.simhash.is_(None), Email.id > last_id)
+                    .order_by(Email.id)
+                    .limit(batch_size)
+                    .all()
+                )
+                if not emails:
+                    break
+                rows = []
+                for email in emails:
+                    value = fingerprint(email.body, settings.dedupe_min_words)
+                    # 0 marks "too short to fingerprint" so it isn't retried
+                    rows.append({"email_id": email.id, "value": to_signed(value) if value is not None else 0})
+                db.execute(statement, rows)
+                db.commit()
+                filled += len(rows)
+                last_id = emails[-1].id
+        if filled:
+            logger.info(f"Fingerprinted {filled} summarized emails for near-duplicate lookup")
+
+near_duplicate_index = NearDuplicateIndex(
+    max_distance=settings.dedupe_max_distance,
+    refresh_seconds=settings.dedupe_refresh_seconds
+)
+
+def _strip_reply_prefix(subject: str) -> str:
+    return _REPLY_PREFIX.sub("", subject or "").strip()
+
+def _display_name(sender: str) -> str:
+    name = (sender or "").split("<", 1)[0].strip().strip('"')
+    return name if name and "@" not in name else ""
+
+def adapt_summary(donor: Email, email: Email) -> Dict:
+    """The donor's summary with its subject and correspondent swapped for this email's"""
+    replacements = []
+    donor_subject, subject = _strip_reply_prefix(donor.subject), _strip_reply_prefix(email.subject)
+    if donor_subject and subject and donor_subject != subject:
+        replacements.append((donor_subject, subject))
+    donor_name, name = _display_name(donor.sender), _display_name(email.sender)
+    if donor_name and name and donor_name != name:
+        replacements.append((donor_name, name))
+    donor_address, address = extract_email_address(donor.sender or ""), extract_email_address(email.sender or "")
+    if donor_address and address and donor_address != address:
+        replacements.append((donor_address, address))
+
+    def adapt(text: Optional[str]) -> str:
+        text = text or ""
+        for old, new in replacements:
+            text = text.replace(old, new)
+        return text
+
+    return {
+        "summary": adapt(donor.summary),
+        "billing_hours": donor.billing_hours,
+        "billing_description": adapt(donor.billing_description),
+        "reused_from": donor.id,
+    }
+
+def find_near_duplicate(db: Session, email: Email) -> Optional[Dict]:
+    """Adapted summary of the closest earlier near-duplicate, if one is close enough"""
+    if email.simhash is None:
+        value = fingerprint(email.body, settings.dedupe_min_words)
+        email.simhash = to_signed(value) if value is not None else 0
+    if not email.simhash:
+        return None
+
+    near_duplicate_index.sync(db)
+    match = near_duplicate_index.nearest(to_unsigned(email.simhash), exclude_id=email.id)
+    if match is None:
+        return None
+
+    donor_id, distance = match
+    # get() sees summaries written earlier in the caller's unflushed batch
+    donor = db.get(Email, donor_id)
+    if donor is None or donor.summary is None or donor.summary_source != "model":
+        return None
+
+    summary_data = adapt_summary(donor, email)
+    summary_data["similarity"] = round(1 - distance / BITS, 4)
+    return summary_data
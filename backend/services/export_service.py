@@ -0,0 +1,273 @@
+import csv
+import io
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, Iterator, List, Optional
+from sqlalchemy import case, false, func, literal, select, true, union_all
+from sqlalchemy.orm import Session
+import logging
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.archive import ArchivedEmail
+from ..models.email import Email
+from .rollup_service import DEFAULT_BILLING_HOURS
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per round trip and written per response chunk
+CHUNK_ROWS = 1000
+
+LEDES_FIELDS = (
+    "INVOICE_DATE", "INVOICE_NUMBER", "CLIENT_ID", "LAW_FIRM_MATTER_ID", "INVOICE_TOTAL",
+    "BILLING_START_DATE", "BILLING_END_DATE", "INVOICE_DESCRIPTION", "LINE_ITEM_NUMBER",
+    "EXP/FEE/INV_ADJ_TYPE", "LINE_ITEM_NUMBER_OF_UNITS", "LINE_ITEM_ADJUSTMENT_AMOUNT",
+    "LINE_ITEM_TOTAL", "LINE_ITEM_DATE", "LINE_ITEM_TASK_CODE", "LINE_ITEM_EXPENSE_CODE",
+    "LINE_ITEM_ACTIVITY_CODE", "TIMEKEEPER_ID", "LINE_ITEM_DESCRIPTION", "LAW_FIRM_ID",
+    "LINE_ITEM_UNIT_COST", "TIMEKEEPER_NAME", "TIMEKEEPER_CLASSIFICATION", "CLIENT_MATTER_ID",
+)
+
+CSV_FIELDS = (
+    "id", "email_id", "date", "matter_id", "owner", "hours", "description", "summary",
+    "subject", "sender", "pushed_to_clio", "archived",
+)
+
+# Cells starting with these are evaluated by Excel and Sheets (CSV injection)
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+CENTS = Decimal("0.01")
+
+# Entries without a matter are invoiced together under this id
+UNASSIGNED_MATTER = "UNASSIGNED"
+
+@dataclass
+class ExportFilters:
+    start: Optional[date] = None
+    end: Optional[date] = None
+    matter_id: Optional[str] = None
+    pushed: Optional[bool] = None
+    include_archived: bool = True
+
+    @classmethod
+    def parse(cls, start: Optional[str], end: Optional[str], **kwargs) -> "ExportFilters":
+        """Filters from query parameters; raises ValueError on a malformed date"""
+        return cls(
+            start=date.fromisoformat(start) if start else None,
+            end=date.fromisoformat(end) if end else None,
+            **kwargs
+        )
+
+def _csv_text(value) -> str:
+    """A CSV cell spreadsheets show as text, never run as a formula"""
+    text = value or ""
+    return f"'{text}" if text.startswith(FORMULA_PREFIXES) else text
+
+def _ledes_text(value) -> str:
+    """A LEDES field: no delimiters, brackets or line breaks"""
+    text = "" if value is None else str(value)
+    return " ".join(text.replace("|", "/").replace("[", "(").replace("]", ")").split())
+
+def _ledes_line(values) -> str:
+    return "|".join(_ledes_text(value) for value in values) + "[]\r\n"
+
+def _ledes_date(value) -> str:
+    return value.strftime("%Y%m%d") if value else ""
+
+def _units(hours: float) -> Decimal:
+    """Hours rounded to the two decimals a LEDES line carries"""
+    return Decimal(str(hours)).quantize(CENTS, ROUND_HALF_UP)
+
+def _amount(units: Decimal, rate: Decimal) -> Decimal:
+    return (units * rate).quantize(CENTS, ROUND_HALF_UP)
+
+class ExportService:
+    """Streams billable summaries as CSV or LEDES 1998B.
+
+    Entries come from the live table and, unless excluded, the archive,
+    through a server-side cursor CHUNK_ROWS at a time, and each batch is
+    encoded and yielded before the next is fetched, so memory stays flat
+    however many entries match. Generators open their own session and are
+    meant to be handed to a StreamingResponse; LEDES reads the entries
+    twice, so its session reads one snapshot throughout.
+    """
+
+    @staticmethod
+    def _entries(model, archived: bool, filters: ExportFilters):
+        hours = case(
+            (func.coalesce(model.billing_hours, 0) == 0, DEFAULT_BILLING_HOURS),
+            else_=model.billing_hours
+        )
+        statement = select(
+            model.id,
+            model.gmail_id.label("email_id"),
+            model.date_sent,
+            model.matter_id,
+            model.owner,
+            hours.label("hours"),
+            func.coalesce(model.billing_description, model.summary).label("description"),
+            model.summary,
+            model.subject,
+            model.sender,
+            func.coalesce(model.pushed_to_clio, False).label("pushed_to_clio"),
+            (true() if archived else false()).label("archived"),
+        ).where(
+            model.summary.isnot(None),
+            model.billable.isnot(False),
+            model.exclude_from_push.isnot(True),
+        )
+        if filters.start:
+            statement = statement.where(model.date_sent >= datetime.combine(filters.start, datetime.min.time()))
+        if filters.end:
+            statement = statement.where(model.date_sent < datetime.combine(filters.end + timedelta(days=1), datetime.min.time()))
+        if filters.matter_id == UNASSIGNED_MATTER:
+            statement = statement.where(model.matter_id.is_(None))
+        elif filters.matter_id:
+            statement = statement.where(model.matter_id == filters.matter_id)
+        if filters.pushed is not None:
+            statement = statement.where(func.coalesce(model.pushed_to_clio, False) == filters.pushed)
+        return statement
+
+    def entries_query(self, filters: ExportFilters):
+        """Matching entries from both tables, by matter then date"""
+        parts = [self._entries(Email, False, filters)]
+        if filters.include_archived:
+            parts.append(self._entries(ArchivedEmail, True, filters))
+        entries = union_all(*parts).subquery("entries") if len(parts) > 1 else parts[0].subquery("entries")
+        matter = func.coalesce(entries.c.matter_id, literal(UNASSIGNED_MATTER))
+        return select(entries, matter.label("matter")).order_by(matter, entries.c.date_sent, entries.c.id), entries
+
+    @staticmethod
+    def _stream(db: Session, statement) -> Iterator[List]:
+        """Row batches from a server-side cursor"""
+        result = db.execute(statement.execution_options(stream_results=True, yield_per=CHUNK_ROWS))
+        for rows in result.partitions():
+            yield rows
+
+    @staticmethod
+    def _snapshot_session() -> Session:
+        """A session whose reads all see the database as of its first read"""
+        db = SessionLocal()
+        if db.get_bind().dialect.name == "postgresql":
+            db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        else:
+            # pysqlite only opens a transaction before a write; without one each SELECT sees the latest commit
+            db.connection().exec_driver_sql("BEGIN")
+        return db
+
+    def csv_chunks(self, filters: ExportFilters) -> Iterator[bytes]:
+        statement, _ = self.entries_query(filters)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CSV_FIELDS)
+        exported = 0
+        db = SessionLocal()
+        try:
+            for rows in self._stream(db, statement):
+                for row in rows:
+                    writer.writerow([
+                        row.id, row.email_id, row.date_sent.date().isoformat() if row.date_sent else "",
+                        _csv_text(row.matter_id), _csv_text(row.owner), round(row.hours, 4),
+                        _csv_text(row.description), _csv_text(row.summary), _csv_text(row.subject),
+                        _csv_text(row.sender),
+                        "true" if row.pushed_to_clio else "false", "true" if row.archived else "false",
+                    ])
+                exported += len(rows)
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+        finally:
+            db.close()
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+        logger.info(f"Exported {exported} time entries as CSV")
+
+    def _invoices(self, db: Session, entries, rate: Decimal) -> Dict[str, Dict]:
+        """Per-matter totals and date ranges, needed on every LEDES line before it is written.
+
+        Totals are summed from the same rounded line amounts the lines
+        carry, in a first pass over just the matter, hours and date.
+        """
+        matter = func.coalesce(entries.c.matter_id, literal(UNASSIGNED_MATTER))
+        statement = select(matter.label("matter"), entries.c.hours, entries.c.date_sent)
+        invoices: Dict[str, Dict] = {}
+        for rows in self._stream(db, statement):
+            for row in rows:
+                invoice = invoices.setdefault(row.matter, {"total": Decimal("0.00"), "start": None, "end": None})
+                invoice["total"] += _amount(_units(row.hours), rate)
+                if row.date_sent:
+                    invoice["start"] = min(invoice["start"] or row.date_sent, row.date_sent)
+                    invoice["end"] = max(invoice["end"] or row.date_sent, row.date_sent)
+        return dict(sorted(invoices.items()))
+
+    def ledes_chunks(
+        self,
+        filters: ExportFilters,
+        invoice_number: str,
+        client_id: str = "",
+        rate: Optional[float] = None,
+        invoice_date: Optional[date] = None
+    ) -> Iterator[bytes]:
+        """LEDES 1998B with one invoice per matter; numbers get a -N suffix when there are several"""
+        rate = Decimal(str(settings.ledes_hourly_rate if rate is None else rate)).quantize(CENTS, ROUND_HALF_UP)
+        invoice_date = _ledes_date(invoice_date or date.today())
+        statement, entries = self.entries_query(filters)
+        # Totals and lines must come from the same entries, so both passes share one snapshot
+        db = self._snapshot_session()
+        try:
+            invoices = self._invoices(db, entries, rate)
+            numbers = {
+                matter_id: invoice_number if len(invoices) == 1 else f"{invoice_number}-{index}"
+                for index, matter_id in enumerate(invoices, start=1)
+            }
+
+            lines = ["LEDES1998B[]\r\n", _ledes_line(LEDES_FIELDS)]
+            line_numbers: Dict[str, int] = {}
+            exported = 0
+            unmatched = 0
+            for rows in self._stream(db, statement):
+                for row in rows:
+                    invoice = invoices.get(row.matter)
+                    if invoice is None:
+                        # Only possible if the snapshot didn't hold; a line outside every total would misbill
+                        unmatched += 1
+                        continue
+                    line_number = line_numbers[row.matter] = line_numbers.get(row.matter, 0) + 1
+                    units = _units(row.hours)
+                    lines.append(_ledes_line((
+                        invoice_date,
+                        numbers[row.matter],
+                        client_id,
+                        row.matter,
+                        invoice["total"],
+                        _ledes_date(invoice["start"]),
+                        _ledes_date(invoice["end"]),
+                        f"Legal services, matter {row.matter}",
+                        line_number,
+                        "F",
+                        units,
+                        "0.00",
+                        _amount(units, rate),
+                        _ledes_date(row.date_sent),
+                        "",
+                        "",
+                        "",
+                        row.owner or "default",
+                        row.description,
+                        settings.ledes_law_firm_id,
+                        rate,
+                        row.owner or "default",
+                        "",
+                        row.matter_id or "",
+                    )))
+                exported += len(rows)
+                yield "".join(lines).encode("utf-8")
+                lines = []
+        finally:
+            db.close()
+        if lines:
+            yield "".join(lines).encode("utf-8")
+        if unmatched:
+            logger.warning(f"Left {unmatched} time entries out of the LEDES export: their matter had no invoice total")
+        exported -= unmatched
+        logger.info(f"Exported {exported} time entries as LEDES 1998B in {len(invoices)} invoices")
@@ -1,28 +1,73 @@
 import os
 import pickle
-import base64
 from datetime import datetime
-from typing import List, Dict, Optional
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+from starlette.concurrency import run_in_threadpool
 import logging
 
+from ..core.metrics import track_upstream
+from ..utils.email_parser import SIGNAL_HEADERS, extract_body, parse_date_header
+from ..utils.file_lock import locked, write_pickle_atomic
+
 logger = logging.getLogger(__name__)
 
+# Gmail API quota units charged per call; each user gets 250 units/second
+QUOTA_UNITS = {
+    "getProfile": 1,
+    "history.list": 2,
+    "messages.list": 5,
+    "messages.get": 5,
+    "watch": 100,
+}
+
+class HistoryExpired(Exception):
+    """Gmail no longer keeps history back to the requested id"""
+
 class GmailService:
     SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
     
-    def __init__(self):
+    def __init__(self, owner: Optional[str] = None):
+        # owner selects a connected mailbox; None is the token.pickle mailbox
+        self.owner = owner
         self.service = None
         self.credentials = None
+        self.quota_units = 0
     
     async def authenticate(self) -> Dict:
         """Authenticate with Gmail API"""
+        # Google client libraries are slow to import; load them on first use
+        from googleapiclient.discovery import build
+        
+        if self.owner:
+            return await self._authenticate_account(build)
+        
         try:
-            creds = None
+            # Waiting on the lock and refreshing are blocking; keep them off the event loop
+            creds = await run_in_threadpool(self._load_credentials)
+            if creds is None:
+                return {
+                    "success": False,
+                    "message": "client_secret.json not found. Please download from Google Cloud Console."
+                }
             
+            self.credentials = creds
+            self.service = build('gmail', 'v1', credentials=creds)
+            
+            return {"success": True, "message": "Gmail authenticated successfully"}
+        
+        except Exception as e:
+            logger.error(f"Gmail authentication error: {e}")
+            return {"success": False, "message": str(e)}
+    
+    def _load_credentials(self):
+        """token.pickle credentials, refreshed or obtained if needed; None without client_secret.json"""
+        from google.auth.transport.requests import Request
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        
+        creds = None
+        
+        # Workers share token.pickle; one refreshes and writes while the others wait
+        with locked('token.pickle'):
             # Load existing credentials
             if os.path.exists('token.pickle'):
                 with open('token.pickle', 'rb') as token:
@@ -34,28 +79,40 @@ class GmailService:
                     creds.refresh(Request())
                 else:
                     if not os.path.exists('client_secret.json'):
-                        return {
-                            "success": False,
-                            "message": "client_secret.json not found. Please download from Google Cloud Console."
-                        }
+                        return None
                     
                     flow = InstalledAppFlow.from_client_secrets_file(
                         'client_secret.json', self.SCOPES)
                     creds = flow.run_local_server(port=0)
                 
                 # Save credentials
-                with open('token.pickle', 'wb') as token:
-                    pickle.dump(creds, token)
+                write_pickle_atomic('token.pickle', creds)
+        
+        return creds
+    
+    async def _authenticate_account(self, build) -> Dict:
+        """Use the stored credentials of a connected mailbox"""
+        from .mailbox_service import MailboxService
+        
+        try:
+            creds = await run_in_threadpool(MailboxService().load_credentials, self.owner)
+            if creds is None:
+                return {"success": False, "message": f"Mailbox {self.owner} is not connected"}
             
             self.credentials = creds
-            self.service = build('gmail', 'v1', credentials=creds)
-            
-            return {"success": True, "message": "Gmail authenticated successfully"}
+            self.service = build('gmail', 'v1', credentials=creds, cache_discovery=False)
+            return {"success": True, "message": f"Gmail authenticated for {self.owner}"}
         
         except Exception as e:
-            logger.error(f"Gmail authentication error: {e}")
+            logger.error(f"Gmail authentication error for {self.owner}: {e}")
             return {"success": False, "message": str(e)}
     
+    async def _ensure_service(self) -> None:
+        if not self.service:
+            auth_result = await self.authenticate()
+            if not auth_result.get("success"):
+                raise Exception("Gmail authentication failed")
+    
     async def fetch_emails(
         self,
         start_date: datetime,
@@ -64,46 +121,188 @@ class GmailService:
     ) -> List[Dict]:
         """Fetch emails from Gmail"""
         try:
-            if not self.service:
-                auth_result = await self.authenticate()
-                if not auth_result.get("success"):
-                    raise Exception("Gmail authentication failed")
-            
-            # Build query
-            query = f"after:{start_date.strftime('%Y/%m/%d')} before:{end_date.strftime('%Y/%m/%d')}"
+            return [email async for email in self.iter_emails(start_date, end_date, max_results)]
+        
+        except Exception as e:
+            logger.error(f"Error fetching emails: {e}")
+            raise
+    
+    async def iter_emails(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        max_results: int = 100
+    ) -> AsyncIterator[Dict]:
+        """Yield emails one at a time as each message is fetched.
+        
+        API calls run in the threadpool so other work on the event loop
+        keeps going while Gmail responds.
+        """
+        await self._ensure_service()
+        
+        # Build query
+        query = f"after:{start_date.strftime('%Y/%m/%d')} before:{end_date.strftime('%Y/%m/%d')}"
+        
+        # Get message list
+        message_ids, _ = await self.list_message_ids(query, max_results)
+        
+        for message_id in message_ids:
+            try:
+                yield await self.get_email(message_id)
             
-            # Get message list
-            results = self.service.users().messages().list(
+            except Exception as e:
+                logger.error(f"Error processing message {message_id}: {e}")
+                continue
+    
+    async def list_message_ids(
+        self,
+        query: str,
+        max_results: int = 100,
+        page_token: Optional[str] = None
+    ) -> Tuple[List[str], Optional[str]]:
+        """One page of message ids matching a search query, and the next page token"""
+        await self._ensure_service()
+        
+        results = await run_in_threadpool(
+            self._execute,
+            self.service.users().messages().list(
                 userId='me',
                 q=query,
-                maxResults=max_results
-            ).execute()
+                maxResults=max_results,
+                pageToken=page_token
+            ),
+            "messages.list"
+        )
+        
+        return [message['id'] for message in results.get('messages', [])], results.get('nextPageToken')
+    
+    async def get_email(self, message_id: str) -> Dict:
+        """Fetch one full message as an email dict"""
+        await self._ensure_service()
+        
+        msg = await run_in_threadpool(
+            self._execute,
+            self.service.users().messages().get(
+                userId='me',
+                id=message_id,
+                format='full'
+            ),
+            "messages.get"
+        )
+        
+        return self._extract_email_data(msg)
+    
+    async def get_profile(self) -> Dict:
+        """Mailbox address and current history id"""
+        await self._ensure_service()
+        
+        return await run_in_threadpool(
+            self._execute,
+            self.service.users().getProfile(userId='me'),
+            "getProfile"
+        )
+    
+    async def start_watch(self, topic_name: str) -> Dict:
+        """Ask Gmail to publish mailbox changes to a Pub/Sub topic"""
+        await self._ensure_service()
+        
+        response = await run_in_threadpool(
+            self._execute,
+            self.service.users().watch(
+                userId='me',
+                body={"topicName": topic_name, "labelIds": ["INBOX"]}
+            ),
+            "watch"
+        )
+        
+        return {
+            "history_id": str(response["historyId"]),
+            "expiration": datetime.utcfromtimestamp(int(response["expiration"]) / 1000)
+        }
+    
+    async def fetch_history(self, start_history_id: str) -> Dict:
+        """Fetch messages added since a history id.
+        
+        Returns the new emails, the ids of messages that could not be
+        fetched and the latest history id. Raises HistoryExpired when
+        Gmail no longer has history that old.
+        """
+        result = await self.history_message_ids(start_history_id)
+        
+        fetched = await self.fetch_messages(result["message_ids"])
+        
+        return {**fetched, "history_id": result["history_id"]}
+    
+    async def fetch_messages(self, message_ids: List[str]) -> Dict:
+        """Fetch messages by id, returning the emails and the ids that failed.
+        
+        Messages deleted since they were listed are dropped rather than
+        counted as failures, since fetching them again cannot succeed.
+        """
+        from googleapiclient.errors import HttpError
+        
+        emails = []
+        failed_ids = []
+        for message_id in message_ids:
+            try:
+                emails.append(await self.get_email(message_id))
             
-            messages = results.get('messages', [])
-            emails = []
+            except HttpError as e:
+                if e.resp.status == 404:
+                    logger.info(f"Message {message_id} was deleted before it could be fetched")
+                    continue
+                logger.error(f"Error processing message {message_id}: {e}")
+                failed_ids.append(message_id)
             
-            for message in messages:
-                try:
-                    # Get full message
-                    msg = self.service.users().messages().get(
+            except Exception as e:
+                logger.error(f"Error processing message {message_id}: {e}")
+                failed_ids.append(message_id)
+        
+        return {"emails": emails, "failed_ids": failed_ids}
+    
+    async def history_message_ids(self, start_history_id: str) -> Dict:
+        """Ids of messages added since a history id, and the latest history id"""
+        await self._ensure_service()
+        
+        from googleapiclient.errors import HttpError
+        
+        message_ids = []
+        latest_history_id = start_history_id
+        page_token = None
+        
+        while True:
+            try:
+                results = await run_in_threadpool(
+                    self._execute,
+                    self.service.users().history().list(
                         userId='me',
-                        id=message['id'],
-                        format='full'
-                    ).execute()
-                    
-                    # Extract email data
-                    email_data = self._extract_email_data(msg)
-                    emails.append(email_data)
-                
-                except Exception as e:
-                    logger.error(f"Error processing message {message['id']}: {e}")
-                    continue
+                        startHistoryId=start_history_id,
+                        historyTypes=['messageAdded'],
+                        pageToken=page_token
+                    ),
+                    "history.list"
+                )
+            except HttpError as e:
+                if e.resp.status == 404:
+                    raise HistoryExpired(start_history_id)
+                raise
             
-            return emails
+            for record in results.get('history', []):
+                for added in record.get('messagesAdded', []):
+                    message_ids.append(added['message']['id'])
+            
+            latest_history_id = str(results.get('historyId', latest_history_id))
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                break
         
-        except Exception as e:
-            logger.error(f"Error fetching emails: {e}")
-            raise
+        return {"message_ids": list(dict.fromkeys(message_ids)), "history_id": latest_history_id}
+    
+    def _execute(self, request, operation: str) -> Dict:
+        """Execute a Gmail API request, recording its latency, outcome and quota cost"""
+        self.quota_units += QUOTA_UNITS.get(operation, 5)
+        with track_upstream("gmail", operation):
+            return request.execute()
     
     def _extract_email_data(self, message: Dict) -> Dict:
         """Extract email data from Gmail message"""
@@ -114,6 +313,7 @@ class GmailService:
         sender = ""
         recipient = ""
         date_sent = None
+        signal_headers = {}
         
         for header in headers:
             name = header['name'].lower()
@@ -126,14 +326,13 @@ class GmailService:
             elif name == 'to':
                 recipient = value
             elif name == 'date':
-                try:
-                    # Parse date (simplified)
-                    date_sent = datetime.now()  # Placeholder
-                except:
-                    date_sent = datetime.now()
+                date_sent = parse_date_header(value)
+            elif name in SIGNAL_HEADERS:
+                signal_headers[name] = value
         
-        # Extract body
-        body = self._extract_body(message['payload'])
+        if date_sent is None and message.get('internalDate'):
+            # Missing or unreadable Date header: use when Gmail received it
+            date_sent = datetime.fromtimestamp(int(message['internalDate']) / 1000)
         
         return {
             "id": message['id'],
@@ -141,25 +340,8 @@ class GmailService:
             "subject": subject,
             "sender": sender,
             "recipient": recipient,
-            "body": body,
-            "date_sent": date_sent
+            "body": extract_body(message['payload']),
+            "date_sent": date_sent,
+            "signal_headers": signal_headers,
+            "owner": self.owner
         }
-    
-    def _extract_body(self, payload: Dict) -> str:
-        """Extract email body from payload"""
-        body = ""
-        
-        if 'parts' in payload:
-            for part in payload['parts']:
-                if part['mimeType'] == 'text/plain':
-                    data = part['body'].get('data', '')
-                    if data:
-                        body = base64.urlsafe_b64decode(data).decode('utf-8')
-                        break
-        else:
-            if payload['mimeType'] == 'text/plain':
-                data = payload['body'].get('data', '')
-                if data:
-                    body = base64.urlsafe_b64decode(data).decode('utf-8')
-        
-        return body[:1000]  # Limit body length
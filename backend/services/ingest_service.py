@@ -0,0 +1,223 @@
+import asyncio
+from typing import Dict, List, Optional, Set, Tuple
+import orjson
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+import logging
+
+from ..core.database import SessionLocal
+from ..core.events import publish_on_commit
+from ..models.archive import ArchivedEmail
+from ..models.email import Email
+from .content_store import ContentStore
+from .search_service import SearchService
+
+logger = logging.getLogger(__name__)
+
+# Keeps IN (...) lists under SQLite's bound-parameter limit
+LOOKUP_CHUNK_SIZE = 500
+
+class IngestService:
+    """Store fetched or captured emails, skipping ones already stored"""
+
+    def __init__(self):
+        self.content_store = ContentStore()
+
+    def store_emails(self, db: Session, records: List[Dict]) -> Dict:
+        """Insert records whose id isn't stored yet.
+
+        Records use the GmailService email dict shape (id, thread_id,
+        subject, sender, recipient, body, date_sent, and optionally
+        signal_headers and owner). The caller commits.
+        Returns the Email row for every id and which ids were new.
+        """
+        unique: Dict[str, Dict] = {}
+        for record in records:
+            if record.get("id"):
+                unique.setdefault(record["id"], record)
+
+        ids = list(unique)
+        stored: Dict[str, Email] = {}
+        for start in range(0, len(ids), LOOKUP_CHUNK_SIZE):
+            chunk = ids[start:start + LOOKUP_CHUNK_SIZE]
+            for email in db.query(Email).filter(Email.gmail_id.in_(chunk)).all():
+                stored[email.gmail_id] = email
+            # Refetched mail that was archived stays archived
+            for email in db.query(ArchivedEmail).filter(ArchivedEmail.gmail_id.in_(chunk)).all():
+                stored[email.gmail_id] = email
+
+        fresh = [record for gmail_id, record in unique.items() if gmail_id not in stored]
+        hashes = self.content_store.put_many(db, [record.get("body", "") for record in fresh])
+
+        rows = [
+            {
+                "gmail_id": record["id"],
+                "subject": record.get("subject", ""),
+                "sender": record.get("sender", ""),
+                "recipient": record.get("recipient", ""),
+                "body_hash": body_hash,
+                "date_sent": record.get("date_sent"),
+                "thread_id": record.get("thread_id"),
+                "owner": record.get("owner"),
+                "signal_headers": orjson.dumps(record["signal_headers"]).decode("utf-8") if record.get("signal_headers") else None,
+            }
+            for record, body_hash in zip(fresh, hashes)
+        ]
+
+        new_emails = []
+        if rows:
+            # Rows another writer stored since the lookup are skipped, not an error
+            statement = self._insert_ignoring_duplicates(db).returning(Email.id, Email.gmail_id)
+            inserted = {gmail_id for _, gmail_id in db.execute(statement, rows)}
+            fresh_ids = [record["id"] for record in fresh]
+            for start in range(0, len(fresh_ids), LOOKUP_CHUNK_SIZE):
+                chunk = fresh_ids[start:start + LOOKUP_CHUNK_SIZE]
+                for email in db.query(Email).filter(Email.gmail_id.in_(chunk)).all():
+                    stored[email.gmail_id] = email
+            for record in fresh:
+                if record["id"] not in inserted:
+                    continue
+                email = stored[record["id"]]
+                new_emails.append(email)
+                # Bodies are indexed once the new rows have ids
+                if record.get("body"):
+                    SearchService.index_body(db, email.id, record["body"])
+                publish_on_commit(db, "email", email.id, "created", {
+                    "gmail_id": email.gmail_id,
+                    "subject": email.subject,
+                    "sender": email.sender,
+                    "date_sent": email.date_sent,
+                    "owner": email.owner,
+                })
+
+        return {
+            "emails": stored,
+            "new_ids": [email.gmail_id for email in new_emails],
+            "duplicates": len(records) - len(new_emails),
+        }
+
+    @staticmethod
+    def _insert_ignoring_duplicates(db: Session):
+        dialect = db.get_bind().dialect.name
+        # Only the dialect in use gets imported
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            raise Exception(f"Ingest not supported on {dialect}")
+        return insert(Email.__table__).on_conflict_do_nothing(index_elements=["gmail_id"])
+
+class IngestBuffer:
+    """Coalesces concurrent submissions into micro-batches.
+
+    Each submit() waits until its records are written; records that
+    arrive within max_delay of each other share one transaction, and a
+    batch is flushed early once it reaches max_batch records. If the
+    shared transaction fails, each submission is retried on its own so
+    one bad request doesn't fail the others.
+    """
+
+    def __init__(self, max_batch: int = 200, max_delay: float = 0.05):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.ingest_service = IngestService()
+        self._pending: List[Tuple[List[Dict], asyncio.Future]] = []
+        self._pending_count = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        # The event loop only keeps weak references to tasks
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, records: List[Dict]) -> List[Dict]:
+        """Queue records and return their per-record outcomes once written"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((records, future))
+        self._pending_count += len(records)
+
+        if self._pending_count >= self.max_batch:
+            self._schedule_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._schedule_flush)
+
+        return await future
+
+    def _schedule_flush(self) -> None:
+        task = asyncio.create_task(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def flush(self) -> None:
+        """Write everything queued so far in one transaction"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+
+        async with self._flush_lock:
+            pending, self._pending = self._pending, []
+            self._pending_count = 0
+            if not pending:
+                return
+
+            records = [record for batch, _ in pending for record in batch]
+            try:
+                outcomes = await run_in_threadpool(self._write, records)
+            except Exception as e:
+                logger.error(f"Ingest flush of {len(records)} records failed: {e}")
+                if len(pending) == 1:
+                    self._fail(pending[0][1], e)
+                    return
+                await self._write_separately(pending)
+                return
+
+            for batch, future in pending:
+                if not future.done():
+                    future.set_result([outcomes[record["id"]] for record in batch])
+
+            logger.info(f"Ingested micro-batch of {len(records)} records from {len(pending)} requests")
+
+    async def _write_separately(self, pending: List[Tuple[List[Dict], asyncio.Future]]) -> None:
+        """Retry each submission of a failed micro-batch in its own transaction"""
+        failed = 0
+        for batch, future in pending:
+            try:
+                outcomes = await run_in_threadpool(self._write, batch)
+            except Exception as e:
+                failed += 1
+                self._fail(future, e)
+                continue
+            if not future.done():
+                future.set_result([outcomes[record["id"]] for record in batch])
+        logger.info(f"Retried {len(pending)} ingest requests separately, {failed} failed")
+
+    @staticmethod
+    def _fail(future: asyncio.Future, error: Exception) -> None:
+        if not future.done():
+            future.set_exception(error)
+
+    def _write(self, records: List[Dict]) -> Dict[str, Dict]:
+        db = SessionLocal()
+        try:
+            result = self.ingest_service.store_emails(db, records)
+            db.commit()
+
+            new_ids = set(result["new_ids"])
+            return {
+                gmail_id: {
+                    "email_id": gmail_id,
+                    "id": email.id,
+                    "status": "created" if gmail_id in new_ids else "duplicate",
+                }
+                for gmail_id, email in result["emails"].items()
+            }
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+ingest_buffer = IngestBuffer()
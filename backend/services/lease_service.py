@@ -0,0 +1,124 @@
+import asyncio
+import os
+import socket
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Awaitable, Callable
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+import logging
+
+from ..core.database import SessionLocal
+from ..models.coordination import Lease
+
+logger = logging.getLogger(__name__)
+
+class LeaseService:
+    """Database leases so only one worker runs a given job at a time.
+
+    A lease is held until it expires or is released; holders renew it
+    well before expiry, so a worker that dies stops blocking others
+    after at most one TTL.
+    """
+
+    def __init__(self, holder: str = None):
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}"
+
+    def try_acquire(self, name: str, ttl_seconds: float) -> bool:
+        """Take or renew the lease if it is free, expired or already ours"""
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=ttl_seconds)
+        db = SessionLocal()
+        try:
+            updated = db.query(Lease).filter(
+                Lease.name == name,
+                or_(Lease.holder == self.holder, Lease.expires_at < now)
+            ).update({"holder": self.holder, "expires_at": expires_at}, synchronize_session=False)
+            if updated:
+                db.commit()
+                return True
+
+            db.add(Lease(name=name, holder=self.holder, expires_at=expires_at, acquired_at=now))
+            try:
+                db.commit()
+                return True
+            except IntegrityError:
+                # Someone else holds it
+                db.rollback()
+                return False
+        finally:
+            db.close()
+
+    def release(self, name: str) -> None:
+        db = SessionLocal()
+        try:
+            db.query(Lease).filter(Lease.name == name, Lease.holder == self.holder).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    @asynccontextmanager
+    async def hold(self, name: str, ttl_seconds: float = 60) -> AsyncIterator[bool]:
+        """Try to take a lease for the duration of the block.
+
+        Yields whether it was acquired; while held it is renewed in the
+        background and it is released on exit.
+        """
+        acquired = await run_in_threadpool(self.try_acquire, name, ttl_seconds)
+        if not acquired:
+            yield False
+            return
+
+        async def renew():
+            while True:
+                await asyncio.sleep(ttl_seconds / 3)
+                if not await run_in_threadpool(self.try_acquire, name, ttl_seconds):
+                    logger.warning(f"Lost lease {name}")
+                    return
+
+        renewer = asyncio.create_task(renew())
+        try:
+            yield True
+        finally:
+            renewer.cancel()
+            await run_in_threadpool(self.release, name)
+
+    async def run_as_leader(self, name: str, job: Callable[[], Awaitable[None]], ttl_seconds: float = 30) -> None:
+        """Run job on whichever worker holds the lease, taking over if that worker goes away"""
+        while True:
+            try:
+                acquired = await run_in_threadpool(self.try_acquire, name, ttl_seconds)
+            except Exception as e:
+                logger.error(f"Lease {name} check failed: {e}")
+                acquired = False
+
+            if not acquired:
+                await asyncio.sleep(ttl_seconds / 3)
+                continue
+
+            logger.info(f"{self.holder} is now running {name}")
+            task = asyncio.create_task(job())
+            try:
+                while not task.done():
+                    await asyncio.wait({task}, timeout=ttl_seconds / 3)
+                    if task.done():
+                        break
+                    try:
+                        renewed = await run_in_threadpool(self.try_acquire, name, ttl_seconds)
+                    except Exception as e:
+                        logger.error(f"Lease {name} renewal failed: {e}")
+                        renewed = False
+                    if not renewed:
+                        logger.warning(f"Lost lease {name}, stopping it here")
+                        task.cancel()
+                        break
+                if task.done() and not task.cancelled() and task.exception():
+                    logger.error(f"{name} stopped: {task.exception()}")
+            finally:
+                if not task.done():
+                    task.cancel()
+                await run_in_threadpool(self.release, name)
+            await asyncio.sleep(ttl_seconds / 3)
+
+lease_service = LeaseService()
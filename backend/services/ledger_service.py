@@ -0,0 +1,159 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import case, func, select, union_all, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+import logging
+
+from ..models.archive import ArchivedEmail
+from ..models.email import Email
+from ..models.ledger import SummaryAttempt
+
+logger = logging.getLogger(__name__)
+
+GROUPINGS = ("day", "model", "matter", "owner", "source")
+
+# Attempts keep their matter and owner after the email is archived
+EMAILS = union_all(
+    select(Email.id, Email.matter_id, Email.owner),
+    select(ArchivedEmail.id, ArchivedEmail.matter_id, ArchivedEmail.owner),
+).subquery("all_emails")
+
+class LedgerService:
+    """Reports over the summary_attempts ledger"""
+
+    @staticmethod
+    def backfill_summary_sources(engine: Engine) -> None:
+        """Record where summaries written before emails.summary_source came from.
+
+        Rule and reused summaries are known from the email itself; others
+        take the source of their latest attempt. Ones with no attempt stay
+        unknown and so are never offered for reuse.
+        """
+        emails = Email.__table__
+        attempts = SummaryAttempt.__table__
+        latest_source = (
+            select(attempts.c.source)
+            .where(attempts.c.email_id == emails.c.id)
+            .order_by(attempts.c.id.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+        with engine.begin() as conn:
+            filled = conn.execute(
+                update(emails)
+                .where(emails.c.summary.isnot(None), emails.c.summary_source.is_(None))
+                .values(
+                    summary_source=case(
+                        (emails.c.filter_rule.isnot(None), "rule"),
+                        (emails.c.reused_from_id.isnot(None), "reused"),
+                        else_=latest_source,
+                    ),
+                    # Leave updated_at alone: nothing a client can see has changed
+                    updated_at=emails.c.updated_at,
+                )
+            ).rowcount
+        if filled:
+            logger.info(f"Recorded the summary source of {filled} summarized emails")
+
+    @staticmethod
+    def _group_key(group_by: str):
+        if group_by == "day":
+            return func.date(SummaryAttempt.created_at)
+        if group_by == "model":
+            return func.coalesce(SummaryAttempt.model, "none")
+        if group_by == "matter":
+            return func.coalesce(EMAILS.c.matter_id, "unassigned")
+        if group_by == "owner":
+            return func.coalesce(EMAILS.c.owner, "default")
+        return SummaryAttempt.source
+
+    def report(
+        self,
+        db: Session,
+        group_by: str,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        limit: int = 100
+    ) -> Dict:
+        """Attempts, model calls, tokens, cost and latency per bucket, plus totals"""
+        if group_by not in GROUPINGS:
+            raise ValueError(f"group_by must be one of {', '.join(GROUPINGS)}")
+
+        criteria = []
+        if start:
+            criteria.append(SummaryAttempt.created_at >= datetime.combine(date.fromisoformat(start), datetime.min.time()))
+        if end:
+            criteria.append(SummaryAttempt.created_at < datetime.combine(date.fromisoformat(end) + timedelta(days=1), datetime.min.time()))
+
+        columns = [
+            func.count(SummaryAttempt.id),
+            func.sum(SummaryAttempt.model_calls),
+            func.sum(SummaryAttempt.retries),
+            func.sum(SummaryAttempt.prompt_tokens),
+            func.sum(SummaryAttempt.completion_tokens),
+            func.sum(SummaryAttempt.cost_usd),
+            func.sum(case((SummaryAttempt.cache_hit.is_(True), 1), else_=0)),
+            func.avg(SummaryAttempt.latency_ms),
+            # Latency of attempts that called a model; rule and reuse hits take milliseconds
+            func.avg(case((SummaryAttempt.model_calls > 0, SummaryAttempt.latency_ms))),
+        ]
+
+        key = self._group_key(group_by)
+        query = db.query(key, *columns).filter(*criteria)
+        if group_by in ("matter", "owner"):
+            query = query.outerjoin(EMAILS, EMAILS.c.id == SummaryAttempt.email_id)
+        query = query.group_by(key)
+        if group_by == "day":
+            query = query.order_by(key.desc())
+        else:
+            query = query.order_by(func.sum(SummaryAttempt.cost_usd).desc())
+
+        buckets = [{"bucket": str(row[0]), **self._totals(row[1:])} for row in query.limit(limit).all()]
+        totals = self._totals(db.query(*columns).filter(*criteria).one())
+
+        return {"group_by": group_by, "buckets": buckets, "totals": totals}
+
+    @staticmethod
+    def _totals(row) -> Dict:
+        attempts, calls, retries, prompt_tokens, completion_tokens, cost, cache_hits, latency, model_latency = row
+        attempts = attempts or 0
+        return {
+            "attempts": attempts,
+            "model_calls": calls or 0,
+            "retries": retries or 0,
+            "prompt_tokens": prompt_tokens or 0,
+            "completion_tokens": completion_tokens or 0,
+            "cost_usd": round(cost or 0.0, 6),
+            "cache_hits": cache_hits or 0,
+            "cache_hit_rate": round((cache_hits or 0) / attempts, 4) if attempts else 0.0,
+            "avg_latency_ms": round(latency, 1) if latency is not None else None,
+            "avg_model_latency_ms": round(model_latency, 1) if model_latency is not None else None,
+        }
+
+    def attempts(self, db: Session, email_id: int) -> List[Dict]:
+        """Every summarization of one email, oldest first"""
+        rows = (
+            db.query(SummaryAttempt)
+            .filter(SummaryAttempt.email_id == email_id)
+            .order_by(SummaryAttempt.id)
+            .all()
+        )
+        return [
+            {
+                "id": row.id,
+                "source": row.source,
+                "model": row.model,
+                "route_reason": row.route_reason,
+                "model_calls": row.model_calls,
+                "retries": row.retries,
+                "prompt_tokens": row.prompt_tokens,
+                "completion_tokens": row.completion_tokens,
+                "cost_usd": round(row.cost_usd, 6),
+                "latency_ms": row.latency_ms,
+                "cache_hit": row.cache_hit,
+                "error": row.error,
+                "created_at": row.created_at.isoformat() if row.created_at else None,
+            }
+            for row in rows
+        ]
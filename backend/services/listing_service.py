@@ -0,0 +1,82 @@
+from typing import Dict, List, Optional
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from ..models.email import Email, EmailContent
+from ..utils.compression import decompress
+
+class ListingService:
+    """ORM-free read path for bulk list responses.
+
+    Queries select only the columns a response needs, labelled with the
+    response field names, and return plain dicts that orjson serializes
+    directly (datetimes included), skipping ORM identity-map work and
+    per-row isoformat() calls.
+    """
+
+    @staticmethod
+    def _rows(db: Session, statement) -> List[Dict]:
+        result = db.execute(statement)
+        keys = list(result.keys())
+        return [dict(zip(keys, row)) for row in result]
+
+    def summaries(self, db: Session, owner: Optional[str] = None) -> List[Dict]:
+        """Summarized emails, newest first, optionally from one mailbox"""
+        statement = (
+            select(
+                Email.id,
+                Email.gmail_id.label("email_id"),
+                Email.subject,
+                Email.summary,
+                # Same defaults as the ORM path: missing or zero hours show as 0.25,
+                # except on mail the pre-filter marked non-billable
+                case(
+                    (Email.billable == False, 0.0),
+                    else_=func.coalesce(func.nullif(Email.billing_hours, 0), 0.25)
+                ).label("billing_hours"),
+                func.coalesce(Email.billing_description, "").label("billing_description"),
+                Email.date_sent,
+                Email.pushed_to_clio,
+                Email.owner,
+                func.coalesce(Email.billable, True).label("billable"),
+                Email.filter_rule,
+                Email.matter_id,
+                func.coalesce(Email.exclude_from_push, False).label("exclude_from_push"),
+                Email.updated_at,
+            )
+            .where(Email.summary.isnot(None))
+            .order_by(Email.date_sent.desc())
+        )
+        if owner:
+            statement = statement.where(Email.owner == owner)
+        return self._rows(db, statement)
+
+    def stored_emails(self, db: Session, owner: Optional[str] = None) -> List[Dict]:
+        """Stored emails with decompressed bodies, newest first, optionally from one mailbox"""
+        statement = (
+            select(
+                Email.gmail_id.label("id"),
+                Email.subject,
+                Email.sender,
+                Email.recipient,
+                EmailContent.body,
+                EmailContent.codec,
+                Email.date_sent,
+                Email.summary,
+                Email.billing_hours,
+                Email.billing_description,
+                Email.pushed_to_clio,
+                Email.owner,
+            )
+            .outerjoin(EmailContent, EmailContent.hash == Email.body_hash)
+            .order_by(Email.date_sent.desc())
+        )
+        if owner:
+            statement = statement.where(Email.owner == owner)
+
+        emails = self._rows(db, statement)
+        for email in emails:
+            compressed = email["body"]
+            codec = email.pop("codec")
+            email["body"] = decompress(compressed, codec).decode("utf-8") if compressed else ""
+        return emails
@@ -0,0 +1,152 @@
+import hashlib
+import hmac
+import json
+import secrets
+from typing import TYPE_CHECKING, Dict, List, Optional
+import logging
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.sync import GmailAccount, GmailSyncState
+
+if TYPE_CHECKING:
+    from google.oauth2.credentials import Credentials
+
+logger = logging.getLogger(__name__)
+
+class MailboxService:
+    """Connected Gmail mailboxes and their stored OAuth credentials.
+
+    Attorneys connect through the web OAuth flow; the authorized-user
+    JSON is kept in gmail_accounts and refreshed tokens are written back
+    there, so every worker and sync sees the same credentials.
+    """
+
+    @property
+    def redirect_uri(self) -> str:
+        return f"{settings.base_url}/api/mailboxes/callback"
+
+    def _flow(self, state: Optional[str] = None):
+        from google_auth_oauthlib.flow import Flow
+
+        # A confidential web client; without PKCE the callback can land on any worker
+        return Flow.from_client_secrets_file(
+            settings.google_client_secret_file,
+            scopes=settings.google_scopes_list,
+            redirect_uri=self.redirect_uri,
+            state=state,
+            autogenerate_code_verifier=False
+        )
+
+    @staticmethod
+    def _sign(nonce: str) -> str:
+        return hmac.new(settings.secret_key.encode("utf-8"), nonce.encode("utf-8"), hashlib.sha256).hexdigest()
+
+    def authorization_url(self) -> str:
+        """Google consent URL; offline access so syncs can refresh tokens unattended"""
+        nonce = secrets.token_urlsafe(16)
+        url, _ = self._flow().authorization_url(
+            access_type="offline",
+            prompt="consent",
+            include_granted_scopes="true",
+            state=f"{nonce}.{self._sign(nonce)}"
+        )
+        return url
+
+    def complete_authorization(self, code: str, state: str) -> str:
+        """Exchange the callback code, store the credentials and return the mailbox address"""
+        from googleapiclient.discovery import build
+
+        nonce, _, signature = (state or "").partition(".")
+        if not nonce or not hmac.compare_digest(signature, self._sign(nonce)):
+            raise ValueError("Invalid OAuth state")
+
+        flow = self._flow(state=state)
+        flow.fetch_token(code=code)
+        creds = flow.credentials
+
+        service = build("gmail", "v1", credentials=creds, cache_discovery=False)
+        owner = service.users().getProfile(userId="me").execute()["emailAddress"].lower()
+        self.save_credentials(owner, creds)
+        return owner
+
+    def save_credentials(self, owner: str, creds: "Credentials") -> None:
+        db = SessionLocal()
+        try:
+            account = db.query(GmailAccount).filter(GmailAccount.owner == owner).first()
+            if account:
+                account.credentials = creds.to_json()
+                account.active = True
+            else:
+                db.add(GmailAccount(owner=owner, credentials=creds.to_json(), active=True))
+            db.commit()
+            logger.info(f"Stored Gmail credentials for {owner}")
+        finally:
+            db.close()
+
+    def load_credentials(self, owner: str) -> Optional["Credentials"]:
+        """Credentials of an active mailbox, refreshed and saved back if expired"""
+        from google.auth.transport.requests import Request
+        from google.oauth2.credentials import Credentials
+
+        db = SessionLocal()
+        try:
+            account = db.query(GmailAccount).filter(
+                GmailAccount.owner == owner, GmailAccount.active == True
+            ).first()
+            if not account:
+                return None
+
+            creds = Credentials.from_authorized_user_info(json.loads(account.credentials))
+            if not creds.valid and creds.refresh_token:
+                creds.refresh(Request())
+                account.credentials = creds.to_json()
+                db.commit()
+            return creds
+        finally:
+            db.close()
+
+    def active_owners(self) -> List[str]:
+        db = SessionLocal()
+        try:
+            rows = db.query(GmailAccount.owner).filter(GmailAccount.active == True).order_by(GmailAccount.id).all()
+            return [row[0] for row in rows]
+        finally:
+            db.close()
+
+    def list_accounts(self) -> List[Dict]:
+        """Connected mailboxes with their sync position"""
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(GmailAccount, GmailSyncState)
+                .outerjoin(GmailSyncState, GmailSyncState.mailbox == GmailAccount.owner)
+                .order_by(GmailAccount.id)
+                .all()
+            )
+            return [
+                {
+                    "owner": account.owner,
+                    "active": account.active,
+                    "connected_at": account.created_at.isoformat() if account.created_at else None,
+                    "history_id": state.history_id if state else None,
+                    "last_synced_at": state.last_synced_at.isoformat() if state and state.last_synced_at else None,
+                }
+                for account, state in rows
+            ]
+        finally:
+            db.close()
+
+    def deactivate(self, owner: str) -> bool:
+        """Stop syncing a mailbox and forget its credentials; its emails are kept"""
+        db = SessionLocal()
+        try:
+            account = db.query(GmailAccount).filter(GmailAccount.owner == owner).first()
+            if not account:
+                return False
+            account.active = False
+            account.credentials = "{}"
+            db.commit()
+            return True
+        finally:
+            db.close()
@@ -0,0 +1,312 @@
+import asyncio
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Deque, Dict, List, Optional
+from starlette.concurrency import run_in_threadpool
+import logging
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.sync import GmailSyncState
+from .gmail_service import QUOTA_UNITS, GmailService, HistoryExpired
+from .ingest_service import IngestService
+from .lease_service import lease_service
+from .mailbox_service import MailboxService
+
+logger = logging.getLogger(__name__)
+
+# Consecutive failures after which a mailbox is left for the next run
+MAX_MAILBOX_ERRORS = 3
+# Times a message that failed to fetch is requeued before it is left for the next run
+MAX_MESSAGE_RETRIES = 3
+
+class QuotaBudget:
+    """Token bucket of Gmail quota units for one mailbox.
+
+    Calls are charged after they are made, so the balance can go
+    negative; a mailbox only gets another turn once it has refilled
+    enough for the work it is about to do.
+    """
+
+    def __init__(self, units_per_second: float, burst: float):
+        self.units_per_second = units_per_second
+        self.burst = burst
+        self._units = burst
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._units = min(self.burst, self._units + (now - self._updated) * self.units_per_second)
+        self._updated = now
+
+    def wait_time(self, units: float) -> float:
+        """Seconds until units are available"""
+        self._refill()
+        return max(0.0, (min(units, self.burst) - self._units) / self.units_per_second)
+
+    def spend(self, units: float) -> None:
+        self._refill()
+        self._units -= units
+
+class MailboxCursor:
+    """Sync progress of one mailbox within a run"""
+
+    def __init__(self, owner: str):
+        self.owner = owner
+        self.gmail_service = GmailService(owner=owner)
+        self.phase = "start"
+        self.pending: Deque[str] = deque()
+        self.query: Optional[str] = None
+        self.page_token: Optional[str] = None
+        self.listed = 0
+        self.history_id: Optional[str] = None
+        self.retries: Dict[str, int] = {}
+        self.failed_ids: List[str] = []
+        self.errors = 0
+        self.stats = {"turns": 0, "fetched": 0, "new_emails": 0, "quota_units": 0, "throttled": 0}
+        self.error: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        return self.phase in ("done", "failed")
+
+    def to_dict(self) -> Dict:
+        return {
+            "owner": self.owner,
+            "phase": self.phase,
+            "pending": len(self.pending),
+            "failed": len(self.failed_ids),
+            "error": self.error,
+            **self.stats,
+        }
+
+class MailboxSyncService:
+    """Syncs every connected mailbox with round-robin fairness.
+
+    Each mailbox's work is split into turns of at most batch_size
+    messages. Workers take the mailbox at the head of a shared queue, do
+    one turn and put it back at the tail, so a mailbox with a huge
+    backlog gets the same share of turns as one with three new messages.
+    Each mailbox has its own Gmail quota budget; one that has used it up
+    sits out until it refills while the others keep going.
+    """
+
+    def __init__(self):
+        self.concurrency = settings.mailbox_sync_concurrency
+        self.batch_size = settings.mailbox_sync_batch_size
+        self.days_back = settings.mailbox_sync_days_back
+        self.max_messages = settings.mailbox_sync_max_messages
+        self.units_per_second = settings.mailbox_quota_units_per_second
+        self.mailbox_service = MailboxService()
+        self.ingest_service = IngestService()
+        self.runs = 0
+        self.last_run: Optional[Dict] = None
+        self._budgets: Dict[str, QuotaBudget] = {}
+        self._cursors: List[MailboxCursor] = []
+        self._lock = asyncio.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    @property
+    def turn_cost(self) -> int:
+        """Quota units one turn can use: a page listing plus batch_size message fetches"""
+        return QUOTA_UNITS["messages.list"] + self.batch_size * QUOTA_UNITS["messages.get"]
+
+    def _budget(self, owner: str) -> QuotaBudget:
+        budget = self._budgets.get(owner)
+        if budget is None:
+            budget = self._budgets[owner] = QuotaBudget(
+                self.units_per_second, max(self.units_per_second, self.turn_cost)
+            )
+        return budget
+
+    async def run_once(self, owners: Optional[List[str]] = None) -> Dict:
+        """Sync the given mailboxes, or every active one, until each is caught up"""
+        if self._lock.locked():
+            return {"success": False, "message": "Mailbox sync is already running"}
+
+        async with self._lock, lease_service.hold("mailbox-sync", ttl_seconds=300) as acquired:
+            if not acquired:
+                return {"success": False, "message": "Mailbox sync is already running on another worker"}
+
+            started = time.perf_counter()
+            started_at = datetime.utcnow()
+            active = await run_in_threadpool(self.mailbox_service.active_owners)
+            self._cursors = [MailboxCursor(owner) for owner in active if owners is None or owner in owners]
+
+            queue: asyncio.Queue = asyncio.Queue()
+            for cursor in self._cursors:
+                queue.put_nowait(cursor)
+            remaining = [len(self._cursors)]
+
+            await asyncio.gather(
+                *[self._worker(queue, remaining) for _ in range(min(self.concurrency, len(self._cursors)))]
+            )
+
+            self.runs += 1
+            self.last_run = {
+                "started_at": started_at.isoformat(),
+                "duration_seconds": round(time.perf_counter() - started, 3),
+                "mailboxes": [cursor.to_dict() for cursor in self._cursors],
+            }
+            self._cursors = []
+            logger.info(
+                f"Mailbox sync of {len(self.last_run['mailboxes'])} mailboxes "
+                f"finished in {self.last_run['duration_seconds']}s"
+            )
+            return {"success": True, **self.last_run}
+
+    async def _worker(self, queue: asyncio.Queue, remaining: List[int]) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            cursor = await queue.get()
+            if cursor is None:
+                return
+
+            budget = self._budget(cursor.owner)
+            wait = budget.wait_time(self.turn_cost)
+            if wait > 0:
+                # Rejoin the queue once refilled; other mailboxes go meanwhile
+                cursor.stats["throttled"] += 1
+                loop.call_later(wait, queue.put_nowait, cursor)
+                continue
+
+            units_before = cursor.gmail_service.quota_units
+            try:
+                await self._turn(cursor)
+                cursor.errors = 0
+            except Exception as e:
+                cursor.errors += 1
+                cursor.error = str(e)
+                logger.error(f"Mailbox sync turn failed for {cursor.owner}: {e}")
+                if cursor.errors >= MAX_MAILBOX_ERRORS or not cursor.gmail_service.service:
+                    cursor.phase = "failed"
+            finally:
+                used = cursor.gmail_service.quota_units - units_before
+                budget.spend(used)
+                cursor.stats["quota_units"] += used
+                cursor.stats["turns"] += 1
+
+            if cursor.done:
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    for _ in range(self.concurrency):
+                        queue.put_nowait(None)
+            else:
+                queue.put_nowait(cursor)
+
+    async def _turn(self, cursor: MailboxCursor) -> None:
+        """Advance one mailbox by a bounded amount of work"""
+        if cursor.phase == "start":
+            await self._start(cursor)
+            return
+
+        if cursor.phase == "listing" and not cursor.pending:
+            message_ids, cursor.page_token = await cursor.gmail_service.list_message_ids(
+                cursor.query, min(self.batch_size, self.max_messages - cursor.listed), cursor.page_token
+            )
+            cursor.pending.extend(message_ids)
+            cursor.listed += len(message_ids)
+            if not cursor.page_token or cursor.listed >= self.max_messages:
+                cursor.phase = "fetching"
+
+        batch = [cursor.pending.popleft() for _ in range(min(self.batch_size, len(cursor.pending)))]
+        fetched = await cursor.gmail_service.fetch_messages(batch)
+        records = fetched["emails"]
+        for message_id in fetched["failed_ids"]:
+            cursor.retries[message_id] = cursor.retries.get(message_id, 0) + 1
+            if cursor.retries[message_id] <= MAX_MESSAGE_RETRIES:
+                cursor.pending.append(message_id)
+            else:
+                cursor.failed_ids.append(message_id)
+        if records:
+            cursor.stats["fetched"] += len(records)
+            cursor.stats["new_emails"] += await run_in_threadpool(self._store, records)
+
+        if cursor.phase == "fetching" and not cursor.pending:
+            if cursor.failed_ids:
+                # Keep the old position so the next run lists these again; stored ones are skipped
+                cursor.error = f"{len(cursor.failed_ids)} messages could not be fetched"
+                logger.warning(f"Mailbox sync of {cursor.owner} left its position unchanged: {cursor.error}")
+            else:
+                await run_in_threadpool(self._save_position, cursor.owner, cursor.history_id)
+            cursor.phase = "done"
+
+    async def _start(self, cursor: MailboxCursor) -> None:
+        """Queue what changed since the last sync, or backfill a mailbox seen for the first time"""
+        state_history_id = await run_in_threadpool(self._load_position, cursor.owner)
+
+        if state_history_id:
+            try:
+                result = await cursor.gmail_service.history_message_ids(state_history_id)
+                cursor.pending.extend(result["message_ids"][:self.max_messages])
+                cursor.history_id = result["history_id"]
+                cursor.phase = "fetching"
+                return
+            except HistoryExpired:
+                logger.warning(f"Gmail history {state_history_id} of {cursor.owner} expired, backfilling instead")
+
+        # Take the position first so nothing that arrives during the backfill is missed next run
+        profile = await cursor.gmail_service.get_profile()
+        cursor.history_id = str(profile["historyId"])
+        start_date = datetime.now() - timedelta(days=self.days_back)
+        cursor.query = f"after:{start_date.strftime('%Y/%m/%d')}"
+        cursor.phase = "listing"
+
+    def _store(self, records: List[Dict]) -> int:
+        db = SessionLocal()
+        try:
+            result = self.ingest_service.store_emails(db, records)
+            db.commit()
+            return len(result["new_ids"])
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    @staticmethod
+    def _load_position(owner: str) -> Optional[str]:
+        db = SessionLocal()
+        try:
+            state = db.query(GmailSyncState).filter(GmailSyncState.mailbox == owner).first()
+            return state.history_id if state else None
+        finally:
+            db.close()
+
+    @staticmethod
+    def _save_position(owner: str, history_id: Optional[str]) -> None:
+        db = SessionLocal()
+        try:
+            state = db.query(GmailSyncState).filter(GmailSyncState.mailbox == owner).first()
+            if not state:
+                state = GmailSyncState(mailbox=owner)
+                db.add(state)
+            if history_id:
+                state.history_id = history_id
+            state.last_synced_at = datetime.utcnow()
+            db.commit()
+        finally:
+            db.close()
+
+    async def run_scheduled(self, interval_minutes: float) -> None:
+        """Sync every connected mailbox every interval_minutes until cancelled"""
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Scheduled mailbox sync failed: {e}")
+            await asyncio.sleep(interval_minutes * 60)
+
+    def status(self) -> Dict:
+        return {
+            "running": self.running,
+            "runs": self.runs,
+            "last_run": self.last_run,
+            "mailboxes": [cursor.to_dict() for cursor in self._cursors],
+        }
+
+mailbox_sync_service = MailboxSyncService()
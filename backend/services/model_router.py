@@ -0,0 +1,191 @@
+import json
+import re
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+import logging
+
+from ..core.config import settings
+from ..core.metrics import OPENAI_COST, OPENAI_REQUEST_DURATION, MODEL_ROUTES, record_openai_usage
+from ..models.email import Email
+
+logger = logging.getLogger(__name__)
+
+# USD per 1K prompt / completion tokens; OPENAI_MODEL_PRICES adds or overrides
+DEFAULT_PRICES = {
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4": (0.03, 0.06),
+}
+
+# Billing entries for one email beyond this are treated as a bad answer
+MAX_BILLING_HOURS = 10.0
+
+_ADDRESS = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+_CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English)"""
+    return (len(text) + 3) // 4
+
+def parse_summary(content: str) -> Tuple[Optional[Dict], Optional[str]]:
+    """The summary fields of a model answer, or the reason it can't be used"""
+    try:
+        data = json.loads(_CODE_FENCE.sub("", content.strip()))
+    except json.JSONDecodeError:
+        return None, "not JSON"
+    if not isinstance(data, dict):
+        return None, "not a JSON object"
+    if not isinstance(data.get("summary"), str) or not data["summary"].strip():
+        return None, "missing summary"
+    if not isinstance(data.get("billing_description"), str) or not data["billing_description"].strip():
+        return None, "missing billing_description"
+    try:
+        hours = float(data.get("billing_hours"))
+    except (TypeError, ValueError):
+        return None, "billing_hours is not a number"
+    if not 0 < hours <= MAX_BILLING_HOURS:
+        return None, f"billing_hours {hours} out of range"
+    data["billing_hours"] = hours
+    return data, None
+
+class ModelStats:
+    """Calls, tokens, cost and recent latencies of one model in this worker"""
+
+    def __init__(self, history: int = 500):
+        self.calls = 0
+        self.errors = 0
+        self.invalid = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.latencies: Deque[float] = deque(maxlen=history)
+
+    def to_dict(self) -> Dict:
+        latencies = sorted(self.latencies)
+
+        def percentile(fraction: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(int(len(latencies) * fraction), len(latencies) - 1)], 3)
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "invalid": self.invalid,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost_usd": round(self.cost, 6),
+            "latency_p50_seconds": percentile(0.5),
+            "latency_p95_seconds": percentile(0.95),
+        }
+
+class ModelRouter:
+    """Picks the model for each email and escalates answers that fail validation.
+
+    Short, simple mail goes to the fast model. Mail over the token
+    threshold, with many recipients or matching the complexity patterns
+    goes straight to the strong model, and a fast-model answer that
+    isn't usable JSON with sane hours is retried on the strong model.
+    With no strong model configured every email uses the fast one.
+    """
+
+    def __init__(
+        self,
+        fast_model: str,
+        strong_model: str = "",
+        escalate_tokens: int = 200,
+        escalate_recipients: int = 5,
+        escalate_pattern: str = "",
+        prices: Optional[Dict[str, Tuple[float, float]]] = None,
+    ):
+        self.fast_model = fast_model
+        self.strong_model = strong_model if strong_model and strong_model != fast_model else ""
+        self.escalate_tokens = escalate_tokens
+        self.escalate_recipients = escalate_recipients
+        self.escalate_pattern = re.compile(escalate_pattern, re.IGNORECASE) if escalate_pattern else None
+        self.prices = {**DEFAULT_PRICES, **(prices or {})}
+        self._stats: Dict[str, ModelStats] = {}
+        self._escalations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def route(self, email: Email) -> Tuple[str, str]:
+        """(model, reason) for an email's first attempt"""
+        if not self.strong_model:
+            return self.fast_model, "single"
+        body = email.body or ""
+        if estimate_tokens(f"{email.subject or ''}\n{body}") >= self.escalate_tokens:
+            return self.strong_model, "tokens"
+        if len(_ADDRESS.findall(email.recipient or "")) >= self.escalate_recipients:
+            return self.strong_model, "recipients"
+        if self.escalate_pattern and self.escalate_pattern.search(f"{email.subject or ''}\n{body}"):
+            return self.strong_model, "pattern"
+        return self.fast_model, "simple"
+
+    def escalation(self, model: str) -> Optional[str]:
+        """The model to retry on after model's answer failed, if any"""
+        return self.strong_model if self.strong_model and model != self.strong_model else None
+
+    def cost(self, model: str, prompt_tokens: int, completion_tokens: int) -> float:
+        prompt_price, completion_price = self.prices.get(model, (0.0, 0.0))
+        return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+
+    def record_route(self, model: str, reason: str) -> None:
+        MODEL_ROUTES.labels(model, reason).inc()
+        if reason == "invalid":
+            with self._lock:
+                self._escalations[model] = self._escalations.get(model, 0) + 1
+
+    def record_call(self, model: str, elapsed: float, usage=None, outcome: str = "success") -> float:
+        """Account one model call; returns its cost in USD"""
+        prompt_tokens = (usage.prompt_tokens or 0) if usage is not None else 0
+        completion_tokens = (usage.completion_tokens or 0) if usage is not None else 0
+        cost = self.cost(model, prompt_tokens, completion_tokens)
+        OPENAI_REQUEST_DURATION.labels(model).observe(elapsed)
+        OPENAI_COST.labels(model).inc(cost)
+        record_openai_usage(model, usage)
+
+        with self._lock:
+            stats = self._stats.setdefault(model, ModelStats())
+            stats.calls += 1
+            stats.errors += outcome == "error"
+            stats.invalid += outcome == "invalid"
+            stats.prompt_tokens += prompt_tokens
+            stats.completion_tokens += completion_tokens
+            stats.cost += cost
+            stats.latencies.append(elapsed)
+        return cost
+
+    def status(self) -> Dict:
+        with self._lock:
+            models = {model: stats.to_dict() for model, stats in self._stats.items()}
+            escalated = dict(self._escalations)
+        return {
+            "fast_model": self.fast_model,
+            "strong_model": self.strong_model or None,
+            "escalate_tokens": self.escalate_tokens,
+            "escalate_recipients": self.escalate_recipients,
+            "escalate_pattern": self.escalate_pattern.pattern if self.escalate_pattern else None,
+            "escalations": escalated,
+            "models": models,
+        }
+
+def _load_prices() -> Dict[str, Tuple[float, float]]:
+    if not settings.openai_model_prices:
+        return {}
+    try:
+        return {model: tuple(price) for model, price in json.loads(settings.openai_model_prices).items()}
+    except (ValueError, TypeError) as e:
+        logger.error(f"Ignoring OPENAI_MODEL_PRICES: {e}")
+        return {}
+
+model_router = ModelRouter(
+    fast_model=settings.openai_model,
+    strong_model=settings.openai_strong_model,
+    escalate_tokens=settings.routing_escalate_tokens,
+    escalate_recipients=settings.routing_escalate_recipients,
+    escalate_pattern=settings.routing_escalate_pattern,
+    prices=_load_prices()
+)
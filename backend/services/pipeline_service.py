@@ -0,0 +1,293 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy.orm import selectinload
+from starlette.concurrency import run_in_threadpool
+import logging
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.email import Email
+from .clio_service import ClioService
+from .gmail_service import GmailService
+from .ingest_service import IngestService
+from .lease_service import lease_service
+from .summarizer_service import SummarizerService
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("fetch", "prepare", "summarize", "push")
+
+_DONE = object()
+
+class Channel:
+    """Bounded queue between stages that closes once every producer is done"""
+
+    def __init__(self, maxsize: int, producers: int, consumers: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.producers = producers
+        self.consumers = consumers
+
+    async def put(self, item) -> None:
+        await self.queue.put(item)
+
+    async def get(self):
+        return await self.queue.get()
+
+    async def close(self) -> None:
+        self.producers -= 1
+        if self.producers == 0:
+            for _ in range(self.consumers):
+                await self.queue.put(_DONE)
+
+    async def get_batch(self, max_items: int) -> List:
+        """Wait for one item, then take whatever else is already queued"""
+        items = [await self.queue.get()]
+        while items[-1] is not _DONE and len(items) < max_items and not self.queue.empty():
+            items.append(self.queue.get_nowait())
+        return items
+
+class StageStats:
+    def __init__(self):
+        self.processed = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+
+    def to_dict(self, channel: Optional[Channel]) -> Dict:
+        return {
+            "processed": self.processed,
+            "errors": self.errors,
+            "queue_depth": channel.queue.qsize() if channel else 0,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "throughput_per_second": round(self.processed / self.busy_seconds, 3) if self.busy_seconds else 0.0,
+        }
+
+class PipelineService:
+    """Runs fetch -> prepare -> summarize -> push as concurrent stages.
+
+    Stages are connected by bounded queues, so a slow stage applies
+    backpressure instead of letting work pile up in memory, and an email
+    moves on as soon as its previous stage is done with it.
+    """
+
+    def __init__(self):
+        self.days_back = settings.pipeline_days_back
+        self.max_results = settings.pipeline_max_results
+        self.queue_size = settings.pipeline_queue_size
+        self.summarize_concurrency = settings.pipeline_summarize_concurrency
+        self.push_enabled = settings.pipeline_push
+        self.stats: Dict[str, StageStats] = {stage: StageStats() for stage in STAGES}
+        self.runs = 0
+        self.last_run: Optional[Dict] = None
+        self._channels: Dict[str, Channel] = {}
+        self._lock = asyncio.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    async def run_once(self) -> Dict:
+        """Run every stage until the fetched batch and backlog are drained"""
+        if self._lock.locked():
+            return {"success": False, "message": "Pipeline is already running"}
+
+        async with self._lock, lease_service.hold("pipeline", ttl_seconds=300) as acquired:
+            if not acquired:
+                return {"success": False, "message": "Pipeline is already running on another worker"}
+
+            started = time.perf_counter()
+            started_at = datetime.utcnow()
+            self.stats = {stage: StageStats() for stage in STAGES}
+
+            backlog = await run_in_threadpool(self._load_backlog)
+
+            fetched = Channel(self.queue_size, producers=1, consumers=1)
+            to_summarize = Channel(self.queue_size, producers=2, consumers=self.summarize_concurrency)
+            to_push = Channel(self.queue_size, producers=self.summarize_concurrency + 1, consumers=1)
+            self._channels = {"prepare": fetched, "summarize": to_summarize, "push": to_push}
+
+            results = await asyncio.gather(
+                self._fetch_stage(fetched),
+                self._prepare_stage(fetched, to_summarize),
+                self._seed_backlog(backlog, to_summarize, to_push),
+                *[self._summarize_stage(to_summarize, to_push) for _ in range(self.summarize_concurrency)],
+                self._push_stage(to_push),
+                return_exceptions=True
+            )
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error(f"Pipeline stage failed: {result}")
+
+            self.runs += 1
+            self.last_run = {
+                "started_at": started_at.isoformat(),
+                "duration_seconds": round(time.perf_counter() - started, 3),
+                "stages": self.status()["stages"],
+            }
+            self._channels = {}
+            logger.info(f"Pipeline run finished in {self.last_run['duration_seconds']}s")
+            return {"success": True, **self.last_run}
+
+    def _load_backlog(self) -> Dict[str, List[int]]:
+        """Ids left over from earlier runs or manual fetches"""
+        db = SessionLocal()
+        try:
+            unsummarized = [row[0] for row in db.query(Email.id).filter(Email.summary.is_(None)).all()]
+            unpushed = [
+                row[0] for row in
+                db.query(Email.id).filter(
+                    Email.summary.isnot(None), Email.pushed_to_clio == False, Email.billable.isnot(False),
+                    Email.exclude_from_push.isnot(True)
+                ).all()
+            ]
+            return {"summarize": unsummarized, "push": unpushed}
+        finally:
+            db.close()
+
+    async def _seed_backlog(self, backlog: Dict[str, List[int]], to_summarize: Channel, to_push: Channel) -> None:
+        try:
+            for email_id in backlog["summarize"]:
+                await to_summarize.put(email_id)
+            for email_id in backlog["push"]:
+                await to_push.put(email_id)
+        finally:
+            await to_summarize.close()
+            await to_push.close()
+
+    async def _fetch_stage(self, output: Channel) -> None:
+        stats = self.stats["fetch"]
+        try:
+            end_date = datetime.now() + timedelta(days=1)
+            start_date = end_date - timedelta(days=self.days_back + 1)
+            started = time.perf_counter()
+            async for record in GmailService().iter_emails(start_date, end_date, self.max_results):
+                stats.processed += 1
+                stats.busy_seconds += time.perf_counter() - started
+                await output.put(record)
+                started = time.perf_counter()
+        except Exception as e:
+            stats.errors += 1
+            logger.error(f"Pipeline fetch stage error: {e}")
+        finally:
+            await output.close()
+
+    async def _prepare_stage(self, input: Channel, output: Channel) -> None:
+        stats = self.stats["prepare"]
+        ingest_service = IngestService()
+
+        def store(records: List[Dict]) -> List[int]:
+            db = SessionLocal()
+            try:
+                result = ingest_service.store_emails(db, records)
+                db.commit()
+                return [result["emails"][gmail_id].id for gmail_id in result["new_ids"]]
+            finally:
+                db.close()
+
+        try:
+            while True:
+                batch = await input.get_batch(50)
+                done = batch[-1] is _DONE
+                records = [record for record in batch if record is not _DONE]
+                if records:
+                    started = time.perf_counter()
+                    try:
+                        new_ids = await run_in_threadpool(store, records)
+                        stats.processed += len(records)
+                    except Exception as e:
+                        new_ids = []
+                        stats.errors += len(records)
+                        logger.error(f"Pipeline prepare stage error: {e}")
+                    stats.busy_seconds += time.perf_counter() - started
+                    for email_id in new_ids:
+                        await output.put(email_id)
+                if done:
+                    break
+        finally:
+            await output.close()
+
+    async def _summarize_stage(self, input: Channel, output: Channel) -> None:
+        stats = self.stats["summarize"]
+        summarizer_service = SummarizerService()
+        try:
+            while True:
+                email_id = await input.get()
+                if email_id is _DONE:
+                    break
+
+                started = time.perf_counter()
+                db = SessionLocal()
+                try:
+                    # Not claimed: already summarized, or another worker or request is on it
+                    if summarizer_service.claim(db, [email_id]):
+                        email = db.query(Email).options(selectinload(Email.content)).filter(Email.id == email_id).first()
+                        await summarizer_service.summarize_email(db, email)
+                        db.commit()
+                    stats.processed += 1
+                except Exception as e:
+                    db.rollback()
+                    summarizer_service.release(db, email_id)
+                    stats.errors += 1
+                    logger.error(f"Pipeline summarize stage error for email {email_id}: {e}")
+                    continue
+                finally:
+                    db.close()
+                    stats.busy_seconds += time.perf_counter() - started
+
+                await output.put(email_id)
+        finally:
+            await output.close()
+
+    async def _push_stage(self, input: Channel) -> None:
+        stats = self.stats["push"]
+        clio_service = ClioService()
+        while True:
+            batch = await input.get_batch(25)
+            done = batch[-1] is _DONE
+            email_ids = [email_id for email_id in batch if email_id is not _DONE]
+
+            if email_ids and self.push_enabled:
+                started = time.perf_counter()
+                db = SessionLocal()
+                try:
+                    result = await clio_service.push_time_entries(db, email_ids)
+                    if result.get("success"):
+                        stats.processed += result.get("pushed_count", 0)
+                        stats.errors += len(result.get("errors", []))
+                    else:
+                        # Usually no Clio token yet; entries stay queued for a later push
+                        logger.warning(f"Pipeline push skipped: {result.get('message')}")
+                except Exception as e:
+                    # Keep draining: a stalled consumer would block the summarize stage on a full channel
+                    db.rollback()
+                    stats.errors += 1
+                    logger.error(f"Pipeline push stage error for {len(email_ids)} emails: {e}")
+                finally:
+                    db.close()
+                    stats.busy_seconds += time.perf_counter() - started
+
+            if done:
+                break
+
+    async def run_scheduled(self, interval_minutes: float) -> None:
+        """Run the pipeline every interval_minutes until cancelled"""
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Scheduled pipeline run failed: {e}")
+            await asyncio.sleep(interval_minutes * 60)
+
+    def status(self) -> Dict:
+        return {
+            "running": self.running,
+            "runs": self.runs,
+            "last_run": self.last_run,
+            "stages": {
+                stage: self.stats[stage].to_dict(self._channels.get(stage))
+                for stage in STAGES
+            },
+        }
+
+pipeline_service = PipelineService()
@@ -0,0 +1,192 @@
+import fnmatch
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Pattern
+import logging
+
+from ..core.config import settings
+from ..models.email import Email
+from ..utils.email_parser import extract_email_address
+
+logger = logging.getLogger(__name__)
+
+ACTIONS = ("skip", "template")
+
+# Used when PREFILTER_RULES_FILE is unset. First matching rule wins, so
+# specific billable notices come before the broad no-reply catch-all.
+DEFAULT_RULES = [
+    {
+        "name": "court-efiling",
+        "action": "template",
+        "description": "Court electronic filing notice",
+        "subject": [r"\bActivity in Case\b", r"\bNotice of Electronic Filing\b", r"\bNEF\b"],
+        "summary": "Reviewed notice of electronic filing: {subject}",
+        "billing_hours": 0.1,
+        "billing_description": "Review court e-filing notice",
+    },
+    {
+        "name": "auto-reply",
+        "action": "skip",
+        "description": "Automatic reply",
+        "headers": {"auto-submitted": r"^(?!no\b)", "x-autoreply": "", "x-autorespond": ""},
+    },
+    {
+        "name": "out-of-office",
+        "action": "skip",
+        "description": "Out-of-office reply",
+        "subject": [r"^(automatic reply|auto[- ]?reply|out of (the )?office)\b"],
+    },
+    {
+        "name": "calendar",
+        "action": "skip",
+        "description": "Calendar notification",
+        "subject": [r"^(updated )?invitation( with note)?:", r"^(accepted|declined|tentatively accepted|canceled event)( with note)?:"],
+    },
+    {
+        "name": "mailing-list",
+        "action": "skip",
+        "description": "Newsletter or mailing list",
+        "headers": {"list-unsubscribe": "", "list-id": "", "precedence": r"^(bulk|list|junk)$"},
+    },
+    {
+        "name": "receipt",
+        "action": "skip",
+        "description": "Receipt or payment notification",
+        # Anchored to shop and billing-system phrasing: "receipt" or "payment received"
+        # alone also shows up in discovery and settlement correspondence
+        "subject": [
+            r"^(your|thanks for your|thank you for your) (\S+ )?(receipt|purchase)\b",
+            r"^your (\S+ )?(receipt|invoice) (from|for)\b",
+            r"^(your )?(\S+ )?order (#|no\.|number|confirmation|has shipped|is on its way)",
+            r"^(order|purchase|payment) confirmation\b",
+        ],
+    },
+    {
+        "name": "no-reply",
+        "action": "skip",
+        "description": "Automated notification",
+        "senders": ["*noreply*", "*no-reply*", "*donotreply*", "*do-not-reply*", "mailer-daemon@*", "postmaster@*"],
+    },
+]
+
+def _any_of(patterns: List[str]) -> Pattern:
+    return re.compile("|".join(f"(?:{pattern})" for pattern in patterns), re.IGNORECASE)
+
+class PrefilterRule:
+    """One configured rule with its patterns compiled.
+
+    Each condition kind (headers, senders, subject, body) matches when
+    any of its patterns does; a rule matches when every kind it sets
+    matches.
+    """
+
+    def __init__(self, config: Dict):
+        self.name = config["name"]
+        self.action = config.get("action", "skip")
+        if self.action not in ACTIONS:
+            raise ValueError(f"Rule {self.name}: action must be one of {', '.join(ACTIONS)}")
+        self.description = config.get("description", self.name)
+
+        self.headers = {name.lower(): re.compile(pattern, re.IGNORECASE) for name, pattern in (config.get("headers") or {}).items()}
+        senders = config.get("senders") or []
+        self.senders = _any_of([fnmatch.translate(sender.lower()) for sender in senders]) if senders else None
+        self.subject = _any_of(config["subject"]) if config.get("subject") else None
+        self.body = _any_of(config["body"]) if config.get("body") else None
+        if not (self.headers or self.senders or self.subject or self.body):
+            raise ValueError(f"Rule {self.name} has no conditions")
+
+        self.summary = config.get("summary", "Not billable: {description} - {subject}")
+        self.billing_hours = float(config.get("billing_hours", 0.0)) if self.action == "template" else 0.0
+        if self.action == "template" and self.billing_hours <= 0:
+            # Zero hours on billable mail would be read as the 0.25 default
+            raise ValueError(f"Rule {self.name}: template rules need billing_hours > 0; use skip for non-billable mail")
+        self.billing_description = config.get("billing_description", f"Non-billable: {self.description}")
+        # Fail at load time, not on the first email, if a template has an unknown field
+        self.render({"subject": "", "sender": "", "description": ""})
+
+    def matches(self, headers: Dict[str, str], sender: str, subject: str, body: Optional[str]) -> bool:
+        if self.headers and not any(
+            name in headers and pattern.search(headers[name]) for name, pattern in self.headers.items()
+        ):
+            return False
+        if self.senders and not self.senders.match(sender):
+            return False
+        if self.subject and not self.subject.search(subject):
+            return False
+        if self.body and not (body and self.body.search(body)):
+            return False
+        return True
+
+    def render(self, fields: Dict[str, str]) -> Dict:
+        return {
+            "summary": self.summary.format(**fields),
+            "billing_hours": self.billing_hours,
+            "billing_description": self.billing_description.format(**fields),
+            "billable": self.action == "template",
+            "filter_rule": self.name,
+        }
+
+@lru_cache(maxsize=4)
+def _load_rules(path: str, modified: float) -> List[PrefilterRule]:
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            configs = json.load(f)
+        logger.info(f"Loaded {len(configs)} pre-filter rules from {path}")
+    else:
+        configs = DEFAULT_RULES
+    return [PrefilterRule(config) for config in configs]
+
+@lru_cache(maxsize=4)
+def _warn_missing_rules_file(path: str) -> None:
+    # Cached so the warning is logged once per path, not once per service
+    logger.warning(f"Pre-filter rules file {path} not found, using the built-in rules")
+
+class PrefilterService:
+    """Classifies emails before summarization so obvious non-billable mail never reaches the model.
+
+    Rules look at the stored signal headers, the sender address, the
+    subject and the body. A "skip" match gets a zero-hour, non-billable
+    summary; a "template" match gets a fixed billable summary. Either way
+    no model call is made.
+    """
+
+    def __init__(self, rules: Optional[List[PrefilterRule]] = None):
+        if rules is not None:
+            self.rules = rules
+        elif not settings.prefilter_enabled:
+            self.rules = []
+        else:
+            path = settings.prefilter_rules_file
+            if path and not os.path.exists(path):
+                _warn_missing_rules_file(path)
+                path = ""
+            # Keyed by modification time so edits to the file are picked up
+            self.rules = _load_rules(path, os.path.getmtime(path) if path else 0.0)
+
+    def classify(self, email: Email) -> Optional[PrefilterRule]:
+        """First rule the email matches, or None if it needs a real summary"""
+        if not self.rules:
+            return None
+
+        headers = json.loads(email.signal_headers) if email.signal_headers else {}
+        sender = extract_email_address(email.sender or "").lower()
+        subject = email.subject or ""
+        body = None
+
+        for rule in self.rules:
+            if rule.body is not None and body is None:
+                # Only decompress the body when a rule needs it
+                body = email.body
+            if rule.matches(headers, sender, subject, body):
+                return rule
+        return None
+
+    @staticmethod
+    def summarize(rule: PrefilterRule, email: Email) -> Dict:
+        return rule.render({
+            "subject": email.subject or "(no subject)",
+            "sender": email.sender or "",
+            "description": rule.description,
+        })
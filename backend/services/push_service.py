@@ -0,0 +1,271 @@
+import asyncio
+import base64
+import json
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from starlette.concurrency import run_in_threadpool
+import logging
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.sync import GmailSyncState
+from .gmail_service import GmailService, HistoryExpired
+from .ingest_service import IngestService
+from .lease_service import lease_service
+
+logger = logging.getLogger(__name__)
+
+MAILBOX = "me"
+
+class GmailPushService:
+    """Turns Gmail Pub/Sub notifications into incremental fetches.
+
+    Notifications only carry the mailbox's new historyId. Bursts are
+    coalesced: the first one schedules a sync after a short debounce,
+    later ones just raise the target history id, and a notification that
+    arrives mid-sync triggers one follow-up sync. Only notifications for
+    the default mailbox, whose address is stored with the watch, count.
+    """
+
+    def __init__(self, debounce_seconds: Optional[float] = None):
+        self.debounce_seconds = (
+            settings.gmail_push_debounce_seconds if debounce_seconds is None else debounce_seconds
+        )
+        self.notifications_received = 0
+        self.syncs_run = 0
+        self._target_history_id: Optional[int] = None
+        self._scheduled: Optional[asyncio.Task] = None
+        self._running = False
+        self._rerun = False
+        self._email_address: Optional[str] = None
+
+    @staticmethod
+    def decode_envelope(envelope: Dict) -> Dict:
+        """Decode a Pub/Sub push envelope into the Gmail notification"""
+        message = envelope.get("message") or {}
+        data = message.get("data")
+        if not data:
+            raise ValueError("Push envelope has no message data")
+
+        payload = json.loads(base64.urlsafe_b64decode(data + "=" * (-len(data) % 4)))
+        if "historyId" not in payload:
+            raise ValueError("Notification has no historyId")
+
+        return {
+            "email_address": payload.get("emailAddress"),
+            "history_id": int(payload["historyId"]),
+            "message_id": message.get("messageId") or message.get("message_id"),
+        }
+
+    async def is_own_mailbox(self, email_address: Optional[str]) -> bool:
+        """Whether a notification is for the mailbox this service syncs"""
+        if not email_address:
+            return False
+        if self._email_address is None:
+            self._email_address = await run_in_threadpool(self._load_email_address)
+        if self._email_address is None:
+            # Watch started before addresses were stored; ask Gmail once
+            try:
+                profile = await GmailService().get_profile()
+            except Exception as e:
+                logger.warning(f"Could not look up the Gmail mailbox address: {e}")
+                return False
+            self._email_address = profile["emailAddress"]
+            await run_in_threadpool(self._save_email_address, self._email_address)
+        return email_address.lower() == self._email_address.lower()
+
+    def notify(self, history_id: int) -> None:
+        """Record a notification and make sure a sync will follow"""
+        self.notifications_received += 1
+        if self._target_history_id is None or history_id > self._target_history_id:
+            self._target_history_id = history_id
+
+        if self._running:
+            self._rerun = True
+        elif self._scheduled is None or self._scheduled.done():
+            self._scheduled = asyncio.create_task(self._debounced_sync())
+
+    async def _debounced_sync(self) -> None:
+        await asyncio.sleep(self.debounce_seconds)
+        self._running = True
+        try:
+            while True:
+                self._rerun = False
+                # Pub/Sub may deliver to any worker; syncs must not overlap
+                async with lease_service.hold("gmail-sync", ttl_seconds=120) as acquired:
+                    if acquired:
+                        try:
+                            await self.sync()
+                        except Exception as e:
+                            logger.error(f"Gmail push sync failed: {e}")
+                    else:
+                        # Another worker is syncing; run after it so nothing it missed is lost
+                        self._rerun = True
+                        await asyncio.sleep(self.debounce_seconds)
+                if not self._rerun:
+                    break
+        finally:
+            self._running = False
+
+    async def sync(self) -> Dict:
+        """Fetch messages added since the stored history id"""
+        self.syncs_run += 1
+        gmail_service = GmailService()
+        start_history_id, last_synced_at = await run_in_threadpool(self._load_position)
+
+        if not start_history_id:
+            # No baseline yet: remember where the mailbox is and start from there
+            history_id = str(self._target_history_id) if self._target_history_id else None
+            await run_in_threadpool(self._save_history_id, history_id)
+            return {"new_emails": 0, "history_id": history_id}
+
+        try:
+            result = await gmail_service.fetch_history(start_history_id)
+            emails, failed_ids, history_id = result["emails"], result["failed_ids"], result["history_id"]
+        except HistoryExpired:
+            since = last_synced_at or datetime.utcnow() - timedelta(days=1)
+            logger.warning(f"Gmail history {start_history_id} expired, refetching mail since {since.isoformat()}")
+            # Take the position first so nothing that arrives during the backfill is missed
+            history_id = str((await gmail_service.get_profile())["historyId"])
+            result = await self._backfill(gmail_service, since)
+            emails, failed_ids = result["emails"], result["failed_ids"]
+
+        if failed_ids:
+            retried = await gmail_service.fetch_messages(failed_ids)
+            emails += retried["emails"]
+            failed_ids = retried["failed_ids"]
+
+        if failed_ids:
+            # Stay put so the next sync lists these messages again; ones already stored are skipped
+            logger.warning(
+                f"Gmail push sync could not fetch {len(failed_ids)} messages, "
+                f"keeping history id {start_history_id}"
+            )
+            history_id = start_history_id
+        elif self._target_history_id and int(history_id) < self._target_history_id:
+            history_id = str(self._target_history_id)
+
+        new_ids = await run_in_threadpool(self._store, emails, history_id, not failed_ids)
+
+        logger.info(f"Gmail push sync stored {len(new_ids)} new emails")
+        return {"new_emails": len(new_ids), "history_id": history_id, "failed": len(failed_ids)}
+
+    @staticmethod
+    async def _backfill(gmail_service: GmailService, since: datetime) -> Dict:
+        """Fetch every message received since a time, up to the backfill cap"""
+        # Search dates are whole days in the mailbox's timezone; start a day early
+        query = f"after:{(since - timedelta(days=1)).strftime('%Y/%m/%d')}"
+        message_ids: List[str] = []
+        page_token = None
+        while len(message_ids) < settings.gmail_push_backfill_max_messages:
+            page, page_token = await gmail_service.list_message_ids(
+                query, min(500, settings.gmail_push_backfill_max_messages - len(message_ids)), page_token
+            )
+            message_ids.extend(page)
+            if not page_token:
+                break
+        if page_token:
+            logger.warning(
+                f"Gmail push backfill stopped at {len(message_ids)} messages; "
+                "older mail since the last sync was not refetched"
+            )
+        return await gmail_service.fetch_messages(message_ids)
+
+    def _store(self, emails: List[Dict], history_id: str, caught_up: bool) -> List[int]:
+        """Store fetched emails and the new position in one transaction"""
+        db = SessionLocal()
+        try:
+            stored = IngestService().store_emails(db, emails)
+            state = self._get_state(db)
+            state.history_id = history_id
+            if caught_up:
+                state.last_synced_at = datetime.utcnow()
+            db.commit()
+            return stored["new_ids"]
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _load_position(self) -> Tuple[Optional[str], Optional[datetime]]:
+        db = SessionLocal()
+        try:
+            state = self._get_state(db)
+            return state.history_id, state.last_synced_at
+        finally:
+            db.close()
+
+    def _save_history_id(self, history_id: Optional[str]) -> None:
+        db = SessionLocal()
+        try:
+            self._get_state(db).history_id = history_id
+            db.commit()
+        finally:
+            db.close()
+
+    async def renew_watch(self) -> Dict:
+        """Start or renew the Gmail watch on the configured topic"""
+        if not settings.gmail_pubsub_topic:
+            raise Exception("GMAIL_PUBSUB_TOPIC is not configured")
+
+        gmail_service = GmailService()
+        watch = await gmail_service.start_watch(settings.gmail_pubsub_topic)
+        profile = await gmail_service.get_profile()
+        db = SessionLocal()
+        try:
+            state = self._get_state(db)
+            if not state.history_id:
+                state.history_id = watch["history_id"]
+            state.watch_expiration = watch["expiration"]
+            state.email_address = profile["emailAddress"]
+            db.commit()
+        finally:
+            db.close()
+        self._email_address = profile["emailAddress"]
+
+        logger.info(f"Gmail watch active until {watch['expiration'].isoformat()}")
+        return watch
+
+    async def run_watch_renewal(self) -> None:
+        """Renew the watch on a schedule; Gmail expires watches after 7 days"""
+        while True:
+            try:
+                await self.renew_watch()
+            except Exception as e:
+                logger.error(f"Gmail watch renewal failed: {e}")
+            await asyncio.sleep(settings.gmail_watch_renew_hours * 3600)
+
+    def _load_email_address(self) -> Optional[str]:
+        db = SessionLocal()
+        try:
+            return self._get_state(db).email_address
+        finally:
+            db.close()
+
+    def _save_email_address(self, email_address: str) -> None:
+        db = SessionLocal()
+        try:
+            self._get_state(db).email_address = email_address
+            db.commit()
+        finally:
+            db.close()
+
+    @staticmethod
+    def _get_state(db) -> GmailSyncState:
+        state = db.query(GmailSyncState).filter(GmailSyncState.mailbox == MAILBOX).first()
+        if not state:
+            state = GmailSyncState(mailbox=MAILBOX)
+            db.add(state)
+            db.flush()
+        return state
+
+    def status(self) -> Dict:
+        return {
+            "notifications_received": self.notifications_received,
+            "syncs_run": self.syncs_run,
+            "pending_history_id": self._target_history_id,
+            "sync_running": self._running,
+        }
+
+push_service = GmailPushService()
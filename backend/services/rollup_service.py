@@ -0,0 +1,243 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event, func
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+import logging
+
+from ..models.archive import ArchivedEmail
+from ..models.billing import BillingRollup
+from ..models.email import Email
+from ..utils.email_parser import extract_email_address
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BILLING_HOURS = 0.25
+
+# "total" has a single bucket so grand totals are one row lookup
+DIMENSIONS = ("day", "week", "domain", "thread", "matter", "owner", "total")
+
+class RollupService:
+    """Incrementally maintained billing totals.
+
+    Callers take a snapshot() of an email before changing it and pass it
+    with the new snapshot to apply(); the difference is added to every
+    bucket the email falls into. Differences are queued on the session
+    and written by its commit, so the rollup rows are only locked for
+    the commit itself, never across the model or Clio calls that come
+    between a change and its commit.
+    """
+
+    @staticmethod
+    def snapshot(email: Email) -> Optional[Dict]:
+        """Billing-relevant state of an email, or None if it isn't billable (yet)"""
+        if email.summary is None or email.billable is False or email.exclude_from_push:
+            return None
+        return {
+            "date_sent": email.date_sent,
+            "sender": email.sender,
+            "thread_id": email.thread_id,
+            "matter_id": email.matter_id,
+            "owner": email.owner,
+            "hours": email.billing_hours or DEFAULT_BILLING_HOURS,
+            "pushed": bool(email.pushed_to_clio),
+        }
+
+    @staticmethod
+    def bucket_keys(state: Dict) -> List[Tuple[str, str]]:
+        """(dimension, bucket) pairs an entry contributes to"""
+        date_sent: Optional[datetime] = state["date_sent"]
+        if date_sent:
+            year, week, _ = date_sent.isocalendar()
+            day_key = date_sent.strftime("%Y-%m-%d")
+            week_key = f"{year}-W{week:02d}"
+        else:
+            day_key = week_key = "unknown"
+
+        address = extract_email_address(state["sender"] or "")
+        domain = address.rsplit("@", 1)[-1].lower() if "@" in address else "unknown"
+
+        return [
+            ("day", day_key),
+            ("week", week_key),
+            ("domain", domain),
+            ("thread", state["thread_id"] or "none"),
+            ("matter", state["matter_id"] or "unassigned"),
+            ("owner", state.get("owner") or "default"),
+            ("total", "all"),
+        ]
+
+    def apply(self, db: Session, before: Optional[Dict], after: Optional[Dict]) -> None:
+        """Queue the difference between two snapshots for the session's commit"""
+        self.apply_many(db, [(before, after)])
+
+    def apply_many(self, db: Session, changes: List[Tuple[Optional[Dict], Optional[Dict]]]) -> None:
+        """Queue several (before, after) snapshot pairs for the session's commit"""
+        deltas = db.info.setdefault("pending_rollups", defaultdict(lambda: [0.0, 0, 0.0, 0]))
+
+        for before, after in changes:
+            for state, sign in ((before, -1), (after, 1)):
+                if state is None:
+                    continue
+                for key in self.bucket_keys(state):
+                    delta = deltas[key]
+                    delta[0] += sign * state["hours"]
+                    delta[1] += sign
+                    if state["pushed"]:
+                        delta[2] += sign * state["hours"]
+                        delta[3] += sign
+
+    def write_pending(self, db: Session) -> None:
+        """Add the queued differences to the rollup table"""
+        deltas = db.info.pop("pending_rollups", None)
+        if not deltas:
+            return
+        now = datetime.utcnow()
+        rows = [
+            {
+                "dimension": dimension,
+                "bucket": bucket,
+                "hours": delta[0],
+                "entries": delta[1],
+                "pushed_hours": delta[2],
+                "pushed_entries": delta[3],
+                "updated_at": now,
+            }
+            for (dimension, bucket), delta in sorted(deltas.items())
+            if any(abs(value) > 1e-9 for value in delta)
+        ]
+        if rows:
+            self._upsert(db, rows)
+
+    @staticmethod
+    def _upsert(db: Session, rows: List[Dict]) -> None:
+        """Atomically add deltas to existing buckets, creating missing ones"""
+        dialect = db.get_bind().dialect.name
+        # Only the dialect in use gets imported
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            raise Exception(f"Billing rollups not supported on {dialect}")
+
+        table = BillingRollup.__table__
+        statement = insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.dimension, table.c.bucket],
+            set_={
+                "hours": table.c.hours + statement.excluded.hours,
+                "entries": table.c.entries + statement.excluded.entries,
+                "pushed_hours": table.c.pushed_hours + statement.excluded.pushed_hours,
+                "pushed_entries": table.c.pushed_entries + statement.excluded.pushed_entries,
+                "updated_at": statement.excluded.updated_at,
+            }
+        )
+        db.execute(statement, rows)
+
+    def rebuild(self, engine: Engine, batch_size: int = 1000) -> int:
+        """Recompute every bucket from the emails table and its archive"""
+        counted = 0
+        with Session(bind=engine) as db:
+            db.query(BillingRollup).delete()
+            for model in (Email, ArchivedEmail):
+                last_id = 0
+                while True:
+                    emails = (
+                        db.query(model)
+                        .filter(
+                            model.id > last_id, model.summary.isnot(None), model.billable.isnot(False),
+                            model.exclude_from_push.isnot(True)
+                        )
+                        .order_by(model.id)
+                        .limit(batch_size)
+                        .all()
+                    )
+                    if not emails:
+                        break
+                    self.apply_many(db, [(None, self.snapshot(email)) for email in emails])
+                    self.write_pending(db)
+                    counted += len(emails)
+                    last_id = emails[-1].id
+            db.commit()
+
+        logger.info(f"Rebuilt billing rollups from {counted} summaries")
+        return counted
+
+    def ensure_built(self, engine: Engine) -> None:
+        """Build rollups for databases that predate the rollup table or one of its dimensions"""
+        with Session(bind=engine) as db:
+            if db.query(Email.id).filter(Email.summary.isnot(None)).first() is None:
+                return
+            built = {row[0] for row in db.query(BillingRollup.dimension).distinct()}
+        if set(DIMENSIONS) <= built:
+            return
+        self.rebuild(engine)
+
+    def report(
+        self,
+        db: Session,
+        group_by: str,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        limit: int = 100
+    ) -> Dict:
+        """Totals per bucket for one dimension"""
+        if group_by not in DIMENSIONS:
+            raise ValueError(f"group_by must be one of {', '.join(DIMENSIONS)}")
+
+        query = db.query(
+            BillingRollup.bucket,
+            func.sum(BillingRollup.hours),
+            func.sum(BillingRollup.entries),
+            func.sum(BillingRollup.pushed_hours),
+            func.sum(BillingRollup.pushed_entries),
+        ).filter(BillingRollup.dimension == group_by, BillingRollup.entries != 0)
+
+        # Day and week buckets are ISO strings, so range filters compare lexically
+        if group_by in ("day", "week"):
+            if start:
+                query = query.filter(BillingRollup.bucket >= start)
+            if end:
+                query = query.filter(BillingRollup.bucket <= end)
+            query = query.group_by(BillingRollup.bucket).order_by(BillingRollup.bucket.desc())
+        else:
+            query = query.group_by(BillingRollup.bucket).order_by(func.sum(BillingRollup.hours).desc())
+
+        buckets = [
+            {
+                "bucket": bucket,
+                "hours": round(hours or 0.0, 4),
+                "entries": entries or 0,
+                "pushed_hours": round(pushed_hours or 0.0, 4),
+                "pushed_entries": pushed_entries or 0,
+            }
+            for bucket, hours, entries, pushed_hours, pushed_entries in query.limit(limit).all()
+        ]
+
+        total = db.query(BillingRollup).filter(
+            BillingRollup.dimension == "total", BillingRollup.bucket == "all"
+        ).first()
+
+        return {
+            "group_by": group_by,
+            "buckets": buckets,
+            "totals": {
+                "hours": round(total.hours, 4) if total else 0.0,
+                "entries": total.entries if total else 0,
+                "pushed_hours": round(total.pushed_hours, 4) if total else 0.0,
+                "pushed_entries": total.pushed_entries if total else 0,
+            },
+        }
+
+def _write_pending_rollups(session) -> None:
+    RollupService().write_pending(session)
+
+def _discard_after_rollback(session, previous_transaction) -> None:
+    session.info.pop("pending_rollups", None)
+
+def register_rollup_writes(session_factory) -> None:
+    """Write queued rollup differences as part of each commit"""
+    event.listen(session_factory, "before_commit", _write_pending_rollups)
+    event.listen(session_factory, "after_soft_rollback", _discard_after_rollback)
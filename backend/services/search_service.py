@@ -0,0 +1,258 @@
+from typing import Dict, List
+from sqlalchemy import text, Boolean, DateTime, Float, Integer, String, Text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, selectinload
+import logging
+
+from ..models.email import Email
+
+logger = logging.getLogger(__name__)
+
+# Column weights used for ranking: subject, sender, body, summary
+SQLITE_WEIGHTS = (10.0, 5.0, 1.0, 3.0)
+
+# Bodies are stored compressed, so triggers keep the metadata columns in sync
+# and the body column is written by index_body() when a body is stored.
+# Rows moved to emails_archive keep their index entry.
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS emails_fts USING fts5(
+        subject, sender, body, summary,
+        tokenize = 'porter unicode61'
+    )
+    """,
+    "DROP TRIGGER IF EXISTS emails_fts_insert",
+    """
+    CREATE TRIGGER emails_fts_insert AFTER INSERT ON emails BEGIN
+        INSERT INTO emails_fts(rowid, subject, sender, summary)
+        VALUES (new.id, new.subject, new.sender, new.summary);
+    END
+    """,
+    "DROP TRIGGER IF EXISTS emails_fts_update",
+    """
+    CREATE TRIGGER emails_fts_update
+    AFTER UPDATE OF subject, sender, summary ON emails BEGIN
+        UPDATE emails_fts
+        SET subject = new.subject, sender = new.sender, summary = new.summary
+        WHERE rowid = old.id;
+    END
+    """,
+    "DROP TRIGGER IF EXISTS emails_fts_delete",
+    """
+    CREATE TRIGGER emails_fts_delete AFTER DELETE ON emails
+    WHEN NOT EXISTS (SELECT 1 FROM emails_archive WHERE id = old.id) BEGIN
+        DELETE FROM emails_fts WHERE rowid = old.id;
+    END
+    """,
+]
+
+SQLITE_BACKFILL = """
+    INSERT INTO emails_fts(rowid, subject, sender, summary)
+    SELECT id, subject, sender, summary FROM emails
+"""
+
+POSTGRES_DDL = [
+    "ALTER TABLE emails ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    "ALTER TABLE emails ADD COLUMN IF NOT EXISTS body_vector tsvector",
+    """
+    CREATE OR REPLACE FUNCTION emails_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.subject, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(NEW.sender, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(NEW.summary, '')), 'C') ||
+            coalesce(NEW.body_vector, ''::tsvector);
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS emails_search_vector_trigger ON emails",
+    """
+    CREATE TRIGGER emails_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF subject, sender, summary, body_vector ON emails
+    FOR EACH ROW EXECUTE FUNCTION emails_search_vector_update()
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_emails_search_vector ON emails USING GIN (search_vector)",
+    # Archived rows carry their vectors with them
+    "ALTER TABLE emails_archive ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    "ALTER TABLE emails_archive ADD COLUMN IF NOT EXISTS body_vector tsvector",
+    "CREATE INDEX IF NOT EXISTS ix_emails_archive_search_vector ON emails_archive USING GIN (search_vector)",
+]
+
+# Touching the indexed columns fires the trigger and fills search_vector for old rows
+POSTGRES_BACKFILL = "UPDATE emails SET subject = subject WHERE search_vector IS NULL"
+
+
+class SearchService:
+    """Full-text search over emails and their summaries.
+
+    SQLite uses an FTS5 table kept in sync by triggers, Postgres uses a
+    weighted tsvector column with a GIN index. Archived emails are
+    searched along with live ones.
+    """
+
+    @staticmethod
+    def ensure_index(engine: Engine) -> bool:
+        """Create the full-text index and its sync triggers.
+
+        Returns True when the index was newly built and bodies still need
+        to be indexed with reindex_bodies().
+        """
+        dialect = engine.dialect.name
+
+        with engine.begin() as conn:
+            if dialect == "sqlite":
+                exists = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'emails_fts'")
+                ).first()
+                for statement in SQLITE_DDL:
+                    conn.execute(text(statement))
+                if not exists:
+                    conn.execute(text(SQLITE_BACKFILL))
+                    logger.info("Built emails_fts index from existing emails")
+                    return True
+            elif dialect == "postgresql":
+                exists = conn.execute(text(
+                    "SELECT 1 FROM information_schema.columns "
+                    "WHERE table_name = 'emails' AND column_name = 'body_vector'"
+                )).first()
+                for statement in POSTGRES_DDL:
+                    conn.execute(text(statement))
+                conn.execute(text(POSTGRES_BACKFILL))
+                return not exists
+            else:
+                logger.warning(f"Full-text search not supported on {dialect}")
+        return False
+
+    @staticmethod
+    def index_body(db: Session, email_id: int, body: str) -> None:
+        """Add a message body to the index of an existing email row"""
+        dialect = db.get_bind().dialect.name
+
+        if dialect == "sqlite":
+            db.execute(
+                text("UPDATE emails_fts SET body = :body WHERE rowid = :id"),
+                {"body": body, "id": email_id}
+            )
+        elif dialect == "postgresql":
+            db.execute(
+                text("UPDATE emails SET body_vector = setweight(to_tsvector('english', :body), 'D') "
+                     "WHERE id = :id"),
+                {"body": body, "id": email_id}
+            )
+
+    def reindex_bodies(self, engine: Engine, batch_size: int = 500) -> int:
+        """Index the bodies of all stored emails"""
+        indexed = 0
+        last_id = 0
+
+        with Session(bind=engine) as db:
+            while True:
+                emails = (
+                    db.query(Email)
+                    .options(selectinload(Email.content))
+                    .filter(Email.id > last_id, Email.body_hash.isnot(None))
+                    .order_by(Email.id)
+                    .limit(batch_size)
+                    .all()
+                )
+                if not emails:
+                    break
+                for email in emails:
+                    self.index_body(db, email.id, email.body)
+                db.commit()
+                indexed += len(emails)
+                last_id = emails[-1].id
+
+        return indexed
+
+    @staticmethod
+    def _fts5_query(query: str) -> str:
+        """Quote each term so user input can't inject FTS5 syntax"""
+        terms = [term.replace('"', '') for term in query.split()]
+        return " ".join(f'"{term}"' for term in terms if term)
+
+    def search(self, db: Session, query: str, page: int = 1, page_size: int = 20) -> Dict:
+        """Run a ranked, paginated search"""
+        page = max(page, 1)
+        page_size = max(min(page_size, 100), 1)
+        offset = (page - 1) * page_size
+        dialect = db.get_bind().dialect.name
+
+        if dialect == "sqlite":
+            match = self._fts5_query(query)
+            if not match:
+                return {"results": [], "page": page, "page_size": page_size, "has_more": False}
+            weights = ", ".join(str(w) for w in SQLITE_WEIGHTS)
+            statement = text(f"""
+                SELECT coalesce(e.id, a.id) AS id, coalesce(e.gmail_id, a.gmail_id) AS gmail_id,
+                       coalesce(e.subject, a.subject) AS subject, coalesce(e.sender, a.sender) AS sender,
+                       coalesce(e.date_sent, a.date_sent) AS date_sent, coalesce(e.summary, a.summary) AS summary,
+                       coalesce(e.billing_hours, a.billing_hours) AS billing_hours,
+                       coalesce(e.pushed_to_clio, a.pushed_to_clio) AS pushed_to_clio,
+                       a.id IS NOT NULL AS archived,
+                       snippet(emails_fts, -1, '[', ']', '...', 12) AS snippet,
+                       bm25(emails_fts, {weights}) AS rank
+                FROM emails_fts
+                LEFT JOIN emails e ON e.id = emails_fts.rowid
+                LEFT JOIN emails_archive a ON a.id = emails_fts.rowid AND e.id IS NULL
+                WHERE emails_fts MATCH :match AND (e.id IS NOT NULL OR a.id IS NOT NULL)
+                ORDER BY rank
+                LIMIT :limit OFFSET :offset
+            """)
+            params = {"match": match}
+        elif dialect == "postgresql":
+            statement = text("""
+                SELECT e.id, e.gmail_id, e.subject, e.sender, e.date_sent, e.summary,
+                       e.billing_hours, e.pushed_to_clio, e.archived,
+                       ts_headline('english', coalesce(e.summary, e.subject, ''), q,
+                                   'StartSel=[, StopSel=], MaxFragments=1') AS snippet,
+                       ts_rank_cd(e.search_vector, q) AS rank
+                FROM (
+                    SELECT id, gmail_id, subject, sender, date_sent, summary, billing_hours,
+                           pushed_to_clio, search_vector, false AS archived
+                    FROM emails
+                    UNION ALL
+                    SELECT id, gmail_id, subject, sender, date_sent, summary, billing_hours,
+                           pushed_to_clio, search_vector, true AS archived
+                    FROM emails_archive
+                ) e, websearch_to_tsquery('english', :query) q
+                WHERE e.search_vector @@ q
+                ORDER BY rank DESC
+                LIMIT :limit OFFSET :offset
+            """)
+            params = {"query": query}
+        else:
+            raise Exception(f"Full-text search not supported on {dialect}")
+
+        statement = statement.columns(
+            id=Integer, gmail_id=String, subject=String, sender=String, date_sent=DateTime,
+            summary=Text, billing_hours=Float, pushed_to_clio=Boolean, archived=Boolean, snippet=Text, rank=Float
+        )
+
+        # Fetch one extra row to know whether another page exists without a COUNT(*)
+        params.update({"limit": page_size + 1, "offset": offset})
+        rows = db.execute(statement, params).mappings().all()
+
+        results: List[Dict] = []
+        for row in rows[:page_size]:
+            results.append({
+                "id": row["id"],
+                "email_id": row["gmail_id"],
+                "subject": row["subject"],
+                "sender": row["sender"],
+                "date_sent": row["date_sent"].isoformat() if row["date_sent"] else None,
+                "summary": row["summary"],
+                "billing_hours": row["billing_hours"],
+                "pushed_to_clio": row["pushed_to_clio"],
+                "archived": bool(row["archived"]),
+                "snippet": row["snippet"],
+                "rank": row["rank"],
+            })
+
+        return {
+            "results": results,
+            "page": page,
+            "page_size": page_size,
+            "has_more": len(rows) > page_size,
+        }
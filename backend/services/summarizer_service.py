@@ -1,68 +1,432 @@
+import asyncio
 import os
-import openai
-from typing import Dict, List
-from sqlalchemy.orm import Session
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional, Tuple
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session, selectinload
 import logging
 
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..core.events import publish_on_commit
+from ..core.metrics import EMAILS_PREFILTERED, SUMMARIES_REUSED, track_upstream
 from ..models.email import Email
+from ..models.ledger import SummaryAttempt
+from ..utils.simhash import to_unsigned
+from .dedupe_service import find_near_duplicate, near_duplicate_index
+from .model_router import model_router, parse_summary
+from .prefilter_service import PrefilterService
+from .rollup_service import RollupService
+
+if TYPE_CHECKING:
+    import openai
 
 logger = logging.getLogger(__name__)
 
+# Keeps IN (...) lists under SQLite's bound-parameter limit
+CLAIM_CHUNK_SIZE = 500
+
 class SummarizerService:
     def __init__(self):
-        openai.api_key = os.getenv("OPENAI_API_KEY")
-        self.model = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+        self.api_key = os.getenv("OPENAI_API_KEY")
+        self.prefilter = PrefilterService()
+        self._client = None
+    
+    @property
+    def client(self) -> "openai.AsyncOpenAI":
+        # Created on first use so a missing key only affects the call, not
+        # construction, and the openai import stays off the startup path
+        if self._client is None:
+            import openai
+            self._client = openai.AsyncOpenAI(api_key=self.api_key)
+        return self._client
     
     async def generate_summaries(self, db: Session) -> Dict:
         """Generate AI summaries for emails without summaries"""
         try:
-            # Get emails without summaries
-            emails = db.query(Email).filter(Email.summary.is_(None)).all()
+            # Claim emails without summaries; ones another worker is on are left to it
+            email_ids = self.claim(db)
             
-            if not emails:
+            if not email_ids:
                 return {
                     "success": True,
                     "summaries_generated": 0,
+                    "filtered": 0,
+                    "reused": 0,
                     "message": "No emails need summaries"
                 }
             
             summaries_generated = 0
+            reused = 0
+            by_model: Dict[str, int] = {}
+            filtered_by_rule: Dict[str, int] = {}
             errors = []
             
-            for email in emails:
-                try:
-                    # Generate summary
-                    summary_data = await self._generate_single_summary(email)
+            for start in range(0, len(email_ids), CLAIM_CHUNK_SIZE):
+                chunk = email_ids[start:start + CLAIM_CHUNK_SIZE]
+                emails = db.query(Email).options(selectinload(Email.content)).filter(Email.id.in_(chunk)).order_by(Email.id).all()
+                for email in emails:
+                    email_id = email.id
+                    try:
+                        summary_data = await self.summarize_email(db, email)
+                        # Each email commits on its own, releasing its claim
+                        db.commit()
+                        if summary_data.get("skipped"):
+                            continue
+                        if summary_data.get("filter_rule"):
+                            rule = summary_data["filter_rule"]
+                            filtered_by_rule[rule] = filtered_by_rule.get(rule, 0) + 1
+                        elif summary_data.get("reused_from"):
+                            reused += 1
+                        else:
+                            summaries_generated += 1
+                            if summary_data.get("model"):
+                                by_model[summary_data["model"]] = by_model.get(summary_data["model"], 0) + 1
                     
-                    # Update email with summary
-                    email.summary = summary_data["summary"]
-                    email.billing_hours = summary_data["billing_hours"]
-                    email.billing_description = summary_data["billing_description"]
-                    
-                    summaries_generated += 1
-                
-                except Exception as e:
-                    logger.error(f"Error generating summary for email {email.id}: {e}")
-                    errors.append(f"Email {email.id}: {str(e)}")
-            
-            db.commit()
+                    except Exception as e:
+                        db.rollback()
+                        self.release(db, email_id)
+                        logger.error(f"Error generating summary for email {email_id}: {e}")
+                        errors.append(f"Email {email_id}: {str(e)}")
             
+            filtered = sum(filtered_by_rule.values())
             return {
                 "success": True,
                 "summaries_generated": summaries_generated,
+                "filtered": filtered,
+                "filtered_by_rule": filtered_by_rule,
+                "reused": reused,
+                "by_model": by_model,
                 "errors": errors,
-                "message": f"Generated {summaries_generated} summaries"
+                "message": f"Generated {summaries_generated} summaries, {filtered} handled by pre-filter rules, {reused} reused from near-duplicates"
             }
         
         except Exception as e:
             logger.error(f"Error in batch summary generation: {e}")
             return {"success": False, "message": str(e)}
     
-    async def _generate_single_summary(self, email: Email) -> Dict:
-        """Generate summary for a single email"""
+    async def stream_summaries(
+        self,
+        email_ids: List[int],
+        concurrency: int = 4,
+        heartbeat_seconds: float = 15
+    ) -> AsyncIterator[Dict]:
+        """Summarize emails concurrently, yielding a record for each as it finishes.
+        
+        Yields a "start" record, one "result" record per email in
+        completion order, a "heartbeat" record whenever heartbeat_seconds
+        pass without a result, and a closing "done" record with totals.
+        Each email is committed in its own session before its record is
+        sent, so a client that disconnects keeps what it already saw.
+        """
+        started = time.perf_counter()
+        total = len(email_ids)
+        pending = deque(email_ids)
+        results: asyncio.Queue = asyncio.Queue()
+        
+        async def worker():
+            while pending:
+                await results.put(await self._summarize_by_id(pending.popleft()))
+        
+        workers = [asyncio.create_task(worker()) for _ in range(min(max(concurrency, 1), total))]
+        counts = {"summaries_generated": 0, "filtered": 0, "reused": 0, "skipped": 0, "errors": 0}
         try:
-            # Prepare prompt
-            prompt = f"""
+            yield {"type": "start", "total": total}
+            completed = 0
+            while completed < total:
+                try:
+                    record = await asyncio.wait_for(results.get(), timeout=heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield {"type": "heartbeat", "completed": completed, "total": total}
+                    continue
+                completed += 1
+                if record["error"]:
+                    counts["errors"] += 1
+                elif record.get("skipped"):
+                    counts["skipped"] += 1
+                elif record["filter_rule"]:
+                    counts["filtered"] += 1
+                elif record["reused_from"]:
+                    counts["reused"] += 1
+                else:
+                    counts["summaries_generated"] += 1
+                yield {**record, "completed": completed, "total": total}
+            yield {"type": "done", "total": total, **counts, "elapsed_ms": round((time.perf_counter() - started) * 1000)}
+        finally:
+            # Also runs when the client disconnects mid-stream
+            for task in workers:
+                task.cancel()
+    
+    async def _summarize_by_id(self, email_id: int) -> Dict:
+        """Summarize and commit one email in its own session; never raises"""
+        started = time.perf_counter()
+        record = {
+            "type": "result",
+            "email_id": email_id,
+            "subject": None,
+            "summary": None,
+            "billing_hours": None,
+            "billing_description": None,
+            "billable": None,
+            "filter_rule": None,
+            "reused_from": None,
+            "model": None,
+            "error": None,
+        }
+        db = SessionLocal()
+        try:
+            email = db.query(Email).options(selectinload(Email.content)).filter(Email.id == email_id).first()
+            if email is None:
+                record["error"] = "Email not found"
+                return record
+            
+            record["subject"] = email.subject
+            if not self.claim(db, [email_id]):
+                # Summarized or being summarized elsewhere (the pipeline, another request)
+                record["skipped"] = True
+            else:
+                summary_data = await self.summarize_email(db, email)
+                db.commit()
+                record["skipped"] = bool(summary_data.get("skipped"))
+                record["model"] = summary_data.get("model")
+            record.update(
+                summary=email.summary,
+                billing_hours=email.billing_hours,
+                billing_description=email.billing_description,
+                billable=email.billable,
+                filter_rule=email.filter_rule,
+                reused_from=email.reused_from_id,
+            )
+        except Exception as e:
+            db.rollback()
+            self.release(db, email_id)
+            logger.error(f"Error generating summary for email {email_id}: {e}")
+            record["error"] = str(e)
+        finally:
+            db.close()
+            record["elapsed_ms"] = round((time.perf_counter() - started) * 1000)
+        return record
+    
+    @staticmethod
+    def claim(db: Session, email_ids: Optional[List[int]] = None) -> List[int]:
+        """Claim unsummarized emails, all of them or the ones listed, and commit.
+        
+        An email is only claimed if it has no summary and no unexpired
+        claim, so concurrent callers never get the same one. Returns the
+        ids claimed.
+        """
+        now = datetime.utcnow()
+        expired = now - timedelta(seconds=settings.summary_claim_seconds)
+        table = Email.__table__
+        statement = (
+            update(table)
+            .where(
+                table.c.summary.is_(None),
+                or_(table.c.summary_claimed_at.is_(None), table.c.summary_claimed_at < expired)
+            )
+            # A claim isn't an edit: ETags and bulk-edit conflict checks go by updated_at
+            .values(summary_claimed_at=now, updated_at=table.c.updated_at)
+            .returning(table.c.id)
+        )
+        if email_ids is None:
+            claimed = list(db.execute(statement).scalars())
+        else:
+            claimed = []
+            for start in range(0, len(email_ids), CLAIM_CHUNK_SIZE):
+                chunk = email_ids[start:start + CLAIM_CHUNK_SIZE]
+                claimed.extend(db.execute(statement.where(table.c.id.in_(chunk))).scalars())
+        db.commit()
+        return sorted(claimed)
+    
+    @staticmethod
+    def release(db: Session, email_id: int) -> None:
+        """Give up the claim on an email that couldn't be summarized"""
+        table = Email.__table__
+        try:
+            db.execute(
+                update(table)
+                .where(table.c.id == email_id, table.c.summary.is_(None))
+                .values(summary_claimed_at=None, updated_at=table.c.updated_at)
+            )
+            db.commit()
+        except Exception as e:
+            # The claim still expires after SUMMARY_CLAIM_SECONDS
+            db.rollback()
+            logger.warning(f"Could not release the summary claim on email {email_id}: {e}")
+    
+    async def summarize_email(self, db: Session, email: Email) -> Dict:
+        """Generate and store the summary of one claimed email; the caller commits.
+        
+        Mail a pre-filter rule matches gets that rule's fixed summary
+        instead of a model call, and a near-duplicate of an already
+        summarized email gets that summary adapted to its subject and
+        sender. Every call adds a SummaryAttempt row recording the
+        source, tokens, cost and latency. If the claim was lost while
+        the summary was generated, nothing is stored and the result has
+        "skipped" set.
+        """
+        started = time.perf_counter()
+        claim = email.summary_claimed_at
+        attempt = SummaryAttempt(
+            email_id=email.id,
+            model_calls=0,
+            retries=0,
+            prompt_tokens=0,
+            completion_tokens=0,
+            cost_usd=0.0,
+            cache_hit=False
+        )
+        rule = self.prefilter.classify(email)
+        summary_data = None
+        if rule is not None:
+            summary_data = self.prefilter.summarize(rule, email)
+            attempt.source = "rule"
+            EMAILS_PREFILTERED.labels(rule.name, rule.action).inc()
+        elif settings.dedupe_enabled:
+            summary_data = find_near_duplicate(db, email)
+            if summary_data is not None:
+                attempt.source = "reused"
+                attempt.cache_hit = True
+                SUMMARIES_REUSED.inc()
+        if summary_data is None:
+            summary_data = await self._generate_single_summary(email, attempt)
+            attempt.source = "model" if summary_data.get("model") else "fallback"
+        attempt.latency_ms = round((time.perf_counter() - started) * 1000, 1)
+        db.add(attempt)
+        
+        # Re-read the row (locked on Postgres) so the rollup delta starts from what is stored now
+        simhash = email.simhash
+        db.refresh(email, with_for_update=True)
+        email.simhash = simhash
+        if email.summary is not None or email.summary_claimed_at != claim:
+            logger.warning(f"Email {email.id} was summarized elsewhere while its claim was held; keeping that summary")
+            return {**summary_data, "skipped": True}
+        
+        rollup_service = RollupService()
+        before = rollup_service.snapshot(email)
+        email.summary = summary_data["summary"]
+        email.billing_hours = summary_data["billing_hours"]
+        email.billing_description = summary_data["billing_description"]
+        email.billable = summary_data.get("billable", True)
+        email.filter_rule = summary_data.get("filter_rule")
+        email.reused_from_id = summary_data.get("reused_from")
+        email.summary_source = attempt.source
+        email.summary_claimed_at = None
+        rollup_service.apply(db, before, rollup_service.snapshot(email))
+        if attempt.source == "model" and email.simhash:
+            # Later mail in this batch can reuse it before the next index sync
+            near_duplicate_index.add(email.id, to_unsigned(email.simhash))
+        publish_on_commit(db, "email", email.id, "summarized", {
+            "summary": email.summary,
+            "billing_hours": email.billing_hours,
+            "billing_description": email.billing_description,
+            "billable": email.billable,
+            "filter_rule": email.filter_rule,
+            "reused_from": email.reused_from_id,
+        })
+        
+        return summary_data
+    
+    async def _generate_single_summary(self, email: Email, attempt: Optional[SummaryAttempt] = None) -> Dict:
+        """Generate summary for a single email on the routed model.
+        
+        An answer that isn't usable JSON with sane billing hours is
+        retried on the strong model before falling back to a default.
+        Calls, tokens and cost are added to attempt.
+        """
+        prompt = self._build_prompt(email)
+        model, reason = model_router.route(email)
+        model_router.record_route(model, reason)
+        if attempt is not None:
+            attempt.route_reason = reason
+        content = None
+        
+        while model:
+            if attempt is not None:
+                attempt.model = model
+            try:
+                content, summary_data, problem = await self._ask_model(model, prompt, attempt)
+            except Exception as e:
+                logger.error(f"Error generating single summary with {model}: {e}")
+                if attempt is not None:
+                    attempt.error = str(e)
+                break
+            
+            if summary_data is not None:
+                summary_data["model"] = model
+                return summary_data
+            
+            next_model = model_router.escalation(model)
+            if next_model:
+                logger.warning(f"Unusable {model} answer for email {email.id} ({problem}); retrying on {next_model}")
+                model_router.record_route(next_model, "invalid")
+                if attempt is not None:
+                    attempt.retries += 1
+            elif attempt is not None:
+                attempt.error = f"Unusable answer: {problem}"
+            model = next_model
+        
+        if content:
+            # Fallback if no model gave a usable answer
+            return {
+                "summary": content[:300],
+                "billing_hours": 0.25,
+                "billing_description": f"Email communication regarding {email.subject[:50]}"
+            }
+        
+        # Return default summary
+        return {
+            "summary": f"Email communication from {email.sender} regarding {email.subject}",
+            "billing_hours": 0.25,
+            "billing_description": f"Email review and response - {email.subject[:50]}"
+        }
+    
+    async def _ask_model(
+        self,
+        model: str,
+        prompt: str,
+        attempt: Optional[SummaryAttempt] = None
+    ) -> Tuple[str, Optional[Dict], Optional[str]]:
+        """(raw answer, parsed summary or None, why it was rejected) from one model call"""
+        started = time.perf_counter()
+        usage = None
+        outcome = "error"
+        try:
+            with track_upstream("openai", "chat.completions"):
+                response = await self.client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": "You are a legal assistant helping with email summarization for billing purposes. Always respond with valid JSON."
+                        },
+                        {
+                            "role": "user",
+                            "content": prompt
+                        }
+                    ],
+                    max_tokens=500,
+                    temperature=0.3
+                )
+            usage = response.usage
+            content = response.choices[0].message.content.strip()
+            summary_data, problem = parse_summary(content)
+            outcome = "success" if summary_data is not None else "invalid"
+            return content, summary_data, problem
+        finally:
+            cost = model_router.record_call(model, time.perf_counter() - started, usage, outcome)
+            if attempt is not None:
+                attempt.model_calls += 1
+                attempt.cost_usd += cost
+                if usage is not None:
+                    attempt.prompt_tokens += usage.prompt_tokens or 0
+                    attempt.completion_tokens += usage.completion_tokens or 0
+    
+    @staticmethod
+    def _build_prompt(email: Email) -> str:
+        return f"""
             Please analyze this legal email and provide:
             1. A professional summary suitable for legal billing
             2. Suggested billing hours (in decimal format, e.g., 0.25, 0.5, 1.0)
@@ -84,46 +448,3 @@ class SummarizerService:
                 "billing_description": "Brief description for billing purposes"
             }}
             """
-            
-            # Call OpenAI API
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a legal assistant helping with email summarization for billing purposes. Always respond with valid JSON."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                max_tokens=500,
-                temperature=0.3
-            )
-            
-            # Parse response
-            content = response.choices[0].message.content.strip()
-            
-            # Try to parse JSON response
-            import json
-            try:
-                summary_data = json.loads(content)
-            except json.JSONDecodeError:
-                # Fallback if JSON parsing fails
-                summary_data = {
-                    "summary": content[:300],
-                    "billing_hours": 0.25,
-                    "billing_description": f"Email communication regarding {email.subject[:50]}"
-                }
-            
-            return summary_data
-        
-        except Exception as e:
-            logger.error(f"Error generating single summary: {e}")
-            # Return default summary
-            return {
-                "summary": f"Email communication from {email.sender} regarding {email.subject}",
-                "billing_hours": 0.25,
-                "billing_description": f"Email review and response - {email.subject[:50]}"
-            }
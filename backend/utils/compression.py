@@ -0,0 +1,32 @@
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; zlib is always available
+    zstandard = None
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+
+def default_codec() -> str:
+    """Preferred codec for new content"""
+    return "zstd" if zstandard is not None else "zlib"
+
+def compress(data: bytes, codec: str = None) -> bytes:
+    """Compress bytes with the given codec"""
+    codec = codec or default_codec()
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    if codec == "zlib":
+        return zlib.compress(data, ZLIB_LEVEL)
+    raise ValueError(f"Unknown codec: {codec}")
+
+def decompress(data: bytes, codec: str) -> bytes:
+    """Decompress bytes written by compress()"""
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed content")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    raise ValueError(f"Unknown codec: {codec}")
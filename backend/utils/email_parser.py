@@ -1,21 +1,44 @@
+import base64
+import codecs
 import re
 from datetime import datetime
-from typing import Dict, Optional
+from functools import lru_cache
+from html import unescape
+from typing import Dict, Optional, Tuple
 import email.utils
 
-def parse_email_date(date_string: str) -> Optional[datetime]:
-    """Parse email date string to datetime object"""
+# Headers kept with each email for the pre-filter: mailing lists, auto-replies, bulk mail
+SIGNAL_HEADERS = (
+    "list-unsubscribe",
+    "list-id",
+    "auto-submitted",
+    "precedence",
+    "x-auto-response-suppress",
+    "x-autoreply",
+    "x-autorespond",
+)
+
+# Stored bodies are capped at this many characters
+MAX_BODY_CHARS = 1000
+
+# HTML needs more input than it yields in text; don't decode more than this of it
+MAX_HTML_BYTES = 256 * 1024
+
+def parse_date_header(date_string: str) -> Optional[datetime]:
+    """Parse an RFC 2822 Date header to naive local time, or None if it can't be read"""
     try:
-        # Parse RFC 2822 date format
         parsed_date = email.utils.parsedate_tz(date_string)
         if parsed_date:
             timestamp = email.utils.mktime_tz(parsed_date)
             return datetime.fromtimestamp(timestamp)
     except Exception:
         pass
-    
+    return None
+
+def parse_email_date(date_string: str) -> Optional[datetime]:
+    """Parse email date string to datetime object"""
     # Fallback to current time
-    return datetime.now()
+    return parse_date_header(date_string) or datetime.now()
 
 def extract_email_address(email_string: str) -> str:
     """Extract email address from string like 'Name <email@domain.com>'"""
@@ -45,3 +68,113 @@ def clean_email_body(body: str) -> str:
     
     # Limit length
     return body[:2000].strip()
+
+_SKIPPED_HTML = re.compile(r"<(script|style|head|title)\b.*?</\1\s*>|<!--.*?-->", re.IGNORECASE | re.DOTALL)
+_BLOCK_TAGS = re.compile(r"<(?:br|/?(?:p|div|tr|li|h[1-6]|blockquote|table))\b[^>]*>", re.IGNORECASE)
+_TAGS = re.compile(r"<[^>]*>")
+_SPACES = re.compile(r"[ \t\r\f\v\xa0]+")
+_BREAKS = re.compile(r"\s*\n\s*")
+_CHARSET = re.compile(r'charset\s*=\s*"?([^";\s]+)', re.IGNORECASE)
+
+def html_to_text(html: str) -> str:
+    """Plain text from an HTML body: tags, scripts and styles dropped, entities unescaped"""
+    text = _SKIPPED_HTML.sub("", html)
+    text = _BLOCK_TAGS.sub("\n", text)
+    text = unescape(_TAGS.sub("", text))
+    text = _SPACES.sub(" ", text)
+    return _BREAKS.sub("\n", text).strip()
+
+def _header(part: Dict, name: str) -> str:
+    for header in part.get("headers") or ():
+        if header.get("name", "").lower() == name:
+            return header.get("value", "")
+    return ""
+
+@lru_cache(maxsize=256)
+def _codec(charset: str) -> str:
+    try:
+        return codecs.lookup(charset).name
+    except LookupError:
+        # Unknown or bogus labels ("unknown-8bit", "x-user-defined")
+        return "utf-8"
+
+def _charset(part: Dict) -> str:
+    match = _CHARSET.search(_header(part, "content-type"))
+    return _codec(match.group(1).lower()) if match else "utf-8"
+
+def _is_attachment(part: Dict) -> bool:
+    body = part.get("body") or {}
+    return bool(
+        part.get("filename")
+        or body.get("attachmentId")
+        or _header(part, "content-disposition").lower().startswith("attachment")
+    )
+
+def _decode(part: Dict, max_bytes: Optional[int] = None) -> str:
+    """Text of one part, decoding at most max_bytes of its content"""
+    data = (part.get("body") or {}).get("data") or ""
+    if max_bytes is not None:
+        # Whole base64 quads only, so a prefix decodes on its own
+        data = data[:((max_bytes + 2) // 3) * 4]
+    raw = base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+    return raw.decode(_charset(part), errors="replace")
+
+def _find_text_parts(payload: Dict) -> Tuple[Optional[Dict], Optional[Dict]]:
+    """First inline text/plain and text/html parts, in document order.
+
+    Walks the MIME tree with an explicit stack, so deep nesting can't
+    hit the recursion limit, and stops at the first plain-text part.
+    Nothing is decoded here.
+    """
+    html_part = None
+    stack = [payload]
+    while stack:
+        part = stack.pop()
+        mime_type = (part.get("mimeType") or "").lower()
+
+        if mime_type.startswith("multipart/"):
+            # Reversed so parts come off the stack in order
+            stack.extend(reversed(part.get("parts") or []))
+            continue
+        if mime_type == "message/rfc822" and part.get("parts"):
+            # Forwarded messages: their text is still the email's content
+            stack.extend(reversed(part["parts"]))
+            continue
+        if _is_attachment(part) or not (part.get("body") or {}).get("data"):
+            continue
+
+        if mime_type == "text/plain":
+            return part, html_part
+        if mime_type == "text/html" and html_part is None:
+            html_part = part
+
+    return None, html_part
+
+def extract_body(payload: Dict, max_chars: int = MAX_BODY_CHARS) -> str:
+    """Body text of a Gmail API message payload (format=full).
+
+    Prefers the first text/plain part at any depth and falls back to
+    the first text/html part converted to text. Only the chosen part is
+    decoded, at most as much of it as max_chars can need, and attachment
+    parts are never decoded.
+    """
+    plain_part, html_part = _find_text_parts(payload)
+
+    if plain_part is not None:
+        # UTF-8 needs at most 4 bytes a character
+        return _decode(plain_part, max_chars * 4)[:max_chars]
+    if html_part is not None:
+        # Markup is most of an HTML body; decode more only if the text falls short
+        encoded_size = len(html_part["body"]["data"])
+        size = max_chars * 16
+        while True:
+            html = _decode(html_part, size)
+            complete = size * 4 // 3 >= encoded_size
+            if not complete and html.rfind("<") > html.rfind(">"):
+                # Don't let a tag cut in half leak into the text
+                html = html[:html.rfind("<")]
+            text = html_to_text(html)
+            if complete or len(text) >= max_chars or size >= MAX_HTML_BYTES:
+                return text[:max_chars]
+            size = min(size * 4, MAX_HTML_BYTES)
+    return ""
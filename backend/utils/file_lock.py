@@ -0,0 +1,28 @@
+import os
+import pickle
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows; workers there share nothing worth locking
+    fcntl = None
+
+@contextmanager
+def locked(path: str) -> Iterator[None]:
+    """Exclusive lock shared by every process using the same path"""
+    with open(f"{path}.lock", "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+def write_pickle_atomic(path: str, value: Any) -> None:
+    """Write to a temporary file and rename it over path, so readers never see half a file"""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as handle:
+        pickle.dump(value, handle)
+    os.replace(temp_path, path)
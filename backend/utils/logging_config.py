@@ -1,36 +1,191 @@
+import atexit
+import json
 import logging
+import queue
+import random
 import sys
-from typing import Dict, Any
-
-def setup_logging(level: str = "INFO") -> None:
-    """Setup application logging"""
-    
-    # Create formatter
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    
-    # Setup console handler
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(formatter)
-    
-    # Setup root logger
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+from ..core.request_context import request_id_var
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+_sql_filter: Optional["SqlSampleFilter"] = None
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the current request id"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket per (logger, level) so a hot error path can't flood the output.
+
+    Only records at min_level and above are limited; info and debug
+    records, access logs among them, always pass. Dropped records are
+    counted and reported on the next record that gets through as
+    `suppressed`.
+    """
+
+    def __init__(self, per_second: float, burst: int, min_level: int = logging.WARNING):
+        super().__init__()
+        self.per_second = per_second
+        self.burst = burst
+        self.min_level = min_level
+        self._buckets: Dict[Tuple[str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < self.min_level:
+            return True
+        key = (record.name, record.levelno)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                # tokens, last refill, suppressed since last pass
+                bucket = self._buckets[key] = [float(self.burst), now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.per_second)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            if bucket[2]:
+                record.suppressed = bucket[2]
+                bucket[2] = 0
+        return True
+
+class SqlSampleFilter(logging.Filter):
+    """Pass a random sample of SQLAlchemy statement logs.
+
+    SQLAlchemy logs a statement and then its parameters as two records
+    from the same thread; the parameters follow their statement's fate.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+        self._last = threading.local()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        keep = getattr(self._last, "keep", None)
+        if keep is not None and isinstance(record.msg, str) and record.msg.startswith("["):
+            self._last.keep = None
+            return keep
+        self._last.keep = random.random() < self.rate
+        return self._last.keep
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        if getattr(record, "suppressed", None):
+            entry["suppressed"] = record.suppressed
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        if getattr(record, "request_id", None):
+            line = f"{line} [request_id={record.request_id}]"
+        if getattr(record, "suppressed", None):
+            line = f"{line} [{record.suppressed} similar suppressed]"
+        return line
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread.
+
+    The stock prepare() formats the whole record, traceback included, on
+    the logging thread; this only merges the message arguments.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+def setup_logging(
+    level: str = "INFO",
+    log_format: str = "json",
+    rate_limit_per_second: float = 20,
+    rate_limit_burst: int = 50,
+    sql_sample_rate: float = 0.0
+) -> None:
+    """Setup application logging.
+
+    Records go through a queue to a listener thread that formats and
+    writes them, so request handlers never block on log I/O. Safe to
+    call more than once; later calls replace the earlier setup.
+    """
+    global _listener, _queue_handler, _sql_filter
+
     root_logger = logging.getLogger()
+    if _listener is not None:
+        root_logger.removeHandler(_queue_handler)
+        _listener.stop()
+
+    output_handler = logging.StreamHandler(sys.stdout)
+    output_handler.setFormatter(JsonFormatter() if log_format == "json" else TextFormatter())
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _queue_handler = DeferredQueueHandler(log_queue)
+    _queue_handler.addFilter(RequestIdFilter())
+    if rate_limit_per_second > 0:
+        _queue_handler.addFilter(RateLimitFilter(rate_limit_per_second, rate_limit_burst))
+
+    _listener = QueueListener(log_queue, output_handler, respect_handler_level=True)
+    _listener.start()
+
     root_logger.setLevel(getattr(logging, level.upper()))
-    root_logger.addHandler(console_handler)
-    
+    root_logger.addHandler(_queue_handler)
+
     # Setup specific loggers
-    loggers = [
-        'backend',
-        'uvicorn',
-        'fastapi',
-        'sqlalchemy.engine'
-    ]
-    
-    for logger_name in loggers:
+    for logger_name in ['backend', 'uvicorn', 'fastapi']:
         logger = logging.getLogger(logger_name)
         logger.setLevel(getattr(logging, level.upper()))
 
+    # SQL echo is a sampled debug option; statement logging stays off otherwise
+    sql_logger = logging.getLogger('sqlalchemy.engine.Engine')
+    if _sql_filter is not None:
+        sql_logger.removeFilter(_sql_filter)
+        _sql_filter = None
+    if sql_sample_rate > 0:
+        _sql_filter = SqlSampleFilter(sql_sample_rate)
+        sql_logger.addFilter(_sql_filter)
+        logging.getLogger('sqlalchemy.engine').setLevel(logging.INFO)
+    else:
+        logging.getLogger('sqlalchemy.engine').setLevel(logging.WARNING)
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _listener.stop()
+        _listener = None
+
+atexit.register(shutdown_logging)
+
 def get_logger(name: str) -> logging.Logger:
     """Get logger instance"""
     return logging.getLogger(name)
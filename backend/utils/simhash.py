@@ -0,0 +1,65 @@
+import hashlib
+import re
+from typing import List, Optional
+
+BITS = 64
+
+_QUOTE_HEADER = re.compile(r"^\s*on .{0,200}wrote:\s*$", re.IGNORECASE | re.MULTILINE)
+_GREETING = re.compile(r"^\s*(dear|hi|hello|hey|good (morning|afternoon|evening))\b[^\n]{0,60}\n", re.IGNORECASE)
+# A sign-off on its own line, or the "-- " signature delimiter, ends the message
+_SIGN_OFF = re.compile(
+    r"^\s*(--\s*|(best|kind|warm)?\s*regards,?|best,?|thanks,?|thank you,?|sincerely,?|cheers,?)\s*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+_TOKEN = re.compile(r"[a-z0-9']+")
+
+def normalize(body: str) -> List[str]:
+    """Tokens of the new text in a body: quoted replies, greeting and signature
+    dropped, addresses and numbers masked.
+
+    This makes "the same update sent to a different client" or a
+    template with another date or amount normalize to the same tokens.
+    """
+    for pattern in (_QUOTE_HEADER, _SIGN_OFF):
+        end = pattern.search(body)
+        if end:
+            body = body[:end.start()]
+    body = _GREETING.sub("", body, count=1)
+    lines = [line for line in body.lower().splitlines() if not line.lstrip().startswith(">")]
+    text = _NUMBER.sub(" 0 ", _EMAIL.sub(" addr ", "\n".join(lines)))
+    return _TOKEN.findall(text)
+
+def simhash(tokens: List[str], shingle: int = 2) -> int:
+    """64-bit SimHash over word shingles; similar texts differ in few bits"""
+    if len(tokens) < shingle:
+        shingles = [" ".join(tokens)]
+    else:
+        shingles = [" ".join(tokens[i:i + shingle]) for i in range(len(tokens) - shingle + 1)]
+
+    hashes = [
+        format(int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big"), "064b")
+        for s in shingles
+    ]
+    # Column-wise majority vote; zip over bit strings keeps the loop in C
+    half = len(hashes) / 2
+    bits = "".join("1" if column.count("1") > half else "0" for column in zip(*hashes))
+    return int(bits, 2)
+
+def fingerprint(body: str, min_words: int = 20) -> Optional[int]:
+    """SimHash of a body, or None if it is too short for similarity to mean anything"""
+    tokens = normalize(body or "")
+    if len(tokens) < min_words:
+        return None
+    return simhash(tokens)
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+def to_signed(value: int) -> int:
+    """Fit an unsigned 64-bit fingerprint into a signed BIGINT column"""
+    return value - (1 << BITS) if value >= 1 << (BITS - 1) else value
+
+def to_unsigned(value: int) -> int:
+    return value + (1 << BITS) if value < 0 else value
@@ -28,33 +28,85 @@
     toolbar.appendChild(captureBtn)
   }
 
-  // Capture current email
+  // Captures waiting to be sent in one batch request
+  const pendingCaptures = []
+  let flushTimer = null
+  const FLUSH_DELAY_MS = 1500
+  const MAX_BATCH_SIZE = 100
+
+  // Capture every message in the open conversation
   async function captureCurrentEmail() {
-    try {
-      const emailData = extractEmailData()
-      if (!emailData) {
-        alert("Could not extract email data")
-        return
-      }
+    const messages = extractThreadMessages()
+    if (messages.length === 0) {
+      alert("Could not extract email data")
+      return
+    }
+
+    pendingCaptures.push(...messages)
+
+    if (pendingCaptures.length >= MAX_BATCH_SIZE) {
+      await flushCaptures()
+    } else {
+      clearTimeout(flushTimer)
+      flushTimer = setTimeout(flushCaptures, FLUSH_DELAY_MS)
+    }
+  }
+
+  // Send all queued captures in one request
+  async function flushCaptures() {
+    clearTimeout(flushTimer)
+    flushTimer = null
 
-      // Send to server
+    const batch = pendingCaptures.splice(0, MAX_BATCH_SIZE)
+    if (batch.length === 0) return
+
+    try {
       const serverUrl = await getServerUrl()
-      const response = await fetch(`${serverUrl}/api/extension/capture`, {
+      const response = await fetch(`${serverUrl}/api/extension/capture/batch`, {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
         },
-        body: JSON.stringify(emailData),
+        body: JSON.stringify({ emails: batch }),
       })
 
-      if (response.ok) {
-        showNotification("Email captured successfully!", "success")
-      } else {
+      if (!response.ok) {
         throw new Error("Server error")
       }
+
+      const result = await response.json()
+      showNotification(`Captured ${result.captured} email(s), ${result.duplicates} already stored`, "success")
     } catch (error) {
       showNotification("Failed to capture email: " + error.message, "error")
     }
+
+    if (pendingCaptures.length > 0) {
+      await flushCaptures()
+    }
+  }
+
+  // Extract every expanded message of the open thread from the Gmail DOM
+  function extractThreadMessages() {
+    const subject = document.querySelector("[data-thread-perm-id] h2")?.textContent || ""
+    const threadId =
+      document.querySelector("[data-legacy-thread-id]")?.getAttribute("data-legacy-thread-id") || null
+    const messageNodes = document.querySelectorAll("[data-legacy-message-id]")
+
+    if (messageNodes.length === 0) {
+      const single = extractEmailData()
+      return single ? [single] : []
+    }
+
+    return Array.from(messageNodes).map((node) => ({
+      id: node.getAttribute("data-legacy-message-id"),
+      thread_id: threadId,
+      subject: subject,
+      sender: node.querySelector("[email]")?.getAttribute("email") || "",
+      recipient: "extracted@gmail.com", // Simplified
+      body: node.querySelector(".ii.gt div")?.textContent || "",
+      date_sent: new Date().toISOString(),
+      source: "chrome_extension",
+    }))
   }
 
   // Extract email data from Gmail DOM
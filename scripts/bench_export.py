@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Check that CSV and LEDES exports stream in constant memory.
+
+Exports the first --fraction of the date range and then the whole table
+from DATABASE_URL through backend/services/export_service.ExportService,
+timing each run and tracing the peak Python memory allocated while the
+chunks are produced. Chunks are counted and dropped, the way a streaming
+response would send them; tracing slows the timings several times over.
+Exits non-zero if the peak for the whole table exceeds --max-growth times
+the peak for the slice. Fill the database with
+scripts/generate_synthetic_emails.py first.
+
+Usage: python scripts/bench_export.py [--fraction 0.1] [--max-growth 2.0]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from datetime import timedelta
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func
+
+from backend.core.database import SessionLocal
+from backend.models.email import Email
+from backend.services.export_service import ExportFilters, ExportService
+
+def measure(chunks) -> tuple:
+    """(bytes produced, seconds, peak traced bytes) for one export"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    produced = 0
+    for chunk in chunks:
+        produced += len(chunk)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return produced, elapsed, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--fraction", type=float, default=0.1, help="share of the date range exported first")
+    parser.add_argument("--max-growth", type=float, default=2.0)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        rows, first, last = db.query(func.count(Email.id), func.min(Email.date_sent), func.max(Email.date_sent)).one()
+    finally:
+        db.close()
+    if not rows:
+        print("❌ No emails to export; run scripts/generate_synthetic_emails.py first")
+        sys.exit(1)
+
+    slice_end = (first + (last - first) * args.fraction).date()
+    runs = [
+        (f"first {args.fraction:.0%}", ExportFilters(end=slice_end)),
+        ("everything", ExportFilters(end=last.date() + timedelta(days=1))),
+    ]
+    export_service = ExportService()
+
+    print(f"🧪 Exporting from {rows:,} live emails")
+    print(f"  {'format':<6} {'range':<12} {'MB out':>8} {'seconds':>8} {'peak MB':>8}")
+    peaks = {}
+    for label, filters in runs:
+        for name, chunks in (
+            ("csv", export_service.csv_chunks(filters)),
+            ("ledes", export_service.ledes_chunks(filters, "INV-BENCH", rate=300)),
+        ):
+            produced, elapsed, peak = measure(chunks)
+            peaks.setdefault(name, []).append((produced, peak))
+            print(f"  {name:<6} {label:<12} {produced / 1e6:>8.2f} {elapsed:>8.2f} {peak / 1e6:>8.2f}")
+
+    failed = False
+    for name, ((small_out, small_peak), (full_out, full_peak)) in peaks.items():
+        growth = full_peak / max(small_peak, 1)
+        if growth > args.max_growth:
+            print(f"❌ {name} peak memory grew {growth:.1f}x for {full_out / max(small_out, 1):.1f}x the output")
+            failed = True
+
+    if failed:
+        sys.exit(1)
+    print("✅ Exports stream in constant memory")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark the list endpoint read paths: ORM objects + hand-built dicts +
+FastAPI's default JSON encoding versus Core select() rows + orjson.
+
+Usage: python scripts/bench_list_endpoints.py [rows] [repeats]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from backend.core.database import Base, SessionLocal, engine
+from backend.models.email import Base as EmailBase, Email
+from backend.services.listing_service import ListingService
+
+def seed(rows: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    EmailBase.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    start = datetime(2024, 1, 1)
+    db.bulk_insert_mappings(Email, [
+        {
+            "gmail_id": f"msg-{i}",
+            "thread_id": f"thread-{i // 5}",
+            "subject": f"Re: Matter {i % 97} - settlement draft",
+            "sender": f"Counsel {i % 13} <counsel{i % 13}@lawfirm.com>",
+            "recipient": "attorney@ourfirm.com",
+            "date_sent": start + timedelta(minutes=i),
+            "summary": "Reviewed opposing counsel's comments on the settlement draft and flagged indemnity changes.",
+            "billing_hours": 0.25 * (1 + i % 4),
+            "billing_description": "Review correspondence re settlement draft",
+            "pushed_to_clio": i % 3 == 0,
+        }
+        for i in range(rows)
+    ])
+    db.commit()
+    db.close()
+
+def orm_path() -> bytes:
+    db = SessionLocal()
+    emails = db.query(Email).filter(Email.summary.isnot(None)).order_by(Email.date_sent.desc()).all()
+    summaries = []
+    for email in emails:
+        summaries.append({
+            "id": email.id,
+            "email_id": email.gmail_id,
+            "subject": email.subject,
+            "summary": email.summary,
+            "billing_hours": email.billing_hours or 0.25,
+            "billing_description": email.billing_description or "",
+            "date_sent": email.date_sent.isoformat() if email.date_sent else None,
+            "pushed_to_clio": email.pushed_to_clio
+        })
+    body = JSONResponse(content=jsonable_encoder({"success": True, "summaries": summaries})).body
+    db.close()
+    return body
+
+def core_path() -> bytes:
+    db = SessionLocal()
+    body = ORJSONResponse(content={"success": True, "summaries": ListingService().summaries(db)}).body
+    db.close()
+    return body
+
+def measure(fn, repeats: int) -> float:
+    fn()  # warm up statement caches
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.process_time()
+        fn()
+        best = min(best, time.process_time() - started)
+    return best
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    print(f"🧪 Seeding {rows} summarized emails")
+    seed(rows)
+
+    orm_seconds = measure(orm_path, repeats)
+    core_seconds = measure(core_path, repeats)
+
+    print(f"ORM + json:     {orm_seconds * 1e6 / rows:7.2f} µs CPU/row ({orm_seconds:.3f}s)")
+    print(f"Core + orjson:  {core_seconds * 1e6 / rows:7.2f} µs CPU/row ({core_seconds:.3f}s)")
+    print(f"Speedup:        {orm_seconds / core_seconds:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Benchmark body extraction over Gmail API message payloads.
+
+Runs the old one-level text/plain lookup and the MIME walker in
+backend/utils/email_parser over the same corpus and reports throughput,
+bytes base64-decoded and how many messages came back without a body.
+The corpus is a directory of recorded messages.get(format=full) JSON
+responses, one message per file; without one, a synthetic corpus with
+nested multiparts, HTML-only mail, non-UTF-8 charsets and large
+attachments is generated. Exits non-zero if the walker misses a body
+the message has or decodes an attachment.
+
+Usage: python scripts/bench_mime_parsing.py [--corpus DIR] [--messages N] [--repeats N]
+"""
+import argparse
+import base64
+import glob
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.utils import email_parser
+
+def encode(text: str, charset: str = "utf-8") -> str:
+    return base64.urlsafe_b64encode(text.encode(charset)).decode("ascii")
+
+def text_part(mime_type: str, text: str, charset: str = "utf-8") -> dict:
+    return {
+        "mimeType": mime_type,
+        "filename": "",
+        "headers": [{"name": "Content-Type", "value": f'{mime_type}; charset="{charset}"'}],
+        "body": {"size": len(text), "data": encode(text, charset)},
+    }
+
+def attachment_part(size: int) -> dict:
+    data = base64.urlsafe_b64encode(os.urandom(size)).decode("ascii")
+    return {
+        "mimeType": "application/pdf",
+        "filename": "engagement-letter.pdf",
+        "headers": [{"name": "Content-Disposition", "value": 'attachment; filename="engagement-letter.pdf"'}],
+        "body": {"size": size, "data": data},
+    }
+
+def multipart(subtype: str, parts: list) -> dict:
+    return {"mimeType": f"multipart/{subtype}", "filename": "", "headers": [], "body": {"size": 0}, "parts": parts}
+
+def synthetic_corpus(count: int) -> list:
+    rng = random.Random(7)
+    sentence = "Following up on the indemnity clause in the draft settlement agreement. "
+    messages = []
+    for i in range(count):
+        text = sentence * rng.randint(2, 60)
+        html = f"<html><head><style>p {{color: red}}</style></head><body><p>{text}</p><p>Regards,<br>Counsel</p></body></html>"
+        kind = i % 5
+        shape = ("plain", "alternative", "nested+attachment", "html-only", "latin-1")[kind]
+        if kind == 0:
+            payload = text_part("text/plain", text)
+        elif kind == 1:
+            payload = multipart("alternative", [text_part("text/plain", text), text_part("text/html", html)])
+        elif kind == 2:
+            # The shape the old lookup missed: alternative nested in mixed, plus an attachment
+            payload = multipart("mixed", [
+                multipart("alternative", [text_part("text/plain", text), text_part("text/html", html)]),
+                attachment_part(rng.randint(50_000, 400_000)),
+            ])
+        elif kind == 3:
+            payload = multipart("mixed", [text_part("text/html", html), attachment_part(rng.randint(20_000, 100_000))])
+        else:
+            payload = multipart("alternative", [
+                text_part("text/plain", "Réunion confirmée pour jeudi. " * 20, "iso-8859-1"),
+                text_part("text/html", "<p>Réunion confirmée pour jeudi.</p>", "iso-8859-1"),
+            ])
+        payload["headers"] = payload["headers"] + [
+            {"name": "Subject", "value": f"Re: Matter {i}"},
+            {"name": "Date", "value": "Tue, 3 Sep 2024 14:05:00 -0400"},
+        ]
+        messages.append({
+            "id": f"msg-{i}",
+            "threadId": f"thread-{i}",
+            "internalDate": "1725386700000",
+            "payload": payload,
+            "shape": shape,
+        })
+    return messages
+
+def load_corpus(directory: str) -> list:
+    messages = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        with open(path, "r", encoding="utf-8") as f:
+            messages.append(json.load(f))
+    return messages
+
+def legacy_extract_body(payload: dict) -> str:
+    """GmailService._extract_body before the MIME walker"""
+    body = ""
+    if 'parts' in payload:
+        for part in payload['parts']:
+            if part['mimeType'] == 'text/plain':
+                data = part['body'].get('data', '')
+                if data:
+                    body = base64.urlsafe_b64decode(data).decode('utf-8')
+                    break
+    else:
+        if payload['mimeType'] == 'text/plain':
+            data = payload['body'].get('data', '')
+            if data:
+                body = base64.urlsafe_b64decode(data).decode('utf-8')
+    return body[:1000]
+
+def has_text(payload: dict) -> bool:
+    stack = [payload]
+    while stack:
+        part = stack.pop()
+        stack.extend(part.get("parts") or [])
+        if part.get("mimeType") in ("text/plain", "text/html") and not part.get("filename") and part["body"].get("data"):
+            return True
+    return False
+
+class CountingBase64:
+    """Counts bytes decoded through base64.urlsafe_b64decode"""
+
+    def __init__(self):
+        self.decoded = 0
+
+    def urlsafe_b64decode(self, data):
+        raw = base64.urlsafe_b64decode(data)
+        self.decoded += len(raw)
+        return raw
+
+def run(extract, messages: list, repeats: int) -> dict:
+    missed = errors = 0
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for message in messages:
+            try:
+                if not extract(message["payload"]) and has_text(message["payload"]):
+                    missed += 1
+            except Exception:
+                errors += 1
+    elapsed = time.perf_counter() - started
+    return {"rate": len(messages) * repeats / elapsed, "missed": missed // repeats, "errors": errors // repeats}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", default=None, help="directory of recorded messages.get JSON files")
+    parser.add_argument("--messages", type=int, default=500, help="size of the synthetic corpus")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    messages = load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.messages)
+    if not messages:
+        print("❌ Corpus is empty")
+        sys.exit(1)
+    print(f"🧪 Extracting bodies from {len(messages)} messages x {args.repeats}")
+
+    # Recorded messages are grouped by their top-level MIME type
+    shapes = {}
+    for message in messages:
+        shapes.setdefault(message.get("shape") or message["payload"].get("mimeType", "?"), []).append(message)
+
+    print(f"  {'shape':<20} {'legacy msg/s':>13} {'missed':>7} {'errors':>7} {'walker msg/s':>13} {'missed':>7} {'errors':>7}")
+    walker_missed = walker_errors = 0
+    for shape, group in shapes.items():
+        legacy = run(legacy_extract_body, group, args.repeats)
+        walker = run(email_parser.extract_body, group, args.repeats)
+        walker_missed += walker["missed"]
+        walker_errors += walker["errors"]
+        print(
+            f"  {shape:<20} {legacy['rate']:>13,.0f} {legacy['missed']:>7} {legacy['errors']:>7}"
+            f" {walker['rate']:>13,.0f} {walker['missed']:>7} {walker['errors']:>7}"
+        )
+
+    # One pass with decoding counted: the walker should only touch text parts
+    counter = CountingBase64()
+    real_base64, email_parser.base64 = email_parser.base64, counter
+    try:
+        for message in messages:
+            email_parser.extract_body(message["payload"])
+    finally:
+        email_parser.base64 = real_base64
+    per_message = counter.decoded / len(messages)
+    print(f"  walker decoded {counter.decoded:,} bytes ({per_message:,.0f} per message)")
+
+    failed = False
+    if walker_missed or walker_errors:
+        print("❌ Walker returned no body for messages that have one")
+        failed = True
+    # Bodies are capped at MAX_BODY_CHARS; HTML fallbacks may need up to MAX_HTML_BYTES
+    if per_message > email_parser.MAX_HTML_BYTES:
+        print("❌ Walker decoded more than a body's worth per message; attachments are being decoded")
+        failed = True
+
+    if failed:
+        sys.exit(1)
+    print("✅ MIME walker finds every body without decoding attachments")
+
+if __name__ == "__main__":
+    main()
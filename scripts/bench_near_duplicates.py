@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark the near-duplicate index used to reuse summaries.
+
+Fills backend/services/dedupe_service.NearDuplicateIndex with
+fingerprints of unrelated synthetic emails at growing sizes and times
+lookups against a linear scan over the same fingerprints, then checks
+recall on edited copies of indexed emails (another client's name,
+other dates and amounts, a signature, a changed word) and false matches on unrelated mail. Exits
+non-zero if lookups grow linearly with the index, recall is below
+--min-recall or an unrelated email matches.
+
+Usage: python scripts/bench_near_duplicates.py [--sizes 1000,10000,50000] [--lookups N] [--min-recall R]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.dedupe_service import NearDuplicateIndex
+from backend.utils.simhash import fingerprint, hamming
+
+WORDS = (
+    "agreement settlement deposition discovery motion counsel client hearing filing court "
+    "draft review schedule indemnity clause exhibit witness subpoena deadline matter claim "
+    "response brief order judge opposing party contract lease estate trust tax audit "
+    "invoice retainer strategy call meeting update revised signature closing escrow title"
+).split()
+# Names, places and case numbers make real mail far more varied than the legal vocabulary
+_names = random.Random(3)
+WORDS += ["".join(_names.choice("bcdfghklmnprstvz") + _names.choice("aeiou") for _ in range(3)) for _ in range(2000)]
+
+TEMPLATE = (
+    "Following up on our call about the matter ahead of the {}/{} deadline. {} "
+    "Our fee estimate for this stage is ${}. Please let me know if you have any questions."
+)
+
+CLIENTS = ["Acme Corp", "Globex", "Initech", "Umbrella LLC", "Stark Industries", "Wayne Enterprises"]
+
+def random_body(rng: random.Random, words: int = 80) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+def random_email(rng: random.Random) -> str:
+    return TEMPLATE.format(
+        rng.randint(1, 12), rng.randint(1, 28), random_body(rng), rng.randint(1, 50) * 250
+    )
+
+def variant(rng: random.Random, body: str) -> str:
+    """The same message to another client, with other dates and amounts, signed, or with a word changed"""
+    kind = rng.randrange(4)
+    if kind == 0:
+        return f"Dear {rng.choice(CLIENTS)},\n\n{body}"
+    if kind == 1:
+        return body.replace("/", f"/{rng.randint(1, 9)}", 1).replace(" $", f" ${rng.randint(1, 9)}", 1)
+    if kind == 2:
+        return f"{body}\n\nBest regards,\nJane Counsel\nPartner | jane.counsel@example.com | 555-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}"
+    words = body.split(" ")
+    words[rng.randrange(len(words))] = rng.choice(WORDS)
+    return " ".join(words)
+
+def time_lookups(lookup, values: list) -> float:
+    started = time.perf_counter()
+    for value in values:
+        lookup(value)
+    return (time.perf_counter() - started) / len(values) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,50000", help="comma-separated index sizes")
+    parser.add_argument("--lookups", type=int, default=500)
+    parser.add_argument("--max-distance", type=int, default=5)
+    parser.add_argument("--min-recall", type=float, default=0.9)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+
+    print(f"🧪 Fingerprinting {sizes[-1]:,} synthetic emails")
+    bodies = [random_email(rng) for _ in range(sizes[-1])]
+    values = [fingerprint(body) for body in bodies]
+    probes = [fingerprint(random_email(rng)) for _ in range(args.lookups)]
+
+    index = NearDuplicateIndex(max_distance=args.max_distance)
+    print(f"  {'entries':>10} {'index us/lookup':>16} {'scan us/lookup':>15}")
+    timings = []
+    for size in sizes:
+        index.add_many((email_id, values[email_id]) for email_id in range(len(index), size))
+        indexed = time_lookups(index.nearest, probes)
+        scan = time_lookups(lambda value: min(hamming(value, other) for other in values[:size]), probes[:50])
+        timings.append(indexed)
+        print(f"  {size:>10,} {indexed:>16,.1f} {scan:>15,.1f}")
+
+    hits = false_matches = 0
+    for _ in range(args.lookups):
+        email_id = rng.randrange(sizes[-1])
+        match = index.nearest(fingerprint(variant(rng, bodies[email_id])))
+        hits += match is not None and match[0] == email_id
+    for value in probes:
+        false_matches += index.nearest(value) is not None
+    recall = hits / args.lookups
+    print(f"  recall on edited copies: {recall:.1%}, unrelated emails matched: {false_matches}")
+
+    failed = False
+    growth = sizes[-1] / sizes[0]
+    if len(sizes) > 1 and timings[-1] / max(timings[0], 1e-9) > growth / 4:
+        print(f"❌ Lookup time grew {timings[-1] / timings[0]:.1f}x for a {growth:.0f}x larger index")
+        failed = True
+    if recall < args.min_recall:
+        print(f"❌ Recall {recall:.1%} is below {args.min_recall:.0%}")
+        failed = True
+    if false_matches:
+        print("❌ Unrelated emails matched an indexed one")
+        failed = True
+
+    if failed:
+        sys.exit(1)
+    print("✅ Near-duplicate lookups stay sublinear and find edited copies")
+
+if __name__ == "__main__":
+    main()
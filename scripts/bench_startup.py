@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Measure cold-start time: process launch to the first /health response.
+
+Each run is a fresh interpreter that imports the app, runs the lifespan
+startup (init_db) and answers /health through the ASGI interface. The
+first run sets up an empty database; later runs reuse it, which is the
+Railway restart / scale-up case. Exits non-zero when a warm start is
+over budget or a heavy client library was imported during startup.
+
+Usage: python scripts/bench_startup.py [runs] [budget_seconds]
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Client libraries that should only load when their service is first used
+HEAVY_MODULES = ["openai", "googleapiclient", "google_auth_oauthlib", "httpx"]
+
+CHILD = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+from backend.main import app
+imported = time.perf_counter()
+
+async def first_health():
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        messages = []
+        scope = {"type": "http", "method": "GET", "path": "/health", "raw_path": b"/health",
+                 "query_string": b"", "headers": [], "scheme": "http", "http_version": "1.1",
+                 "server": ("bench", 80), "client": ("bench", 1), "root_path": "", "app": app}
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+        async def send(message):
+            messages.append(message)
+        await app(scope, receive, send)
+        return ready, messages[0]["status"]
+
+ready, status = asyncio.run(first_health())
+print(json.dumps({
+    "import": imported - started,
+    "startup": ready - imported,
+    "status": status,
+    "heavy": [name for name in HEAVY if name in sys.modules],
+}))
+"""
+
+def run_once(database_url: str) -> dict:
+    env = {**os.environ, "DATABASE_URL": database_url, "LOG_LEVEL": "WARNING"}
+    code = f"HEAVY = {HEAVY_MODULES!r}\n{CHILD}"
+    launched = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    total = time.perf_counter() - launched
+    result = json.loads(output.strip().splitlines()[-1])
+    result["total"] = total
+    return result
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    budget = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+    database_url = f"sqlite:///{tempfile.mkdtemp()}/startup.db"
+
+    print("🧪 Cold start against an empty database")
+    first = run_once(database_url)
+    print(f"  import {first['import']:.3f}s  startup {first['startup']:.3f}s  total {first['total']:.3f}s")
+
+    print(f"🧪 {runs} restarts against the set-up database")
+    warm = [run_once(database_url) for _ in range(runs)]
+    for result in warm:
+        print(f"  import {result['import']:.3f}s  startup {result['startup']:.3f}s  total {result['total']:.3f}s")
+
+    best = min(result["total"] for result in warm)
+    heavy = sorted({name for result in [first, *warm] for name in result["heavy"]})
+    print(f"  best restart: {best:.3f}s (budget {budget:.1f}s)")
+
+    failed = False
+    if any(result["status"] != 200 for result in [first, *warm]):
+        print("❌ /health did not answer 200")
+        failed = True
+    if heavy:
+        print(f"❌ Imported during startup: {', '.join(heavy)}")
+        failed = True
+    if best > budget:
+        print("❌ Restart is over budget")
+        failed = True
+
+    if failed:
+        sys.exit(1)
+    print("✅ Startup is within budget")
+
+if __name__ == "__main__":
+    main()
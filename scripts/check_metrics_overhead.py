@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Check that metric collection stays cheap enough to leave on.
+
+Runs the real app's routing stack through httpx's ASGI transport with and
+without MetricsMiddleware, and times SQL statements with and without the
+engine listeners. Runs alternate between the two setups, swapping which
+goes first each trial, and the overhead is the median of the per-trial
+differences, so drift in machine load hits both sides alike. Exits
+non-zero if the overhead per request or per query exceeds its budget
+plus the run-to-run noise (median absolute deviation of the differences).
+
+Usage: python scripts/check_metrics_overhead.py [requests] [max_request_us] [max_query_us] [trials]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/metrics.db")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from sqlalchemy import create_engine, text
+
+from backend.core.metrics import MetricsMiddleware, register_query_metrics
+from backend.main import app
+
+async def time_requests(asgi_app, requests: int) -> float:
+    transport = httpx.ASGITransport(app=asgi_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(50):
+            await client.get("/health")
+        started = time.perf_counter()
+        for _ in range(requests):
+            await client.get("/health")
+        return (time.perf_counter() - started) / requests
+
+def time_queries(instrumented: bool, queries: int) -> float:
+    engine = create_engine("sqlite://")
+    if instrumented:
+        register_query_metrics(engine)
+    with engine.connect() as conn:
+        statement = text("SELECT 1")
+        started = time.perf_counter()
+        for _ in range(queries):
+            conn.execute(statement)
+        return (time.perf_counter() - started) / queries
+
+def interleaved(trials: int, baseline, instrumented) -> tuple:
+    """(median baseline, median instrumented, median difference, noise) in µs"""
+    baselines, instrumenteds, differences = [], [], []
+    for trial in range(trials):
+        if trial % 2:
+            after, before = instrumented(), baseline()
+        else:
+            before, after = baseline(), instrumented()
+        baselines.append(before * 1e6)
+        instrumenteds.append(after * 1e6)
+        differences.append((after - before) * 1e6)
+    difference = statistics.median(differences)
+    noise = statistics.median(abs(value - difference) for value in differences)
+    return statistics.median(baselines), statistics.median(instrumenteds), difference, noise
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    max_request_us = float(sys.argv[2]) if len(sys.argv) > 2 else 100.0
+    max_query_us = float(sys.argv[3]) if len(sys.argv) > 3 else 20.0
+    trials = int(sys.argv[4]) if len(sys.argv) > 4 else 7
+
+    # The app is built with the middleware; strip it to get the baseline stack
+    app.user_middleware = [m for m in app.user_middleware if m.cls is not MetricsMiddleware]
+    app.middleware_stack = app.build_middleware_stack()
+    baseline_app = app.middleware_stack
+    instrumented_app = MetricsMiddleware(baseline_app)
+    # Route labels need the endpoint map from the FastAPI app itself
+    instrumented_app._routes = {
+        route.endpoint: ((getattr(route, "tags", None) or ["App"])[0].lower(), route.path)
+        for route in app.routes if hasattr(route, "endpoint")
+    }
+
+    print(f"🧪 Timing {requests} requests per run, {trials} interleaved trials")
+    baseline, instrumented, request_overhead, request_noise = interleaved(
+        trials,
+        lambda: asyncio.run(time_requests(baseline_app, requests)),
+        lambda: asyncio.run(time_requests(instrumented_app, requests)),
+    )
+    print(f"  without metrics: {baseline:8.1f} µs/request")
+    print(f"  with metrics:    {instrumented:8.1f} µs/request")
+    print(f"  overhead:        {request_overhead:8.1f} ± {request_noise:.1f} µs/request (budget {max_request_us:.0f})")
+
+    queries = requests * 10
+    plain, timed, query_overhead, query_noise = interleaved(
+        trials,
+        lambda: time_queries(False, queries),
+        lambda: time_queries(True, queries),
+    )
+    print(f"🧪 Timing {queries} queries per run, {trials} interleaved trials")
+    print(f"  without listeners: {plain:6.1f} µs/query")
+    print(f"  with listeners:    {timed:6.1f} µs/query")
+    print(f"  overhead:          {query_overhead:6.1f} ± {query_noise:.1f} µs/query (budget {max_query_us:.0f})")
+
+    if request_overhead - request_noise > max_request_us or query_overhead - query_noise > max_query_us:
+        print("❌ Metrics overhead is over budget")
+        sys.exit(1)
+    print("✅ Metrics overhead is within budget")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Fill the emails table with realistic synthetic mail for load tests.
+
+Rows follow the shapes seen in production: a few busy correspondents
+and many occasional ones, threads of several messages, mail spread over
+business hours, about 90% summarized, most older summaries pushed to
+Clio, some mail assigned to matters and some marked non-billable by the
+pre-filter. Bodies come from a pool of templates stored once each in
+email_contents, as the content store would. Every batch is seeded from
+--seed and its position, so the same arguments produce the same rows on
+every run and every commit. Existing synthetic rows are kept and the
+table is filled up to --rows, so 10k, 100k and 1M databases can be
+grown one after another.
+
+Writes to DATABASE_URL. Rollups are rebuilt at the end; body text is
+only added to the full-text index with --index-bodies.
+
+Usage: python scripts/generate_synthetic_emails.py [--rows 10000|100000|1000000] [--seed N] [--days N] [--index-bodies]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, insert
+
+from backend.core.database import SessionLocal, engine, init_db
+from backend.models.email import Email
+from backend.services.content_store import ContentStore
+from backend.services.rollup_service import RollupService
+from backend.services.search_service import SearchService
+
+GMAIL_ID_PREFIX = "synthetic"
+
+FIRST_NAMES = ["Alex", "Jordan", "Priya", "Marcus", "Elena", "Sam", "Wei", "Fatima", "Daniel", "Grace", "Omar", "Lena"]
+LAST_NAMES = ["Reyes", "Chen", "Okafor", "Schmidt", "Patel", "Novak", "Haddad", "Brooks", "Tanaka", "Moreau", "Silva", "Kim"]
+DOMAINS = [
+    "lawfirm.com", "counsel-llp.com", "acme-corp.com", "globex.com", "initech.com", "umbrella-llc.com",
+    "courts.gov", "titleco.com", "escrowpartners.com", "insurer.com", "gmail.com", "outlook.com",
+]
+MATTER_WORDS = ["Smith", "Jones", "Acme", "Globex", "Harbor", "Summit", "Riverside", "Oakwood", "Pioneer", "Atlas"]
+TOPICS = [
+    "settlement draft", "discovery requests", "deposition schedule", "lease amendment", "purchase agreement",
+    "motion to compel", "estate plan", "trust funding", "closing documents", "indemnity clause",
+    "engagement letter", "mediation brief", "subpoena response", "title objections", "board consent",
+]
+SENTENCES = [
+    "Following up on our call about the {topic} for the {matter} matter.",
+    "Attached is the revised {topic} with opposing counsel's comments.",
+    "Please review the {topic} and let me know if you have questions before Friday.",
+    "The court has set a hearing on the {topic} for next month.",
+    "We need the client's sign-off on the {topic} before we can file.",
+    "I flagged two issues in the {topic} that we should discuss with the client.",
+    "Opposing counsel agreed to extend the deadline for the {topic} by two weeks.",
+    "Can you confirm the billing arrangement for the {topic}?",
+]
+HOURS = [0.1, 0.2, 0.25, 0.3, 0.5, 0.75, 1.0, 1.5]
+HOUR_WEIGHTS = [8, 14, 30, 12, 18, 7, 8, 3]
+FILTER_RULES = ["mailing-list", "auto-reply", "calendar", "no-reply", "receipt"]
+
+def contacts(rng: random.Random, count: int) -> list:
+    people = []
+    for i in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        people.append(f"{first} {last} <{first.lower()}.{last.lower()}{i}@{rng.choice(DOMAINS)}>")
+    return people
+
+def body_pool(rng: random.Random, count: int) -> list:
+    bodies = []
+    for _ in range(count):
+        topic, matter = rng.choice(TOPICS), rng.choice(MATTER_WORDS)
+        sentences = [rng.choice(SENTENCES).format(topic=topic, matter=matter) for _ in range(rng.randint(2, 12))]
+        bodies.append((topic, matter, " ".join(sentences) + "\n\nBest regards,\n" + rng.choice(FIRST_NAMES)))
+    return bodies
+
+def build_batch(args, first: int, count: int, people: list, owners: list, bodies: list, hashes: list, end: datetime) -> list:
+    # Seeded by position, not by run, so resumed and fresh runs write the same rows
+    rng = random.Random(f"{args.seed}-{first}")
+    rows = []
+    for i in range(first, first + count):
+        body_index = rng.randrange(len(bodies))
+        topic, matter, _ = bodies[body_index]
+        # Business hours on weekdays, spread over the window
+        day = end - timedelta(days=rng.randrange(args.days))
+        while day.weekday() >= 5:
+            day -= timedelta(days=1)
+        date_sent = day.replace(hour=rng.randint(8, 18), minute=rng.randrange(60), second=rng.randrange(60), microsecond=0)
+
+        summarized = rng.random() < 0.9
+        filter_rule = rng.choice(FILTER_RULES) if summarized and rng.random() < 0.15 else None
+        billable = filter_rule is None
+        age = end - date_sent
+        thread = i // 4
+        rows.append({
+            "gmail_id": f"{GMAIL_ID_PREFIX}-{args.seed}-{i}",
+            "thread_id": f"{GMAIL_ID_PREFIX}-thread-{args.seed}-{thread}",
+            "owner": owners[thread % len(owners)],
+            # A few correspondents send most of the mail
+            "sender": people[int(len(people) * rng.random() ** 3)],
+            "recipient": owners[thread % len(owners)] or "attorney@ourfirm.com",
+            "subject": f"{'Re: ' if i % 4 else ''}{matter} - {topic}",
+            "body_hash": hashes[body_index],
+            "date_sent": date_sent,
+            "summary": (f"Reviewed correspondence regarding the {topic} in the {matter} matter." if billable
+                        else f"Not billable: {filter_rule}") if summarized else None,
+            "billing_hours": (rng.choices(HOURS, HOUR_WEIGHTS)[0] if billable else 0.0) if summarized else None,
+            "billing_description": (f"Review {topic}" if billable else f"Non-billable: {filter_rule}") if summarized else None,
+            "matter_id": f"matter-{MATTER_WORDS.index(matter)}-{thread % 20}" if rng.random() < 0.6 else None,
+            "pushed_to_clio": summarized and billable and age > timedelta(days=7) and rng.random() < 0.85,
+            "billable": billable,
+            "filter_rule": filter_rule,
+            "summary_source": ("model" if billable else "rule") if summarized else None,
+            "created_at": date_sent + timedelta(minutes=rng.randint(1, 30)),
+            "updated_at": date_sent + timedelta(minutes=rng.randint(30, 600)),
+        })
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000, help="synthetic rows the table should hold")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--days", type=int, default=365, help="spread date_sent over this many days")
+    parser.add_argument("--owners", type=int, default=5, help="attorney mailboxes, plus the default one")
+    parser.add_argument("--contacts", type=int, default=2000)
+    parser.add_argument("--bodies", type=int, default=5000, help="distinct bodies in the content store")
+    parser.add_argument("--batch", type=int, default=5000)
+    parser.add_argument("--index-bodies", action="store_true", help="also add body text to the full-text index")
+    args = parser.parse_args()
+
+    print(f"🗄️  Setting up {engine.url.render_as_string(hide_password=True)}")
+    asyncio.run(init_db())
+
+    db = SessionLocal()
+    prefix = f"{GMAIL_ID_PREFIX}-{args.seed}-"
+    existing = db.query(func.count(Email.id)).filter(Email.gmail_id.like(f"{prefix}%")).scalar()
+    if existing >= args.rows:
+        print(f"✅ Already holds {existing:,} synthetic rows for seed {args.seed}")
+        return
+
+    rng = random.Random(args.seed)
+    people = contacts(rng, args.contacts)
+    owners = [None] + [f"attorney{i}@ourfirm.com" for i in range(1, args.owners + 1)]
+    bodies = body_pool(rng, args.bodies)
+    content_store = ContentStore()
+    hashes = content_store.put_many(db, [body for _, _, body in bodies])
+    db.commit()
+    # Anchored to a fixed date so reruns on other days produce the same rows
+    end = datetime(2025, 1, 1) + timedelta(days=args.days)
+
+    print(f"🧪 Writing rows {existing:,} to {args.rows:,}")
+    started = time.perf_counter()
+    statement = insert(Email.__table__)
+    written = 0
+    for first in range(existing, args.rows, args.batch):
+        count = min(args.batch, args.rows - first)
+        db.execute(statement, build_batch(args, first, count, people, owners, bodies, hashes, end))
+        db.commit()
+        written += count
+        if written % (args.batch * 20) == 0:
+            print(f"  {existing + written:,} rows ({written / (time.perf_counter() - started):,.0f} rows/s)")
+    db.close()
+    elapsed = time.perf_counter() - started
+    print(f"  wrote {written:,} rows in {elapsed:.1f}s ({written / elapsed:,.0f} rows/s)")
+
+    if args.index_bodies:
+        print("🔎 Indexing bodies")
+        SearchService().reindex_bodies(engine)
+
+    print("📊 Rebuilding billing rollups")
+    counted = RollupService().rebuild(engine)
+    print(f"✅ {args.rows:,} synthetic rows, {counted:,} counted in rollups")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for Google Pub/Sub push delivery.
+
+Posts Gmail watch notifications, wrapped in the Pub/Sub push envelope
+format, to a running server so the push receiver can be exercised
+without a real topic or subscription.
+
+Usage: python scripts/gmail_push_standin.py [--url URL] [--history-id N] [--burst N] [--token T]
+"""
+import argparse
+import base64
+import json
+import time
+import uuid
+
+import requests
+
+def build_envelope(email_address: str, history_id: int) -> dict:
+    data = json.dumps({"emailAddress": email_address, "historyId": history_id}).encode("utf-8")
+    return {
+        "message": {
+            "data": base64.b64encode(data).decode("ascii"),
+            "messageId": uuid.uuid4().hex,
+            "publishTime": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "subscription": "projects/local/subscriptions/gmail-push-standin",
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000/api/gmail/push")
+    parser.add_argument("--email", default="attorney@example.com")
+    parser.add_argument("--history-id", type=int, default=100000)
+    parser.add_argument("--burst", type=int, default=5, help="notifications to send back to back")
+    parser.add_argument("--token", default=None, help="GMAIL_PUSH_TOKEN configured on the server")
+    args = parser.parse_args()
+
+    params = {"token": args.token} if args.token else {}
+
+    print(f"🧪 Posting {args.burst} notifications to {args.url}")
+    for offset in range(args.burst):
+        envelope = build_envelope(args.email, args.history_id + offset)
+        response = requests.post(args.url, params=params, json=envelope, timeout=10)
+        print(f"   historyId={args.history_id + offset}: HTTP {response.status_code} {response.text}")
+
+    status_url = args.url.rstrip("/") + "/status"
+    time.sleep(0.5)
+    print(f"📊 {requests.get(status_url, timeout=10).json()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Load-test the list and edit endpoints with a mixed read/write workload.
+
+Runs closed-loop async clients against the app in-process through
+httpx's ASGI transport, or against a running server with --url, at
+each concurrency level in turn. Each client picks an operation by the
+workload weights:
+  stored     GET /api/gmail/emails/stored (half of them for one owner)
+  summaries  GET /api/summarizer/summaries (half of them for one owner)
+  update     PUT /api/summarizer/summaries/{id} on a random summarized email
+Reports throughput, p50/p95/p99 latency and error rate per operation
+and level. Operation choices are seeded per client, and results are
+written as JSON with the commit, row count and arguments, so runs can
+be compared across commits with --compare. Ids and owners are sampled
+from DATABASE_URL, which should be the database the app uses; fill it
+with scripts/generate_synthetic_emails.py first. Exits non-zero if the
+error rate exceeds --max-error-rate.
+
+Usage: python scripts/load_test.py [--url URL] [--concurrency 1,8,32] [--duration S] [--workload read|mixed|write|stored=N,summaries=N,update=N] [--output FILE] [--compare FILE]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import httpx
+from sqlalchemy import func
+
+from backend.core.database import SessionLocal, engine, init_db
+from backend.models.email import Email
+
+WORKLOADS = {
+    "read": {"stored": 1, "summaries": 1},
+    "mixed": {"stored": 4, "summaries": 4, "update": 2},
+    "write": {"update": 1},
+}
+
+def parse_workload(value: str) -> dict:
+    if value in WORKLOADS:
+        return WORKLOADS[value]
+    weights = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name not in ("stored", "summaries", "update"):
+            raise argparse.ArgumentTypeError(f"Unknown operation {name}")
+        weights[name] = float(weight or 1)
+    return weights
+
+def sample_targets(limit: int = 5000) -> dict:
+    db = SessionLocal()
+    try:
+        rows = db.query(func.count(Email.id)).scalar()
+        ids = [email_id for email_id, in db.query(Email.id).filter(Email.summary.isnot(None)).order_by(func.random()).limit(limit)]
+        owners = [owner for owner, in db.query(Email.owner).filter(Email.owner.isnot(None)).distinct()]
+    finally:
+        db.close()
+    return {"rows": rows, "ids": ids, "owners": owners}
+
+def percentile(values: list, fraction: float):
+    if not values:
+        return None
+    return round(values[min(int(len(values) * fraction), len(values) - 1)] * 1000, 2)
+
+async def client_loop(client, rng, weights, targets, deadline, samples, conditional):
+    names, shares = list(weights), list(weights.values())
+    etags = {}
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, shares)[0]
+        if name == "update":
+            email_id = rng.choice(targets["ids"])
+            request = client.put(f"/api/summarizer/summaries/{email_id}", json={
+                "billing_hours": rng.choice([0.1, 0.25, 0.5, 1.0]),
+                "billing_description": "Review correspondence (load test)",
+                "summary": f"Reviewed correspondence; edited at {time.time():.3f}",
+            })
+        else:
+            path = "/api/gmail/emails/stored" if name == "stored" else "/api/summarizer/summaries"
+            if targets["owners"] and rng.random() < 0.5:
+                path += f"?owner={rng.choice(targets['owners'])}"
+            headers = {"If-None-Match": etags[path]} if conditional and path in etags else {}
+            request = client.get(path, headers=headers)
+
+        started = time.perf_counter()
+        try:
+            response = await request
+            ok = response.status_code < 400
+            if conditional and ok and "etag" in response.headers:
+                etags[path] = response.headers["etag"]
+        except Exception:
+            ok = False
+        samples.setdefault(name, []).append((time.perf_counter() - started, ok))
+
+async def run_level(make_client, concurrency, duration, weights, targets, seed, conditional) -> dict:
+    async with make_client() as client:
+        # Warm caches and connections so levels are measured in steady state
+        await client_loop(client, random.Random(seed), weights, targets, time.perf_counter() + min(2.0, duration / 5), {}, conditional)
+        samples = {}
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*(
+            client_loop(client, random.Random(seed * 1000 + i), weights, targets, deadline, samples, conditional)
+            for i in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+
+    operations = {}
+    for name, values in samples.items():
+        latencies = sorted(latency for latency, _ in values)
+        errors = sum(1 for _, ok in values if not ok)
+        operations[name] = {
+            "requests": len(values),
+            "throughput": round(len(values) / elapsed, 1),
+            "p50_ms": percentile(latencies, 0.50),
+            "p95_ms": percentile(latencies, 0.95),
+            "p99_ms": percentile(latencies, 0.99),
+            "error_rate": round(errors / len(values), 4),
+        }
+    total = sum(op["requests"] for op in operations.values())
+    errors = sum(op["requests"] * op["error_rate"] for op in operations.values())
+    return {
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 2),
+        "throughput": round(total / elapsed, 1),
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "operations": operations,
+    }
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def print_level(level: dict, baseline: dict = None) -> None:
+    print(f"  concurrency {level['concurrency']}: {level['throughput']:,.1f} req/s, {level['error_rate']:.2%} errors")
+    for name, op in sorted(level["operations"].items()):
+        line = (
+            f"    {name:<10} {op['requests']:>7} req {op['throughput']:>8,.1f}/s"
+            f"  p50 {op['p50_ms']:>8} ms  p95 {op['p95_ms']:>8} ms  p99 {op['p99_ms']:>8} ms  errors {op['error_rate']:.2%}"
+        )
+        previous = (baseline or {}).get(name)
+        if previous and previous["throughput"] and previous["p95_ms"]:
+            line += (
+                f"  (throughput {op['throughput'] / previous['throughput'] - 1:+.0%},"
+                f" p95 {op['p95_ms'] / previous['p95_ms'] - 1:+.0%} vs {baseline['_commit']})"
+            )
+        print(line)
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default=None, help="base URL of a running server; in-process by default")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated client counts")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per concurrency level")
+    parser.add_argument("--workload", type=parse_workload, default="mixed")
+    parser.add_argument("--conditional", action="store_true", help="send If-None-Match like a browser revisiting")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default=None, help="write results as JSON")
+    parser.add_argument("--compare", default=None, help="JSON results of an earlier run")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    args = parser.parse_args()
+    weights = args.workload
+
+    await init_db()
+    targets = sample_targets()
+    if "update" in weights and not targets["ids"]:
+        print("❌ No summarized emails to update; run scripts/generate_synthetic_emails.py first")
+        sys.exit(1)
+
+    if args.url:
+        def make_client():
+            return httpx.AsyncClient(base_url=args.url, timeout=120, limits=httpx.Limits(max_connections=None))
+    else:
+        from backend.main import app
+        transport = httpx.ASGITransport(app=app)
+
+        def make_client():
+            return httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=120)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+        for level in previous["levels"]:
+            baseline[level["concurrency"]] = {**level["operations"], "_commit": previous["commit"]}
+        if previous.get("rows") != targets["rows"] or previous.get("weights") != weights:
+            print(f"⚠️  Baseline ran with {previous.get('rows'):,} rows and workload {previous.get('weights')}")
+
+    print(f"🧪 {targets['rows']:,} emails, workload {weights}, {args.duration:.0f}s per level, {args.url or 'in-process'}")
+    levels = []
+    for concurrency in [int(level) for level in args.concurrency.split(",")]:
+        level = await run_level(make_client, concurrency, args.duration, weights, targets, args.seed, args.conditional)
+        print_level(level, baseline.get(concurrency))
+        levels.append(level)
+
+    results = {
+        "commit": git_commit(),
+        "started_at": datetime.utcnow().isoformat(),
+        "database": engine.dialect.name,
+        "python": platform.python_version(),
+        "rows": targets["rows"],
+        "weights": weights,
+        "duration": args.duration,
+        "conditional": args.conditional,
+        "target": args.url or "in-process",
+        "levels": levels,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"📝 Results written to {args.output}")
+
+    worst = max(level["error_rate"] for level in levels)
+    if worst > args.max_error_rate:
+        print(f"❌ Error rate {worst:.2%} exceeds {args.max_error_rate:.2%}")
+        sys.exit(1)
+    print("✅ Load test finished")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -10,12 +10,14 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
-# Setup basic logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 def main():
     """Main startup function"""
+    # Setup basic logging; only here, since worker processes re-import this
+    # module and log through the app's own handler
+    logging.basicConfig(level=logging.INFO)
+    
     try:
         # Get port from environment
         port = int(os.environ.get("PORT", 8000))
@@ -26,15 +28,9 @@ def main():
         logger.info(f"🔌 Port: {port}")
         logger.info(f"🌍 Environment: {os.getenv('RAILWAY_ENVIRONMENT', 'development')}")
         
-        # Import and run the FastAPI app
-        import uvicorn
-        uvicorn.run(
-            "backend.main:app",
-            host=host,
-            port=port,
-            reload=False,
-            log_level="info"
-        )
+        # Workers, uvloop and httptools come from WEB_CONCURRENCY and what is installed
+        from backend.core.server import run
+        run(host=host, port=port)
         
     except Exception as e:
         logger.error(f"❌ Startup failed: {e}")